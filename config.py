@@ -10,6 +10,17 @@ MAHUA_SECRET_KEY = "69eaf6b39da442809644dc2e3e233cf5"
 MAHUA_CHANNEL_ID = 'OP0002'
 MAHUA_LOGIN_URL = "https://openapi.quanma51.com/api/user-server/user/dev/login"
 MAHUA_ORDER_LIST_URL = "https://openapi.quanma51.com/api/movie-server/movie/bidding/info/list"
+MAHUA_TOKEN_TTL = 30 * 60  # Token有效期（秒）
+MAHUA_TOKEN_REFRESH_MARGIN = 120  # 在Token过期前多少秒由后台主动刷新
+MAHUA_TOKEN_RETRY_INTERVAL = 5  # 后台刷新失败后的重试间隔（秒）
+MAHUA_TOKEN_INVALID_CODES = ()  # 表示Token失效的rtnCode，平台尚未确认具体取值，确认后补充
+MAHUA_TOKEN_INVALID_KEYWORDS = (  # rtnMsg中明确表示Token失效的短语（小写匹配），不使用“登录”等宽泛词
+    'token失效', 'token过期', 'token已过期', 'token无效', 'token已失效',
+    '令牌失效', '令牌过期', '令牌无效', '登录已过期', '登录失效', '登录已失效', '请重新登录',
+)
+MAHUA_STREAMING_PARSE = False  # 是否边下载边解析订单列表，每批到达的订单立即去重并匹配规则
+MAHUA_REQUEST_TIMEOUT = 4  # 订单列表请求超时时间（秒），轮询中不超过 POLL_DEADLINE 的剩余时间
+MAHUA_LOGIN_TIMEOUT = 10  # 登录请求超时时间（秒），登录由多个调用方共享、也在轮询之外进行，不受轮询截止时间限制
 
 # --- 哈哈平台配置 ---
 API_URL = 'https://hahapiao.cn/api/Synchro/pcToList'
@@ -46,6 +57,9 @@ APP_VERSION = "1.0.0"
 HAHA_PLATFORM_NAME = "哈哈"
 MAHUA_PLATFORM_NAME = "麻花"
 
+# 启用的平台（对应 core/platforms/registry.py 中的平台标识），未启用的平台适配器不会被导入
+ENABLED_PLATFORMS = ['haha', 'mahua']
+
 # 日志配置
 LOG_LEVEL = "DEBUG"
 LOG_FILE = "app.log"
@@ -55,8 +69,54 @@ LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 SOUND_FILE = "notification.wav"
 
 # 数据处理配置
-MAX_ORDERS_CACHE = 500  # 订单去重缓存最大数量
+ORDER_DEDUP_TTL = 30 * 60  # 订单去重记录保留时间（秒），从订单最后一次出现在轮询结果中开始计算
+ORDER_DEDUP_MAX_SIZE = 50000  # 订单去重记录最大数量，超出时淘汰最久未出现的订单
+ORDER_FINGERPRINT_FIELDS = ('bidding_price', 'seat_count')  # 变化时订单作为"已更新"重新匹配规则的字段
+CROSS_PLATFORM_DEDUP = False  # 同一场次同时出现在多个平台时只提醒利润更高的平台（场次时间字段名对照平台实际响应确认之前保持关闭）
 API_REQUEST_INTERVAL = 5  # API请求间隔（秒）
+POLL_DEADLINE = 4  # 单个平台一次轮询（请求、解密、解析、标准化）的截止时间（秒），超时即取消本次轮询
+HAHA_REQUEST_TIMEOUT = 4  # 哈哈平台订单列表请求超时时间（秒），轮询中不超过 POLL_DEADLINE 的剩余时间
+
+# 熔断器配置（平台连续失败时暂停轮询，定期探测是否恢复）
+CIRCUIT_FAILURE_THRESHOLD = 5  # 连续失败（含超时）多少次后打开熔断器
+CIRCUIT_RESET_TIMEOUT = 30  # 熔断器打开后等待多少秒再发出探测请求
+
+# 对冲请求配置（列表请求迟迟未返回时再发出一个相同的请求，先返回的生效）
+HEDGE_ENABLED = False  # 是否启用对冲请求
+HEDGE_PERCENTILE = 95  # 请求超过最近耗时的该分位数仍未返回时发出对冲请求
+HEDGE_MIN_DELAY = 0.1  # 发出对冲请求前的最短等待时间（秒）
+HEDGE_MIN_SAMPLES = 20  # 积累到该数量的耗时样本后才开始对冲
+HEDGE_BUDGET_RATIO = 0.05  # 对冲请求数占正常请求数的最大比例
+
+# 订单持久化配置（后台线程把新订单成批写入数据库）
+PERSIST_BATCH_SIZE = 500  # 累积到多少条订单时立即写入
+PERSIST_MAX_DELAY = 0.2  # 第一批订单到达后最多等待多少秒再写入（合并期间到达的订单一次提交）
+PERSIST_CLOSE_TIMEOUT = 10  # 退出时等待写完剩余订单的最长秒数
+
+# 数据库读连接池配置（Web服务器等只读访问方使用）
+DB_READ_POOL_SIZE = 8  # 最多同时打开的只读连接数
+DB_READ_POOL_TIMEOUT = 10  # 连接全部被占用时等待空闲连接的最长秒数
+
+# 原始响应抓取配置（把平台返回的原始订单列表响应追加写入JSON Lines文件，用于排查规则误判和离线回放）
+CAPTURE_ENABLED = False  # 是否抓取原始响应
+CAPTURE_FILE = "captures/responses.jsonl"  # 抓取文件路径，轮转后的文件在同一目录下压缩为 .jsonl.gz
+CAPTURE_MAX_BYTES = 50 * 1024 * 1024  # 单个抓取文件的最大字节数，超过后轮转
+CAPTURE_BACKUP_COUNT = 20  # 保留的已轮转压缩文件个数
+CAPTURE_FLUSH_INTERVAL = 1.0  # 写入线程把缓冲内容刷到磁盘的最长间隔（秒）
+CAPTURE_QUEUE_SIZE = 10000  # 待写入响应的最大积压条数，写入跟不上时丢弃新响应而不是阻塞轮询
+CAPTURE_CLOSE_TIMEOUT = 10  # 退出时等待写完剩余响应的最长秒数
+
+# 退出配置
+# 关闭窗口时等待后台线程退出的最长秒数：进行中的轮询、写完剩余订单和响应，另留5秒保存快照和关闭连接
+SHUTDOWN_TIMEOUT = POLL_DEADLINE + PERSIST_CLOSE_TIMEOUT + CAPTURE_CLOSE_TIMEOUT + 5
+
+# 状态快照配置（用于重启后热启动）
+STATE_SNAPSHOT_FILE = "state_snapshot.json"  # 快照文件路径
+STATE_SNAPSHOT_INTERVAL = 60  # 定期保存快照的间隔（秒）
+
+# 性能指标配置
+METRICS_WINDOW_SIZE = 500  # 每个平台每个阶段保留的最近耗时样本数
+METRICS_FILE = "metrics.json"  # 指标报告文件，供Web服务器读取
 
 # 规则引擎配置
 RULES_FILE = "rules.json"
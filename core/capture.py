@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始响应抓取模块 - 把平台返回的原始订单列表响应追加写入JSON Lines文件，供排查和离线回放使用
+"""
+
+import os
+import time
+import gzip
+import queue
+import shutil
+import logging
+import threading
+from . import jsoncodec
+from config import (
+    CAPTURE_FILE, CAPTURE_MAX_BYTES, CAPTURE_BACKUP_COUNT, CAPTURE_FLUSH_INTERVAL, CAPTURE_QUEUE_SIZE,
+    CAPTURE_CLOSE_TIMEOUT
+)
+
+# 通知写入线程退出的标记
+_STOP = object()
+
+
+class ResponseCapture:
+    """
+    原始响应抓取器
+
+    适配器收到订单列表响应后调用 record()，只把响应放入队列，不做序列化和磁盘操作；
+    写入线程批量取出响应，序列化为JSON Lines写入缓冲文件，每隔 flush_interval 秒刷盘一次。
+    文件超过 max_bytes 时轮转：重命名为带时间戳的文件并压缩为 .gz，只保留最近 backup_count 个。
+
+    每行包含: ts（收到响应的时间戳）、platform、status（HTTP状态码）、latency_ms、body（原始响应文本，
+    哈哈平台的密文原样保存）。
+    """
+
+    def __init__(self, filepath: str = CAPTURE_FILE, max_bytes: int = CAPTURE_MAX_BYTES,
+                 backup_count: int = CAPTURE_BACKUP_COUNT, flush_interval: float = CAPTURE_FLUSH_INTERVAL,
+                 queue_size: int = CAPTURE_QUEUE_SIZE):
+        """
+        初始化原始响应抓取器
+
+        Args:
+            filepath (str): 抓取文件路径
+            max_bytes (int): 单个文件的最大字节数，超过后轮转
+            backup_count (int): 保留的已轮转压缩文件个数
+            flush_interval (float): 刷盘的最长间隔（秒）
+            queue_size (int): 待写入响应的最大积压条数
+        """
+        self.filepath = filepath
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+        # 统计计数（captured、dropped 由调用方修改，其余由写入线程修改）
+        self.captured = 0
+        self.dropped = 0
+        self.written_bytes = 0
+        self.rotations = 0
+        self.failures = 0
+
+    def start(self):
+        """启动写入线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='response-capture', daemon=True)
+        self._thread.start()
+        logging.info(f"原始响应抓取已启动，写入 {self.filepath}")
+
+    def record(self, platform_name: str, status: int, latency: float, body):
+        """
+        记录一条原始响应，不等待写入
+
+        Args:
+            platform_name (str): 平台名称
+            status (int): HTTP状态码
+            latency (float): 从发出请求到收完响应的耗时（秒）
+            body (str | bytes): 原始响应内容
+        """
+        try:
+            self._queue.put_nowait((time.time(), platform_name, status, latency, body))
+            self.captured += 1
+        except queue.Full:
+            # 写入跟不上时丢弃，不能让抓取拖慢轮询
+            self.dropped += 1
+
+    def _run(self):
+        """写入线程主循环"""
+        file = None
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    items = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    # 空闲时把缓冲区中剩余的内容刷到磁盘
+                    if file is not None:
+                        file.flush()
+                        last_flush = time.monotonic()
+                    continue
+                while True:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stopping = any(item is _STOP for item in items)
+                records = [item for item in items if item is not _STOP]
+                if records:
+                    try:
+                        if file is None:
+                            file = self._open()
+                        self._write(file, records)
+                        if file.tell() >= self.max_bytes:
+                            file.close()
+                            file = None
+                            self._rotate()
+                        elif time.monotonic() - last_flush >= self.flush_interval:
+                            file.flush()
+                            last_flush = time.monotonic()
+                    except Exception as e:
+                        self.failures += 1
+                        logging.error(f"写入原始响应抓取文件失败: {e}")
+                if stopping:
+                    break
+        finally:
+            if file is not None:
+                file.close()
+
+    def _open(self):
+        """打开（追加）抓取文件，目录不存在时创建"""
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(self.filepath, 'ab', buffering=1024 * 1024)
+
+    def _write(self, file, records: list):
+        """序列化一批响应并写入文件"""
+        lines = []
+        for timestamp, platform_name, status, latency, body in records:
+            if isinstance(body, bytes):
+                body = body.decode('utf-8', errors='replace')
+            lines.append(jsoncodec.dumps_bytes({
+                'ts': round(timestamp, 3),
+                'platform': platform_name,
+                'status': status,
+                'latency_ms': round(latency * 1000, 1),
+                'body': body
+            }))
+        data = b'\n'.join(lines) + b'\n'
+        file.write(data)
+        self.written_bytes += len(data)
+
+    def _rotate(self):
+        """把当前文件重命名为带时间戳的文件并压缩，删除超出保留个数的旧文件"""
+        root, ext = os.path.splitext(self.filepath)
+        rotated = f"{root}-{time.strftime('%Y%m%d-%H%M%S')}-{self.rotations:04d}{ext}"
+        os.replace(self.filepath, rotated)
+        with open(rotated, 'rb') as source, gzip.open(f"{rotated}.gz", 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+        self.rotations += 1
+        logging.info(f"原始响应抓取文件已轮转: {rotated}.gz")
+
+        # 只保留最近的 backup_count 个压缩文件（文件名中的时间戳保证按名称排序即按时间排序）
+        directory = os.path.dirname(self.filepath) or '.'
+        prefix = f"{os.path.basename(root)}-"
+        backups = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(f"{ext}.gz")
+        )
+        for name in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(os.path.join(directory, name))
+
+    def close(self, timeout: float = CAPTURE_CLOSE_TIMEOUT):
+        """
+        写完队列中剩余的响应后停止写入线程
+
+        Args:
+            timeout (float): 等待线程结束的最长秒数
+        """
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning(f"原始响应抓取线程未在 {timeout:g} 秒内结束")
+        else:
+            logging.info("原始响应抓取已停止")
+        self._thread = None
+
+    def get_metrics(self) -> dict:
+        """
+        获取抓取统计
+
+        Returns:
+            dict: 队列积压条数、已抓取条数、丢弃条数、写入字节数、轮转次数和写入失败次数
+        """
+        return {
+            'queue_depth': self._queue.qsize(),
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'written_bytes': self.written_bytes,
+            'rotations': self.rotations,
+            'failures': self.failures
+        }
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨平台场次索引模块 - 识别同一场次同时出现在多个平台的订单，只提醒利润更高的平台
+"""
+
+import re
+import logging
+import unicodedata
+from .database import parse_show_time_ms
+
+# 归一化时去掉的字符：空白、标点和括号（全角字符先经 NFKC 转为半角）
+_NON_WORD = re.compile(r'[\W_]+')
+
+# 某个平台累计多少个匹配成功的订单缺少完整场次时间、且从未出现过完整场次时间时警告（字段名可能与平台实际返回的不一致）
+_MISSING_SHOW_TIME_WARN_AFTER = 20
+
+
+def _normalize_text(value) -> str:
+    """统一全角半角和大小写，去掉空白和标点，如 "万达影城（万象城店）" 与 "万达影城 万象城店" 相同"""
+    if not value:
+        return ''
+    return _NON_WORD.sub('', unicodedata.normalize('NFKC', str(value)).lower())
+
+
+def _normalize_show_time(value):
+    """
+    把场次时间转换为分钟数，如 "2025-07-05 19:30" 与 "2025/07/05 19:30:00" 相同
+
+    只有时分（如 "19:30"）时无法区分不同日期的同一时刻场次，返回None
+    """
+    show_time_ms = parse_show_time_ms(value)
+    if show_time_ms is None:
+        return None
+    return show_time_ms // 60000
+
+
+def show_signature(order):
+    """
+    计算订单的场次签名：城市、影院、影厅、电影、场次时间和票数归一化后的组合
+
+    Args:
+        order (Order | dict): 标准化订单
+
+    Returns:
+        tuple: 场次签名；缺少完整的场次日期时间或影院名称时无法可靠判断，返回None
+    """
+    show_time = _normalize_show_time(order.get('show_time'))
+    cinema = _normalize_text(order.get('cinema_name'))
+    if show_time is None or not cinema:
+        return None
+    return (
+        _normalize_text(order.get('city')),
+        cinema,
+        _normalize_text(order.get('hall_type')),
+        _normalize_text(order.get('movie_name')),
+        show_time,
+        order.get('seat_count', 1)
+    )
+
+
+class IndexEntry:
+    """索引中的一条已匹配订单"""
+
+    __slots__ = ('platform', 'order_id', 'total_profit', 'signature', 'notified')
+
+    def __init__(self, platform: str, order_id: str, total_profit: float, signature: tuple):
+        self.platform = platform
+        self.order_id = order_id
+        self.total_profit = total_profit
+        self.signature = signature
+        # 该订单当前是否作为这个场次的机会显示（被利润更高的订单取代后为False）
+        self.notified = False
+
+    def as_dict(self) -> dict:
+        return {'platform': self.platform, 'order_id': self.order_id, 'total_profit': self.total_profit}
+
+
+class CrossPlatformIndex:
+    """
+    跨平台场次索引
+
+    以场次签名为键保存各平台已匹配规则的订单。一个轮询周期内各平台匹配成功的订单一起交给 route_batch()，
+    按场次比较：其他平台（已登记的或本批的）利润不低于本订单时不再提醒，否则提醒并注明其他平台的利润；
+    之前已提醒的其他平台订单被利润更高的订单取代时，在决策中返回，界面据此替换原来的那一行。
+    订单从平台挂单簿中移除时（被抢走或撤回），通过挂单簿的订阅事件同步移出索引。
+    """
+
+    def __init__(self):
+        """初始化跨平台场次索引"""
+        # 场次签名 -> {(平台, 订单ID): IndexEntry}
+        self._by_signature = {}
+        # (平台, 订单ID) -> IndexEntry
+        self._by_order = {}
+        # 平台 -> 缺少完整场次时间的订单数，出现过完整场次时间的平台记为None、不再统计
+        self._missing_show_time = {}
+
+        # 统计计数
+        self.duplicates = 0
+        self.suppressed = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._by_order)
+
+    def attach(self, order_book):
+        """
+        订阅平台挂单簿，订单移除时同步移出索引
+
+        Args:
+            order_book (OrderBook): 平台挂单簿
+        """
+        order_book.subscribe(self._on_book_diff)
+
+    def _on_book_diff(self, diff):
+        """挂单簿变化回调：移除已下架的订单"""
+        for entry in diff.removed:
+            if self.discard(diff.platform, entry.order_id):
+                self.expired += 1
+
+    def discard(self, platform_name: str, order_id: str) -> bool:
+        """
+        把订单移出索引（订单下架，或调价后不再匹配规则）
+
+        Args:
+            platform_name (str): 平台名称
+            order_id (str): 订单ID
+
+        Returns:
+            bool: 订单在索引中时返回True
+        """
+        entry = self._by_order.pop((platform_name, order_id), None)
+        if entry is None:
+            return False
+        entries = self._by_signature.get(entry.signature)
+        if entries is not None:
+            entries.pop((platform_name, order_id), None)
+            if not entries:
+                del self._by_signature[entry.signature]
+        return True
+
+    def route(self, platform_name: str, order, total_profit: float):
+        """
+        登记一个匹配成功的订单，并判断是否需要提醒（只有一个订单的 route_batch()）
+
+        Args:
+            platform_name (str): 平台名称
+            order (Order | dict): 标准化订单
+            total_profit (float): 规则计算出的总利润
+
+        Returns:
+            tuple: (是否提醒, 其他平台同一场次的订单列表)
+        """
+        decision = self.route_batch([(platform_name, order, total_profit)])[0]
+        return decision['notify'], decision['alternatives']
+
+    def route_batch(self, matches: list) -> list:
+        """
+        登记一个轮询周期内所有平台匹配成功的订单，按场次决定哪些需要提醒
+
+        同一场次中，订单的利润低于其他平台已登记的订单（相同也算），或低于本批中其他平台的订单
+        （相同时先出现的优先）时不提醒；需要提醒的订单取代该场次中之前已提醒的其他平台订单。
+        同一平台同一场次的不同订单是不同的机会，互不影响。
+
+        Args:
+            matches (list): [(平台名称, 标准化订单, 总利润), ...]
+
+        Returns:
+            list: 与 matches 一一对应的决策，每项为 {'notify', 'alternatives', 'replaces'}：
+                  alternatives 是其他平台同一场次的订单，按利润从高到低排列，不提醒时第一项就是利润更高（或相同）的订单；
+                  replaces 是被本订单取代、界面上应替换掉的之前已提醒的订单；
+                  两个列表的每项均为 {'platform', 'order_id', 'total_profit'}
+        """
+        # 调价后重新匹配的订单先移除旧的登记
+        for platform_name, order, total_profit in matches:
+            self.discard(platform_name, order.get('order_id'))
+
+        decisions = [None] * len(matches)
+        # 场次签名 -> [(本批中的位置, 新登记的订单)]
+        batch = {}
+        for position, (platform_name, order, total_profit) in enumerate(matches):
+            signature = show_signature(order)
+            if signature is None:
+                self._count_missing_show_time(platform_name, order)
+                decisions[position] = {'notify': True, 'alternatives': [], 'replaces': []}
+                continue
+            self._missing_show_time[platform_name] = None
+            batch.setdefault(signature, []).append(
+                (position, IndexEntry(platform_name, order.get('order_id'), total_profit, signature))
+            )
+
+        for signature, candidates in batch.items():
+            existing = list(self._by_signature.get(signature, {}).values())
+            for position, entry in candidates:
+                decisions[position] = self._decide(entry, position, existing, candidates)
+            entries = self._by_signature.setdefault(signature, {})
+            for position, entry in candidates:
+                entries[(entry.platform, entry.order_id)] = entry
+                self._by_order[(entry.platform, entry.order_id)] = entry
+        return decisions
+
+    def _decide(self, entry: IndexEntry, position: int, existing: list, candidates: list) -> dict:
+        """决定本批中的一个订单是否提醒，需要提醒时把它标记为该场次当前显示的机会"""
+        others = [other for other in existing if other.platform != entry.platform]
+        rivals = [(other_position, other) for other_position, other in candidates if other.platform != entry.platform]
+        alternatives = sorted(others + [other for _, other in rivals], key=lambda other: other.total_profit, reverse=True)
+        if not alternatives:
+            entry.notified = True
+            return {'notify': True, 'alternatives': [], 'replaces': []}
+
+        self.duplicates += 1
+        beaten = any(other.total_profit >= entry.total_profit for other in others) or any(
+            other.total_profit > entry.total_profit or (other.total_profit == entry.total_profit and other_position < position)
+            for other_position, other in rivals
+        )
+        if beaten:
+            self.suppressed += 1
+            logging.debug(f"{entry.platform}平台订单 {entry.order_id} 与{alternatives[0].platform}平台订单 "
+                          f"{alternatives[0].order_id} 为同一场次，利润不高于该订单，合并为一条机会")
+            return {'notify': False, 'alternatives': [other.as_dict() for other in alternatives], 'replaces': []}
+
+        replaced = [other for other in others if other.notified]
+        for other in replaced:
+            other.notified = False
+        entry.notified = True
+        return {
+            'notify': True,
+            'alternatives': [other.as_dict() for other in alternatives],
+            'replaces': [other.as_dict() for other in replaced]
+        }
+
+    def _count_missing_show_time(self, platform_name: str, order):
+        """统计缺少完整场次时间的订单，某个平台始终没有时警告一次：该平台的订单不参与跨平台去重"""
+        if _normalize_show_time(order.get('show_time')) is not None:
+            return
+        missing = self._missing_show_time.get(platform_name, 0)
+        if missing is None:
+            return
+        missing += 1
+        self._missing_show_time[platform_name] = missing
+        if missing == _MISSING_SHOW_TIME_WARN_AFTER:
+            logging.warning(f"{platform_name}平台已有 {missing} 个匹配成功的订单都没有完整的场次日期时间"
+                            f"（示例: {order.get('show_time')!r}），跨平台去重对该平台不起作用，"
+                            f"请对照平台实际响应检查 registry.py 中 show_time 的字段名")
+
+    def get_metrics(self) -> dict:
+        """
+        获取索引统计
+
+        Returns:
+            dict: 索引中的订单数和场次数、发现的跨平台重复数、合并（不提醒）数和随挂单簿移除数
+        """
+        return {
+            'size': len(self._by_order),
+            'shows': len(self._by_signature),
+            'duplicates': self.duplicates,
+            'suppressed': self.suppressed,
+            'expired': self.expired
+        }
@@ -4,11 +4,18 @@
 数据库管理模块 - 负责SQLite数据库的所有操作
 """
 
+import os
+import re
+import queue
 import sqlite3
-import json
 import logging
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
+from urllib.request import pathname2url
+from . import raw_codec
+from config import DB_READ_POOL_SIZE, DB_READ_POOL_TIMEOUT
 
 # 导入时区相关模块
 try:
@@ -24,54 +31,174 @@ except ImportError:
     ZONEINFO_AVAILABLE = False
 
 
-def get_china_time() -> str:
+# 中国标准时间（UTC+8，无夏令时），用于解析平台返回的场次时间和迁移旧数据
+CHINA_TZ = timezone(timedelta(hours=8))
+_NON_DIGIT = re.compile(r'\D+')
+
+def now_ms() -> int:
+    """当前时间的Unix毫秒时间戳"""
+    return int(datetime.now().timestamp() * 1000)
+
+
+def parse_show_time_ms(value):
     """
-    获取当前的中国时区时间字符串
+    把平台返回的场次时间（中国时间）转换为Unix毫秒时间戳
+
+    只依赖其中的数字，"2025-07-05 19:30"、"2025/07/05 19:30:00" 都能解析。
+
+    Args:
+        value (str): 场次时间
+
+    Returns:
+        int: 毫秒时间戳；没有完整的年月日时分时返回None
+    """
+    if not value:
+        return None
+    digits = _NON_DIGIT.sub('', str(value))
+    if len(digits) < 12:
+        return None
+    try:
+        show_time = datetime(
+            int(digits[0:4]), int(digits[4:6]), int(digits[6:8]),
+            int(digits[8:10]), int(digits[10:12]), int(digits[12:14] or 0),
+            tzinfo=CHINA_TZ
+        )
+    except ValueError:
+        return None
+    return int(show_time.timestamp() * 1000)
+
+
+def format_time_ms(timestamp_ms) -> str:
+    """
+    把毫秒时间戳格式化为中国时区时间字符串，供接口输出时使用
+
+    Args:
+        timestamp_ms (int): 毫秒时间戳
+
+    Returns:
+        str: YYYY-MM-DD HH:MM:SS，时间戳为空时返回空字符串
+    """
+    if timestamp_ms is None:
+        return ''
+    return datetime.fromtimestamp(timestamp_ms / 1000, CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def get_china_time(timestamp: float = None) -> str:
+    """
+    获取中国时区时间字符串
+
+    Args:
+        timestamp (float): Unix时间戳，默认为当前时间
 
     Returns:
         str: 格式化的中国时区时间字符串 (YYYY-MM-DD HH:MM:SS)
     """
+    if timestamp is None:
+        timestamp = datetime.now().timestamp()
+
     try:
         # 优先使用pytz，因为它更稳定
         if PYTZ_AVAILABLE:
             china_tz = pytz.timezone('Asia/Shanghai')
-            china_time = datetime.now(china_tz)
+            china_time = datetime.fromtimestamp(timestamp, china_tz)
             return china_time.strftime('%Y-%m-%d %H:%M:%S')
         elif ZONEINFO_AVAILABLE:
             # 使用zoneinfo (Python 3.9+)
-            china_time = datetime.now(ZoneInfo("Asia/Shanghai"))
+            china_time = datetime.fromtimestamp(timestamp, ZoneInfo("Asia/Shanghai"))
             return china_time.strftime('%Y-%m-%d %H:%M:%S')
         else:
             # 如果都不可用，使用本地时间
             logging.info("时区库不可用，使用本地时间")
-            return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
     except Exception as e:
         logging.warning(f"获取中国时区时间失败，使用本地时间: {e}")
         # 如果时区设置失败，使用本地时间
-        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
 
 class DatabaseManager:
     """数据库管理类，负责订单数据的存储和查询"""
-    
-    def __init__(self, db_path: str = "orders.db"):
+
+    # 新订单：已存在时忽略
+    _INSERT_SQL = """
+    INSERT OR IGNORE INTO orders (
+        order_id, bidding_price, seat_count, city, cinema_name, hall_type, movie_name,
+        show_timestamp, platform, raw_data, created_at, created_at_ms, show_time_ms
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    # 调价订单：记录不存在时插入，存在时更新价格相关字段（保留首次入库时间）
+    _UPSERT_SQL = """
+    INSERT INTO orders (
+        order_id, bidding_price, seat_count, city, cinema_name, hall_type, movie_name,
+        show_timestamp, platform, raw_data, created_at, created_at_ms, show_time_ms
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(order_id) DO UPDATE SET
+        bidding_price = excluded.bidding_price,
+        seat_count = excluded.seat_count
+    """
+
+    # 原始订单单独保存在 order_raw 表中（压缩后的二进制），orders.raw_data 列只为兼容旧版本保留，写入空字符串
+    _RAW_INSERT_SQL = "INSERT OR IGNORE INTO order_raw (order_id, data) VALUES (?, ?)"
+    _RAW_UPSERT_SQL = """
+    INSERT INTO order_raw (order_id, data) VALUES (?, ?)
+    ON CONFLICT(order_id) DO UPDATE SET data = excluded.data
+    """
+
+    # 查询订单时返回的列（时间以毫秒时间戳返回，由接口层格式化；原始订单只在调用方需要时才查询和解压）
+    _ORDER_COLUMNS = (
+        'id', 'order_id', 'bidding_price', 'seat_count', 'city', 'cinema_name', 'hall_type',
+        'movie_name', 'show_timestamp', 'show_time_ms', 'platform', 'created_at_ms'
+    )
+
+    # 结构迁移：(目标版本, 说明, 迁移方法名)，按版本顺序执行
+    _MIGRATIONS = (
+        (1, '增加毫秒时间戳列 created_at_ms/show_time_ms 及索引', '_migrate_v1'),
+        (2, '原始订单压缩后移到 order_raw 表', '_migrate_v2'),
+        (3, '增加由触发器维护的订单统计汇总表', '_migrate_v3'),
+        (4, '回填无法解析入库时间的订单的 created_at_ms', '_migrate_v4'),
+    )
+
+    # 汇总表的统计维度：维度名 -> orders 表中的列
+    _STATS_DIMENSIONS = {'platform': 'platform', 'city': 'city', 'cinema': 'cinema_name'}
+
+    # 按小时汇总时每个时间段的毫秒数
+    _HOUR_MS = 3600 * 1000
+
+    def __init__(self, db_path: str = "orders.db", read_only: bool = False):
         """
         初始化数据库管理器
         
         Args:
             db_path (str): 数据库文件路径，默认为 orders.db
+            read_only (bool): 以只读模式（mode=ro）打开，不创建数据表，数据库文件必须已经存在
         """
         self.db_path = db_path
+        self.read_only = read_only
         self.connection = None
+        # 迁移释放了大量空间时，迁移完成后执行一次 VACUUM 缩小数据库文件
+        self._vacuum_after_migrate = False
         
         try:
+            if read_only:
+                # 只读连接：WAL模式下与写连接互不阻塞
+                uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+                self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self.connection.row_factory = sqlite3.Row
+                self.connection.execute("PRAGMA busy_timeout=5000")
+                return
+
             # 连接到SQLite数据库
             self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
             self.connection.row_factory = sqlite3.Row  # 使查询结果可以像字典一样访问
+
+            # WAL模式：读连接不会被写事务阻塞；synchronous=NORMAL 时提交不等待fsync，只在检查点时同步
+            self._configure_connection()
             
-            # 创建数据表
+            # 创建数据表，并把旧版本数据库迁移到当前结构
             self._create_table()
+            self._migrate()
             
             logging.info(f"数据库管理器初始化完成，数据库文件: {self.db_path}")
             
@@ -79,6 +206,18 @@ class DatabaseManager:
             logging.error(f"数据库初始化失败: {e}")
             raise
     
+    def _configure_connection(self):
+        """启用WAL日志模式并设置同步级别和锁等待时间"""
+        try:
+            journal_mode = self.connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if str(journal_mode).lower() != 'wal':
+                logging.warning(f"数据库未能切换到WAL模式，当前日志模式: {journal_mode}")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            # 其他连接持有写锁时最多等待5秒，而不是立即报 database is locked
+            self.connection.execute("PRAGMA busy_timeout=5000")
+        except sqlite3.Error as e:
+            logging.warning(f"设置数据库连接参数失败: {e}")
+
     def _create_table(self):
         """创建订单数据表"""
         try:
@@ -107,7 +246,6 @@ class DatabaseManager:
             # 创建索引以提高查询性能
             index_sqls = [
                 "CREATE INDEX IF NOT EXISTS idx_order_id ON orders(order_id)",
-                "CREATE INDEX IF NOT EXISTS idx_created_at ON orders(created_at)",
                 "CREATE INDEX IF NOT EXISTS idx_cinema_name ON orders(cinema_name)",
                 "CREATE INDEX IF NOT EXISTS idx_city ON orders(city)"
             ]
@@ -122,131 +260,469 @@ class DatabaseManager:
             logging.error(f"创建数据表失败: {e}")
             raise
     
+    def _migrate(self):
+        """按 PRAGMA user_version 依次执行尚未执行的结构迁移，每个版本在一个事务中完成"""
+        for version, description, method_name in self._MIGRATIONS:
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+
+            # 立即获取写锁，多个进程同时启动时只有一个执行迁移
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                if self.connection.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    self.connection.rollback()
+                    continue
+                logging.info(f"数据库迁移到版本 {version}: {description}")
+                getattr(self, method_name)()
+                self.connection.execute(f"PRAGMA user_version = {version}")
+                self.connection.commit()
+            except Exception as e:
+                self.connection.rollback()
+                logging.error(f"数据库迁移到版本 {version} 失败: {e}")
+                raise
+
+        if self._vacuum_after_migrate:
+            self._vacuum_after_migrate = False
+            try:
+                self.connection.execute("VACUUM")
+                logging.info("数据库迁移后已执行 VACUUM")
+            except sqlite3.Error as e:
+                # 其他连接正在读写时无法执行，不影响使用，空闲页会被后续写入复用
+                logging.warning(f"数据库迁移后执行 VACUUM 失败: {e}")
+
+    def _migrate_v1(self):
+        """增加毫秒时间戳列，回填已有数据，并把按时间排序的索引换成整数列"""
+        cursor = self.connection.cursor()
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(orders)")}
+        if 'created_at_ms' not in columns:
+            cursor.execute("ALTER TABLE orders ADD COLUMN created_at_ms INTEGER")
+        if 'show_time_ms' not in columns:
+            cursor.execute("ALTER TABLE orders ADD COLUMN show_time_ms INTEGER")
+
+        # created_at 是中国时间字符串，按UTC解析后减去8小时
+        cursor.execute("""
+            UPDATE orders
+            SET created_at_ms = (CAST(strftime('%s', created_at) AS INTEGER) - 8 * 3600) * 1000
+            WHERE created_at_ms IS NULL AND strftime('%s', created_at) IS NOT NULL
+        """)
+
+        # 场次时间格式不固定，在Python中解析
+        rows = cursor.execute(
+            "SELECT id, show_timestamp FROM orders WHERE show_time_ms IS NULL AND show_timestamp != ''"
+        ).fetchall()
+        updates = [(parse_show_time_ms(show_timestamp), row_id) for row_id, show_timestamp in rows]
+        cursor.executemany(
+            "UPDATE orders SET show_time_ms = ? WHERE id = ?",
+            [update for update in updates if update[0] is not None]
+        )
+
+        cursor.execute("DROP INDEX IF EXISTS idx_created_at")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at_ms ON orders(created_at_ms)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_platform_created_at_ms ON orders(platform, created_at_ms)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_show_time_ms ON orders(show_time_ms)")
+        logging.info(f"已回填 {len(rows)} 条订单的场次时间戳")
+
+    def _migrate_v2(self):
+        """创建 order_raw 表，把 orders.raw_data 中的JSON文本压缩后移过去，并清空原列"""
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS order_raw (
+                order_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            )
+        """)
+
+        # 直接压缩原有的JSON文本，不解析；分批读取避免一次载入全部数据
+        reader = self.connection.cursor()
+        reader.execute("SELECT order_id, raw_data FROM orders WHERE raw_data != ''")
+        moved = 0
+        while True:
+            rows = reader.fetchmany(1000)
+            if not rows:
+                break
+            cursor.executemany(
+                "INSERT OR REPLACE INTO order_raw (order_id, data) VALUES (?, ?)",
+                [(order_id, raw_codec.compress_json(raw_data.encode('utf-8'))) for order_id, raw_data in rows]
+            )
+            moved += len(rows)
+
+        cursor.execute("UPDATE orders SET raw_data = '' WHERE raw_data != ''")
+        self._vacuum_after_migrate = moved > 0
+        logging.info(f"已压缩并迁移 {moved} 条订单的原始数据")
+
+    def _migrate_v3(self):
+        """
+        创建订单统计汇总表和维护汇总的触发器，并用已有订单回填
+
+        order_stats 按 (维度, 平台, 值) 保存订单数，维度为 platform/city/cinema；
+        order_stats_hourly 按 (入库小时, 平台) 保存订单数。订单插入和删除时由触发器在同一个事务中增减计数，
+        统计查询只读汇总表，不再扫描 orders 表。订单入库后只会更新价格和票数，不修改这些统计列。
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS order_stats (
+                dimension TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                value TEXT NOT NULL,
+                order_count INTEGER NOT NULL,
+                PRIMARY KEY (dimension, platform, value)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS order_stats_hourly (
+                hour_ms INTEGER NOT NULL,
+                platform TEXT NOT NULL,
+                order_count INTEGER NOT NULL,
+                PRIMARY KEY (hour_ms, platform)
+            ) WITHOUT ROWID
+        """)
+
+        dimension_rows = ', '.join(
+            f"('{dimension}', NEW.platform, NEW.{column}, 1)" for dimension, column in self._STATS_DIMENSIONS.items()
+        )
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_orders_stats_insert AFTER INSERT ON orders
+            BEGIN
+                INSERT INTO order_stats (dimension, platform, value, order_count) VALUES {dimension_rows}
+                ON CONFLICT (dimension, platform, value) DO UPDATE SET order_count = order_count + 1;
+                INSERT INTO order_stats_hourly (hour_ms, platform, order_count)
+                SELECT NEW.created_at_ms / {self._HOUR_MS} * {self._HOUR_MS}, NEW.platform, 1
+                WHERE NEW.created_at_ms IS NOT NULL
+                ON CONFLICT (hour_ms, platform) DO UPDATE SET order_count = order_count + 1;
+            END
+        """)
+
+        dimension_matches = ' OR '.join(
+            f"(dimension = '{dimension}' AND value = OLD.{column})" for dimension, column in self._STATS_DIMENSIONS.items()
+        )
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_orders_stats_delete AFTER DELETE ON orders
+            BEGIN
+                UPDATE order_stats SET order_count = order_count - 1
+                WHERE platform = OLD.platform AND ({dimension_matches});
+                UPDATE order_stats_hourly SET order_count = order_count - 1
+                WHERE hour_ms = OLD.created_at_ms / {self._HOUR_MS} * {self._HOUR_MS} AND platform = OLD.platform;
+                DELETE FROM order_stats WHERE platform = OLD.platform AND order_count <= 0;
+                DELETE FROM order_stats_hourly WHERE platform = OLD.platform AND order_count <= 0;
+            END
+        """)
+
+        # 回填已有订单（触发器创建前的数据）
+        cursor.execute("DELETE FROM order_stats")
+        cursor.execute("DELETE FROM order_stats_hourly")
+        for dimension, column in self._STATS_DIMENSIONS.items():
+            cursor.execute(
+                f"""
+                INSERT INTO order_stats (dimension, platform, value, order_count)
+                SELECT ?, platform, {column}, COUNT(*) FROM orders GROUP BY platform, {column}
+                """,
+                (dimension,)
+            )
+        cursor.execute(f"""
+            INSERT INTO order_stats_hourly (hour_ms, platform, order_count)
+            SELECT created_at_ms / {self._HOUR_MS} * {self._HOUR_MS} AS hour_ms, platform, COUNT(*) FROM orders
+            WHERE created_at_ms IS NOT NULL
+            GROUP BY hour_ms, platform
+        """)
+
+    def _migrate_v4(self):
+        """
+        回填 created_at_ms 仍为空的订单（旧版本中 created_at 无法解析的记录）
+
+        键集分页的 (created_at_ms, id) < (?, ?) 条件不会选中空值，这些订单在分页中永远取不到。
+        按插入顺序取前一条有入库时间的订单的时间（没有时为0），并把它们计入按小时汇总。
+        """
+        cursor = self.connection.cursor()
+        row_ids = [row[0] for row in cursor.execute("SELECT id FROM orders WHERE created_at_ms IS NULL ORDER BY id")]
+        if not row_ids:
+            return
+
+        cursor.execute("""
+            UPDATE orders
+            SET created_at_ms = COALESCE((
+                SELECT previous.created_at_ms FROM orders AS previous
+                WHERE previous.id < orders.id AND previous.created_at_ms IS NOT NULL
+                ORDER BY previous.id DESC LIMIT 1
+            ), 0)
+            WHERE created_at_ms IS NULL
+        """)
+
+        hourly = {}
+        for row_id in row_ids:
+            created_at_ms, platform = cursor.execute(
+                "SELECT created_at_ms, platform FROM orders WHERE id = ?", (row_id,)
+            ).fetchone()
+            key = (created_at_ms // self._HOUR_MS * self._HOUR_MS, platform)
+            hourly[key] = hourly.get(key, 0) + 1
+        cursor.executemany(
+            """
+            INSERT INTO order_stats_hourly (hour_ms, platform, order_count) VALUES (?, ?, ?)
+            ON CONFLICT (hour_ms, platform) DO UPDATE SET order_count = order_count + excluded.order_count
+            """,
+            [(hour_ms, platform, count) for (hour_ms, platform), count in hourly.items()]
+        )
+        logging.info(f"已回填 {len(row_ids)} 条订单的入库时间戳")
+
     def save_orders(self, orders: List[Dict[str, Any]], platform_name: str) -> int:
         """
         保存订单列表到数据库
 
+        新订单已存在时忽略；带 updated 标记的订单（调价）更新已有记录的价格、票数和原始数据。
+        原始数据压缩后写入 order_raw 表，列表查询不读取。
+        整批订单用 executemany 在一个事务中写入，只提交一次；批量写入失败时回退为逐条写入，
+        只跳过出错的订单。
+
         Args:
             orders (List[Dict[str, Any]]): 标准化后的订单列表
             platform_name (str): 平台名称
 
         Returns:
-            int: 成功插入的订单数量
+            int: 成功插入或更新的订单数量
         """
         if not orders:
             return 0
-        
+
+        # 同一批订单使用同一个入库时间（created_at 文本列只为兼容旧版本保留，排序和范围查询使用 created_at_ms）
+        created_at_ms = now_ms()
+        china_time = format_time_ms(created_at_ms)
+        insert_rows = []
+        upsert_rows = []
+        raw_insert_rows = []
+        raw_upsert_rows = []
+        for order in orders:
+            try:
+                show_timestamp = order.get('show_time', order.get('timestamp', ''))
+                row = (
+                    order.get('order_id', ''),
+                    float(order.get('bidding_price', 0.0)),
+                    int(order.get('seat_count', 1)),
+                    order.get('city', ''),
+                    order.get('cinema_name', ''),
+                    order.get('hall_type', ''),
+                    order.get('movie_name', ''),
+                    show_timestamp,
+                    platform_name,
+                    '',
+                    china_time,
+                    created_at_ms,
+                    parse_show_time_ms(show_timestamp)
+                )
+                # 原始数据压缩后写入 order_raw 表
+                raw_row = (row[0], raw_codec.encode_raw(order.get('raw_data', {})))
+            except Exception as e:
+                logging.warning(f"插入订单 {order.get('order_id', 'unknown')} 失败: {e}")
+                continue
+            # 调价订单执行插入或更新
+            if order.get('updated', False):
+                upsert_rows.append(row)
+                raw_upsert_rows.append(raw_row)
+            else:
+                insert_rows.append(row)
+                raw_insert_rows.append(raw_row)
+
         try:
-            cursor = self.connection.cursor()
-            
-            # 准备插入语句
-            insert_sql = """
-            INSERT OR IGNORE INTO orders (
-                order_id, bidding_price, seat_count, city, cinema_name,
-                hall_type, movie_name, show_timestamp, platform, raw_data, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            inserted_count = 0
-            
-            for order in orders:
-                try:
-                    # 提取订单数据
-                    order_id = order.get('order_id', '')
-                    bidding_price = float(order.get('bidding_price', 0.0))
-                    seat_count = int(order.get('seat_count', 1))
-                    city = order.get('city', '')
-                    cinema_name = order.get('cinema_name', '')
-                    hall_type = order.get('hall_type', '')
-                    movie_name = order.get('movie_name', '')
-                    show_timestamp = order.get('show_time', order.get('timestamp', ''))
-
-                    # 将原始数据转换为JSON字符串
-                    raw_data = json.dumps(order.get('raw_data', {}), ensure_ascii=False)
-
-                    # 获取当前的中国时区时间
-                    china_time = get_china_time()
-
-                    # 执行插入
-                    cursor.execute(insert_sql, (
-                        order_id, bidding_price, seat_count, city, cinema_name,
-                        hall_type, movie_name, show_timestamp, platform_name, raw_data, china_time
-                    ))
-                    
-                    # 检查是否实际插入了数据（rowcount > 0 表示插入成功）
-                    if cursor.rowcount > 0:
-                        inserted_count += 1
-                        
-                except Exception as e:
-                    logging.warning(f"插入订单 {order.get('order_id', 'unknown')} 失败: {e}")
-                    continue
-            
+            # 显式开启事务，新订单和调价订单在同一个事务中写入
+            if not self.connection.in_transaction:
+                self.connection.execute("BEGIN")
+            inserted_count = self._execute_rows(self._INSERT_SQL, insert_rows)
+            updated_count = self._execute_rows(self._UPSERT_SQL, upsert_rows)
+            self._execute_rows(self._RAW_INSERT_SQL, raw_insert_rows)
+            self._execute_rows(self._RAW_UPSERT_SQL, raw_upsert_rows)
+
             # 提交事务
             self.connection.commit()
-            
+
             if inserted_count > 0:
                 logging.info(f"✅ 成功保存 {inserted_count} 条新订单到数据库")
-            else:
+            if updated_count > 0:
+                logging.info(f"✅ 成功更新 {updated_count} 条调价订单")
+            if inserted_count == 0 and updated_count == 0:
                 logging.info("ℹ️ 本次轮询无新订单，未更新数据库")
-            
-            return inserted_count
-            
+
+            return inserted_count + updated_count
+
         except Exception as e:
             logging.error(f"保存订单到数据库失败: {e}")
             # 回滚事务
             if self.connection:
                 self.connection.rollback()
             return 0
-    
-    def get_recent_orders(self, limit: int = 100) -> List[Dict[str, Any]]:
+
+    def _execute_rows(self, sql: str, rows: list) -> int:
+        """
+        在当前事务中批量执行写入语句（不提交）
+
+        Args:
+            sql (str): 插入语句
+            rows (list): 参数元组列表
+
+        Returns:
+            int: 实际插入或更新的行数
+        """
+        if not rows:
+            return 0
+
+        # 用 rowcount 统计本语句写入的行数（不包括统计汇总触发器产生的改动）
+        cursor = self.connection.cursor()
+        try:
+            # 保存点：批量写入失败时只撤销这一批，再逐条重试
+            cursor.execute("SAVEPOINT save_orders_batch")
+            cursor.executemany(sql, rows)
+            changes = cursor.rowcount
+            cursor.execute("RELEASE save_orders_batch")
+            return changes
+        except sqlite3.Error as e:
+            cursor.execute("ROLLBACK TO save_orders_batch")
+            cursor.execute("RELEASE save_orders_batch")
+            logging.warning(f"批量写入订单失败，改为逐条写入: {e}")
+
+        changes = 0
+        for row in rows:
+            try:
+                cursor.execute(sql, row)
+                changes += cursor.rowcount
+            except sqlite3.Error as e:
+                logging.warning(f"插入订单 {row[0]} 失败: {e}")
+        return changes
+
+    def _select_orders_sql(self, include_raw: bool) -> str:
+        """订单查询的 SELECT ... FROM 部分；include_raw 时关联 order_raw 表，多查询一列压缩的原始数据"""
+        columns = ', '.join(f'orders.{column}' for column in self._ORDER_COLUMNS)
+        if not include_raw:
+            return f"SELECT {columns} FROM orders"
+        return (f"SELECT {columns}, order_raw.data FROM orders "
+                f"LEFT JOIN order_raw ON order_raw.order_id = orders.order_id")
+
+    def _rows_to_orders(self, rows, include_raw: bool = False) -> List[Dict[str, Any]]:
+        """把查询结果转换为订单字典列表；include_raw 时解压最后一列为 raw_data"""
+        if not include_raw:
+            return [dict(zip(self._ORDER_COLUMNS, row)) for row in rows]
+
+        orders = []
+        for row in rows:
+            order_dict = dict(zip(self._ORDER_COLUMNS, row))
+            order_dict['raw_data'] = raw_codec.decode_raw(row[-1])
+            orders.append(order_dict)
+        return orders
+
+    def get_recent_orders(self, limit: int = 100, include_raw: bool = False) -> List[Dict[str, Any]]:
         """
         获取最近的订单记录
         
         Args:
             limit (int): 返回的记录数量限制
+            include_raw (bool): 是否同时返回解压后的原始订单（raw_data）
             
         Returns:
-            List[Dict[str, Any]]: 订单记录列表
+            List[Dict[str, Any]]: 订单记录列表，按入库时间倒序，时间字段为毫秒时间戳
         """
         try:
             cursor = self.connection.cursor()
-            
-            query_sql = """
-            SELECT * FROM orders 
-            ORDER BY created_at DESC 
-            LIMIT ?
-            """
-            
-            cursor.execute(query_sql, (limit,))
-            rows = cursor.fetchall()
-            
-            # 转换为字典列表
-            orders = []
-            for row in rows:
-                order_dict = dict(row)
-                # 解析raw_data JSON字符串
-                try:
-                    order_dict['raw_data'] = json.loads(order_dict['raw_data'])
-                except:
-                    order_dict['raw_data'] = {}
-                orders.append(order_dict)
-            
-            return orders
+            cursor.execute(
+                f"""
+                {self._select_orders_sql(include_raw)}
+                ORDER BY orders.created_at_ms DESC, orders.id DESC
+                LIMIT ?
+                """,
+                (limit,)
+            )
+            return self._rows_to_orders(cursor.fetchall(), include_raw)
             
         except Exception as e:
             logging.error(f"查询最近订单失败: {e}")
             return []
-    
+
+    def get_orders_page(self, limit: int = 100, before: tuple = None, platform_name: str = None,
+                        include_raw: bool = False):
+        """
+        按入库时间倒序分页查询订单（键集分页）
+
+        以上一页最后一条订单的 (created_at_ms, id) 作为游标，只查询排在它之后的订单，
+        走 created_at_ms（或 platform, created_at_ms）索引的范围扫描，翻页开销与表大小和页码无关。
+
+        Args:
+            limit (int): 每页数量
+            before (tuple): 游标 (created_at_ms, id)，为None时返回第一页
+            platform_name (str): 只查询该平台的订单，为None时查询全部平台
+            include_raw (bool): 是否同时返回解压后的原始订单（raw_data）
+
+        Returns:
+            tuple: (订单列表, 下一页游标)；没有更多订单时游标为None
+        """
+        conditions = []
+        params = []
+        if platform_name:
+            conditions.append("orders.platform = ?")
+            params.append(platform_name)
+        if before is not None:
+            conditions.append("(orders.created_at_ms, orders.id) < (?, ?)")
+            params.extend(before)
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        try:
+            cursor = self.connection.cursor()
+            # 多查询一条，用于判断是否还有下一页
+            cursor.execute(
+                f"""
+                {self._select_orders_sql(include_raw)}
+                {where_sql}
+                ORDER BY orders.created_at_ms DESC, orders.id DESC
+                LIMIT ?
+                """,
+                (*params, limit + 1)
+            )
+            orders = self._rows_to_orders(cursor.fetchall(), include_raw)
+
+        except Exception as e:
+            logging.error(f"分页查询订单失败: {e}")
+            return [], None
+
+        if len(orders) <= limit:
+            return orders, None
+        del orders[limit:]
+        return orders, (orders[-1]['created_at_ms'], orders[-1]['id'])
+
+    def get_orders_since(self, since_id: int, limit: int = 1000, include_raw: bool = False) -> List[Dict[str, Any]]:
+        """
+        增量查询：返回ID大于 since_id 的订单（客户端已有的最大ID之后新入库的订单）
+
+        ID按入库顺序递增，走主键范围扫描。调价只更新已有记录、不产生新ID，不在增量结果中。
+
+        Args:
+            since_id (int): 客户端已有的最大订单ID
+            limit (int): 返回的记录数量限制
+            include_raw (bool): 是否同时返回解压后的原始订单（raw_data）
+
+        Returns:
+            List[Dict[str, Any]]: 订单记录列表，按ID升序
+        """
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"""
+                {self._select_orders_sql(include_raw)}
+                WHERE orders.id > ?
+                ORDER BY orders.id
+                LIMIT ?
+                """,
+                (since_id, limit)
+            )
+            return self._rows_to_orders(cursor.fetchall(), include_raw)
+
+        except Exception as e:
+            logging.error(f"增量查询订单失败: {e}")
+            return []
+
     def get_orders_count(self) -> int:
         """
-        获取数据库中的订单总数
+        获取数据库中的订单总数（读取统计汇总表中各平台的订单数，不扫描 orders 表）
 
         Returns:
             int: 订单总数
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM orders")
+            cursor.execute("SELECT COALESCE(SUM(order_count), 0) FROM order_stats WHERE dimension = 'platform'")
             count = cursor.fetchone()[0]
             return count
 
@@ -254,52 +730,111 @@ class DatabaseManager:
             logging.error(f"查询订单总数失败: {e}")
             return 0
 
-    def get_all_orders_as_dicts(self) -> List[Dict[str, Any]]:
+    def get_order_stats(self, platform_name: str = None, top: int = 20, hours: int = 24) -> Dict[str, Any]:
         """
-        获取数据库中的所有订单数据，并转换为字典列表
+        获取订单统计（只读取统计汇总表，查询开销与汇总行数有关，与订单总数无关）
+
+        Args:
+            platform_name (str): 只统计该平台，为None时统计全部平台
+            top (int): 城市、影院各返回订单数最多的前几项
+            hours (int): 返回最近多少个小时的逐小时订单数
 
         Returns:
-            List[Dict[str, Any]]: 包含所有订单数据的字典列表
+            Dict[str, Any]: total 订单总数，platforms 各平台订单数，
+                            cities/cinemas 按订单数倒序的 [{'name', 'count'}]，
+                            hourly 按时间升序的 [{'hour_ms', 'count'}]
         """
+        platform_sql = "AND platform = ?" if platform_name else ""
+        platform_params = (platform_name,) if platform_name else ()
+        stats = {'total': 0, 'platforms': {}, 'cities': [], 'cinemas': [], 'hourly': []}
+
         try:
             cursor = self.connection.cursor()
+            cursor.execute(
+                f"SELECT value, order_count FROM order_stats WHERE dimension = 'platform' {platform_sql}",
+                platform_params
+            )
+            stats['platforms'] = {name: count for name, count in cursor.fetchall()}
+            stats['total'] = sum(stats['platforms'].values())
 
-            # 查询所有订单数据，按创建时间倒序排列
-            query_sql = """
-            SELECT id, order_id, bidding_price, seat_count, city, cinema_name,
-                   hall_type, movie_name, show_timestamp, platform, raw_data, created_at
-            FROM orders
-            ORDER BY created_at DESC
-            """
+            for key, dimension in (('cities', 'city'), ('cinemas', 'cinema')):
+                cursor.execute(
+                    f"""
+                    SELECT value, SUM(order_count) AS total FROM order_stats
+                    WHERE dimension = ? {platform_sql}
+                    GROUP BY value
+                    ORDER BY total DESC, value
+                    LIMIT ?
+                    """,
+                    (dimension, *platform_params, top)
+                )
+                stats[key] = [{'name': name, 'count': count} for name, count in cursor.fetchall()]
+
+            since_hour = (now_ms() // self._HOUR_MS - hours + 1) * self._HOUR_MS
+            cursor.execute(
+                f"""
+                SELECT hour_ms, SUM(order_count) FROM order_stats_hourly
+                WHERE hour_ms >= ? {platform_sql}
+                GROUP BY hour_ms
+                ORDER BY hour_ms
+                """,
+                (since_hour, *platform_params)
+            )
+            stats['hourly'] = [{'hour_ms': hour_ms, 'count': count} for hour_ms, count in cursor.fetchall()]
+            return stats
+
+        except Exception as e:
+            logging.error(f"查询订单统计失败: {e}")
+            return stats
+
+    def get_recent_order_ids(self, platform_name: str, since_timestamp: float, limit: int) -> List[str]:
+        """
+        获取某个平台在指定时间之后入库的订单ID
+
+        Args:
+            platform_name (str): 平台名称
+            since_timestamp (float): 起始时间的Unix时间戳
+            limit (int): 返回的记录数量限制
 
-            cursor.execute(query_sql)
-            rows = cursor.fetchall()
-
-            # 转换为字典列表
-            orders = []
-            for row in rows:
-                order_dict = {
-                    'id': row[0],
-                    'order_id': row[1],
-                    'bidding_price': row[2],
-                    'seat_count': row[3],
-                    'city': row[4],
-                    'cinema_name': row[5],
-                    'hall_type': row[6],
-                    'movie_name': row[7],
-                    'show_timestamp': row[8],
-                    'platform': row[9],
-                    'raw_data': row[10],
-                    'created_at': row[11]
-                }
-
-                # 解析raw_data JSON字符串
-                try:
-                    order_dict['raw_data'] = json.loads(order_dict['raw_data'])
-                except:
-                    order_dict['raw_data'] = {}
-
-                orders.append(order_dict)
+        Returns:
+            List[str]: 订单ID列表，按创建时间倒序
+        """
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                """
+                SELECT order_id FROM orders
+                WHERE platform = ? AND created_at_ms >= ?
+                ORDER BY created_at_ms DESC
+                LIMIT ?
+                """,
+                (platform_name, int(since_timestamp * 1000), limit)
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+        except Exception as e:
+            logging.error(f"查询最近订单ID失败: {e}")
+            return []
+
+    def get_all_orders_as_dicts(self, include_raw: bool = False) -> List[Dict[str, Any]]:
+        """
+        获取数据库中的所有订单数据，并转换为字典列表
+
+        Args:
+            include_raw (bool): 是否同时返回解压后的原始订单（raw_data）
+
+        Returns:
+            List[Dict[str, Any]]: 包含所有订单数据的字典列表，按入库时间倒序，时间字段为毫秒时间戳
+        """
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"""
+                {self._select_orders_sql(include_raw)}
+                ORDER BY orders.created_at_ms DESC, orders.id DESC
+                """
+            )
+            orders = self._rows_to_orders(cursor.fetchall(), include_raw)
 
             logging.info(f"成功查询到 {len(orders)} 条订单数据")
             return orders
@@ -308,6 +843,26 @@ class DatabaseManager:
             logging.error(f"查询所有订单数据失败: {e}")
             return []
     
+    def get_raw_data(self, order_id: str):
+        """
+        获取单个订单解压后的原始数据
+
+        Args:
+            order_id (str): 订单ID
+
+        Returns:
+            dict: 原始订单；订单不存在时返回None
+        """
+        try:
+            row = self.connection.execute(
+                "SELECT data FROM order_raw WHERE order_id = ?", (order_id,)
+            ).fetchone()
+            return raw_codec.decode_raw(row[0]) if row is not None else None
+
+        except Exception as e:
+            logging.error(f"查询订单 {order_id} 原始数据失败: {e}")
+            return None
+
     def close(self):
         """关闭数据库连接"""
         if self.connection:
@@ -320,3 +875,118 @@ class DatabaseManager:
     def __del__(self):
         """析构函数，确保数据库连接被正确关闭"""
         self.close()
+
+
+class ReadConnectionPool:
+    """
+    只读数据库连接池
+
+    多线程的读取方（如Web服务器的请求线程）各自借用一个只读连接，用完归还，
+    不再共用同一个连接；连接数最多为 size，全部被占用时等待空闲连接。
+    数据库处于WAL模式，读取与后台持久化线程的写入互不阻塞。
+    """
+
+    def __init__(self, db_path: str = "orders.db", size: int = DB_READ_POOL_SIZE,
+                 timeout: float = DB_READ_POOL_TIMEOUT):
+        """
+        初始化只读连接池（连接在首次使用时才创建）
+
+        Args:
+            db_path (str): 数据库文件路径
+            size (int): 最多同时打开的连接数
+            timeout (float): 等待空闲连接的最长秒数
+        """
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._all = []
+        self._opened = 0
+        self._schema_ready = False
+
+        # 统计计数
+        self.borrows = 0
+        self.waits = 0
+
+    def _create(self) -> DatabaseManager:
+        """创建一个只读连接；首次创建前先用写连接建表并执行结构迁移（只读连接无法迁移）"""
+        if not self._schema_ready:
+            DatabaseManager(self.db_path).close()
+            self._schema_ready = True
+        return DatabaseManager(self.db_path, read_only=True)
+
+    def _acquire(self) -> DatabaseManager:
+        """借用一个空闲连接，没有空闲连接且未达上限时新建"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            # 先计数，避免并发创建超过上限
+            create = self._opened < self.size
+            if create:
+                self._opened += 1
+        if create:
+            try:
+                db = self._create()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+            with self._lock:
+                self._all.append(db)
+            return db
+
+        self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待数据库只读连接超过 {self.timeout:g} 秒")
+
+    @contextmanager
+    def connection(self):
+        """
+        借用一个只读连接，with 语句结束时归还
+
+        Yields:
+            DatabaseManager: 只读的数据库管理器
+        """
+        db = self._acquire()
+        self.borrows += 1
+        try:
+            yield db
+        finally:
+            # 归还前结束可能残留的读事务，避免长期持有旧快照阻止WAL检查点
+            if db.connection is not None and db.connection.in_transaction:
+                db.connection.rollback()
+            self._idle.put(db)
+
+    def close(self):
+        """关闭全部连接"""
+        with self._lock:
+            connections, self._all = self._all, []
+            self._opened = 0
+        for db in connections:
+            db.close()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+    def get_metrics(self) -> dict:
+        """
+        获取连接池统计
+
+        Returns:
+            dict: 上限、已打开连接数、空闲连接数、借用次数和需要等待空闲连接的次数
+        """
+        return {
+            'size': self.size,
+            'open': self._opened,
+            'idle': self._idle.qsize(),
+            'borrows': self.borrows,
+            'waits': self.waits
+        }
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间模块 - 为每次轮询设定端到端的时间预算，各阶段据此协作取消
+"""
+
+import time
+
+
+class DeadlineExceeded(Exception):
+    """轮询超出截止时间"""
+
+
+class Deadline:
+    """
+    单次轮询的截止时间
+
+    在轮询开始时创建，沿请求、解密、解析等阶段传递；
+    等待网络时由外层超时直接取消，CPU密集的阶段之间调用 check() 主动放弃。
+    """
+
+    __slots__ = ('budget', 'started', 'expires_at')
+
+    def __init__(self, budget: float = None):
+        """
+        初始化截止时间
+
+        Args:
+            budget (float): 时间预算（秒），为None时不限制
+        """
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expires_at = None if budget is None else self.started + budget
+
+    def remaining(self):
+        """
+        剩余时间
+
+        Returns:
+            float: 剩余秒数（不小于0），不限制时返回None
+        """
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """已经过的秒数"""
+        return time.monotonic() - self.started
+
+    def expired(self) -> bool:
+        """是否已超过截止时间"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage: str = ''):
+        """
+        检查是否已超过截止时间
+
+        Args:
+            stage (str): 即将开始的阶段名称，用于异常信息
+
+        Raises:
+            DeadlineExceeded: 已超过截止时间
+        """
+        if self.expired():
+            raise DeadlineExceeded(f"{stage}阶段开始前已超过 {self.budget:g} 秒的截止时间")
@@ -6,6 +6,7 @@
 
 import json
 import logging
+import hashlib
 
 
 class RuleEngine:
@@ -58,12 +59,22 @@ class RuleEngine:
             logging.error(f"错误：加载规则文件时发生未知错误 - {e}")
             self.rules = []
 
+    def get_rules_hash(self) -> str:
+        """
+        计算当前已加载规则的哈希值，规则内容变化时哈希随之变化
+
+        Returns:
+            str: 规则内容的MD5十六进制摘要
+        """
+        rules_json = json.dumps(self.rules, sort_keys=True, ensure_ascii=False, default=sorted)
+        return hashlib.md5(rules_json.encode('utf-8')).hexdigest()
+
     def check_order(self, order):
         """
         检查订单是否符合规则条件
 
         Args:
-            order (dict): 代表订单的字典，包含以下字段：
+            order (Order | dict): 标准化订单，包含以下字段：
                 - city: 城市名称
                 - cinema_name: 影院名称
                 - hall_type: 影厅类型
@@ -74,19 +85,19 @@ class RuleEngine:
             dict: 如果匹配成功且利润达标，返回包含利润和规则信息的字典
             None: 如果没有匹配的规则或利润不达标
         """
+        # 数据准备与清洗：安全获取订单字段并转换为小写（与规则无关，只需处理一次）
+        order_city = order.get('city', '').lower().strip()
+        order_cinema_name = order.get('cinema_name', '').lower().strip()
+        order_hall_type = order.get('hall_type', '').lower().strip()
+        order_bidding_price = order.get('bidding_price', 0)
+        order_seat_count = order.get('seat_count', 1)  # 获取票数字段，默认为1
+
         # 遍历所有规则
         for rule in self.rules:
             # 前置检查：跳过被禁用的规则
             if not rule.get('enabled', True):
                 continue
 
-            # 数据准备与清洗：安全获取订单字段并转换为小写
-            order_city = order.get('city', '').lower().strip()
-            order_cinema_name = order.get('cinema_name', '').lower().strip()
-            order_hall_type = order.get('hall_type', '').lower().strip()
-            order_bidding_price = order.get('bidding_price', 0)
-            order_seat_count = order.get('seat_count', 1)  # 获取票数字段，默认为1
-
             # 获取规则条件
             match_conditions = rule.get('match_conditions', {})
             hall_logic = rule.get('hall_logic', {})
@@ -162,7 +173,7 @@ class RuleEngine:
                     'total_profit': total_profit,
                     'seat_count': order_seat_count,
                     'rule_name': rule.get('rule_name', '未命名规则'),
-                    'order_details': order.copy()  # 返回订单详情的副本
+                    'order_details': order  # 引用订单本身，不做复制
                 }
 
         # 如果循环正常结束，说明没有任何规则匹配成功
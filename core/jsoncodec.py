@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码模块 - 统一的JSON入口，安装了更快的JSON库时自动使用，否则回退到标准库
+"""
+
+import re
+import json
+import codecs
+import logging
+
+# 按优先级选择可用的JSON后端：orjson > ujson > 标准库json
+try:
+    import orjson
+    BACKEND = 'orjson'
+except ImportError:
+    orjson = None
+    try:
+        import ujson
+        BACKEND = 'ujson'
+    except ImportError:
+        ujson = None
+        BACKEND = 'json'
+
+# 解析失败时抛出的异常类型（orjson的异常是json.JSONDecodeError的子类，ujson只抛出ValueError）
+JSONDecodeError = ValueError if BACKEND == 'ujson' else json.JSONDecodeError
+
+logging.debug(f"JSON编解码后端: {BACKEND}")
+
+
+def loads(data):
+    """
+    解析JSON
+
+    Args:
+        data (str | bytes): JSON文本
+
+    Returns:
+        解析后的Python对象
+    """
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    if BACKEND == 'ujson':
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, pretty: bool = False) -> str:
+    """
+    序列化为紧凑JSON字符串（中文不转义）
+
+    Args:
+        obj: 要序列化的对象
+        pretty (bool): 是否缩进输出，便于人工查看
+
+    Returns:
+        str: JSON字符串
+    """
+    if BACKEND == 'orjson':
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+        except TypeError:
+            # orjson不支持的类型（如超过64位的整数），交给标准库处理
+            pass
+    elif BACKEND == 'ujson':
+        return ujson.dumps(obj, ensure_ascii=False, indent=2 if pretty else 0)
+
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps_bytes(obj, pretty: bool = False) -> bytes:
+    """
+    序列化为UTF-8编码的紧凑JSON（中文不转义）
+
+    Args:
+        obj: 要序列化的对象
+        pretty (bool): 是否缩进输出，便于人工查看
+
+    Returns:
+        bytes: JSON字节串
+    """
+    if BACKEND == 'orjson':
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+        except TypeError:
+            pass
+    return dumps(obj, pretty).encode('utf-8')
+
+
+class ArrayStreamDecoder:
+    """
+    流式解析响应中某个键对应的JSON数组
+
+    响应体按块到达时逐个取出数组中已完整到达的元素，不必等待整个响应下载完成。
+    数组之外的部分（如 rtnCode、rtnMsg）在结束时通过 envelope() 获取，
+    其中该键的值被替换为空数组。
+
+    用法:
+        decoder = ArrayStreamDecoder('rtnData')
+        async for chunk in response.content.iter_any():
+            for item in decoder.feed(chunk):
+                ...
+        envelope = decoder.envelope()
+    """
+
+    _WHITESPACE = ' \t\r\n'
+    # 查找数组起点时需要处理的字符：字符串的引号、括号和逗号
+    _STRUCTURAL = re.compile(r'["{}\[\],]')
+
+    def __init__(self, key: str):
+        """
+        初始化流式解析器
+
+        Args:
+            key (str): 数组所在的键名（仅匹配最外层对象中的键）
+        """
+        self._key = f'"{key}"'
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._prefix = None  # 数组之前的文本，找到数组起点后设置
+        self._pos = 0
+        # 查找数组起点的进度：已扫描到的位置、括号嵌套深度、下一个字符串是否处于键的位置
+        self._scan_pos = 0
+        self._depth = 0
+        self._expect_key = False
+        self._finished = False
+        self.item_count = 0
+
+    @staticmethod
+    def _string_end(buffer: str, start: int) -> int:
+        """
+        查找从 start 处引号开始的字符串的结束位置
+
+        Returns:
+            int: 结束引号之后的位置，字符串尚未完整到达时返回-1
+        """
+        pos = start + 1
+        while True:
+            pos = buffer.find('"', pos)
+            if pos < 0:
+                return -1
+            # 前面有奇数个反斜杠时是转义的引号
+            backslashes = 0
+            while buffer[pos - 1 - backslashes] == '\\':
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return pos + 1
+            pos += 1
+
+    def _skip_whitespace(self, pos: int) -> int:
+        """跳过空白字符，返回第一个非空白字符的位置（可能等于缓冲区长度）"""
+        buffer = self._buffer
+        while pos < len(buffer) and buffer[pos] in self._WHITESPACE:
+            pos += 1
+        return pos
+
+    def _find_array_start(self) -> bool:
+        """
+        在缓冲区中查找最外层对象中的 "key": [ ，找到后切换到数组解析状态
+
+        逐个跳过字符串和括号，只有最外层对象中处于键位置的字符串才与键名比较，
+        字符串值或嵌套对象中出现的同名文本不会被误认为数组起点。未完整到达的部分留到下一块数据再扫描。
+        """
+        buffer = self._buffer
+        pos = self._scan_pos
+        while True:
+            match = self._STRUCTURAL.search(buffer, pos)
+            if match is None:
+                self._scan_pos = len(buffer)
+                return False
+            pos = match.start()
+            char = buffer[pos]
+
+            if char != '"':
+                if char in '{[':
+                    self._depth += 1
+                    if char == '{' and self._depth == 1:
+                        self._expect_key = True
+                elif char in '}]':
+                    self._depth -= 1
+                elif self._depth == 1:
+                    # 最外层对象中的逗号之后是下一个键
+                    self._expect_key = True
+                pos += 1
+                continue
+
+            end = self._string_end(buffer, pos)
+            if end < 0:
+                self._scan_pos = pos
+                return False
+            is_key = self._depth == 1 and self._expect_key
+            self._expect_key = False
+            if not is_key or buffer[pos:end] != self._key:
+                pos = end
+                continue
+
+            colon = self._skip_whitespace(end)
+            value = self._skip_whitespace(colon + 1) if colon < len(buffer) and buffer[colon] == ':' else colon
+            if value >= len(buffer):
+                # 键之后的冒号或值尚未到达，下次从键开始重新扫描
+                self._scan_pos = pos
+                self._expect_key = True
+                return False
+            if buffer[colon] != ':' or buffer[value] != '[':
+                # 该键的值不是数组（如 null），不再查找，交给 envelope() 整体解析
+                self._key = None
+                return False
+
+            self._prefix = buffer[:value]
+            self._buffer = buffer[value + 1:]
+            self._pos = 0
+            return True
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        输入一块响应数据
+
+        Args:
+            chunk (bytes): 新到达的响应数据
+
+        Returns:
+            list: 本块数据中完整到达的数组元素
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        if self._finished:
+            return []
+        if self._prefix is None and (self._key is None or not self._find_array_start()):
+            return []
+
+        items = []
+        buffer = self._buffer
+        pos = self._pos
+        length = len(buffer)
+        while True:
+            while pos < length and (buffer[pos] in self._WHITESPACE or buffer[pos] == ','):
+                pos += 1
+            if pos >= length:
+                break
+            if buffer[pos] == ']':
+                self._finished = True
+                pos += 1
+                break
+            try:
+                item, end = self._json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 元素尚未完整到达，等待下一块数据
+                break
+            if not isinstance(item, (dict, list, str)) and (
+                    end >= length or buffer[end] not in self._WHITESPACE and buffer[end] not in ',]'):
+                # 数字等标量之后不是分隔符时可能被截断（如 12.5 只到达了 12），等待后续数据确认
+                break
+            items.append(item)
+            pos = end
+
+        # 丢弃已解析的元素，保留未完成的部分（数组结束后保留剩余的响应文本）
+        self._buffer = buffer[pos:]
+        self._pos = 0
+        self.item_count += len(items)
+        return items
+
+    def envelope(self):
+        """
+        响应结束后解析数组之外的部分
+
+        Returns:
+            数组之外的JSON对象，其中该键的值为空数组；未找到数组时返回整个响应的解析结果
+
+        Raises:
+            JSONDecodeError: 响应不是合法的JSON
+        """
+        try:
+            self._buffer += self._text_decoder.decode(b'', final=True)
+        except UnicodeDecodeError as e:
+            raise json.JSONDecodeError("响应在多字节字符中间结束", self._buffer, len(self._buffer)) from e
+        if self._prefix is None:
+            return loads(self._buffer)
+        if not self._finished:
+            raise json.JSONDecodeError("数组未结束，响应不完整", self._buffer, len(self._buffer))
+        return loads(f"{self._prefix}[]{self._buffer}")
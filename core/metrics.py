@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能指标模块 - 记录每次轮询各阶段的耗时，按平台汇总为滚动直方图（p50/p95/p99）
+"""
+
+import os
+import time
+import logging
+import collections
+from config import METRICS_WINDOW_SIZE, METRICS_FILE
+from . import jsoncodec
+
+
+def _pick_percentile(sorted_samples: list, percent: float) -> float:
+    """从已排序的样本中取分位数（最近秩法）"""
+    index = min(len(sorted_samples) - 1, int(len(sorted_samples) * percent / 100))
+    return sorted_samples[index]
+
+
+class RollingHistogram:
+    """
+    滚动直方图
+
+    只保留最近 size 个样本，分位数在读取时计算，记录样本是O(1)的。
+    """
+
+    def __init__(self, size: int = METRICS_WINDOW_SIZE):
+        """
+        初始化滚动直方图
+
+        Args:
+            size (int): 保留的最近样本数量
+        """
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+
+    def record(self, value: float):
+        """记录一个样本"""
+        self.samples.append(value)
+        self.count += 1
+
+    def percentile(self, percent: float):
+        """
+        计算最近样本的分位数
+
+        Args:
+            percent (float): 百分位，如 95
+
+        Returns:
+            float: 分位数，没有样本时返回None
+        """
+        samples = sorted(self.samples)
+        return _pick_percentile(samples, percent) if samples else None
+
+    def summary(self, scale: float = 1000.0) -> dict:
+        """
+        汇总统计
+
+        Args:
+            scale (float): 输出时乘以的系数，默认把秒转换为毫秒
+
+        Returns:
+            dict: 包含 count/p50/p95/p99/max 的字典
+        """
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': self.count, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+
+        return {
+            'count': self.count,
+            'p50': round(_pick_percentile(samples, 50) * scale, 2),
+            'p95': round(_pick_percentile(samples, 95) * scale, 2),
+            'p99': round(_pick_percentile(samples, 99) * scale, 2),
+            'max': round(samples[-1] * scale, 2)
+        }
+
+
+class PipelineMetrics:
+    """按 平台 -> 阶段 组织的耗时直方图集合"""
+
+    def __init__(self, window_size: int = METRICS_WINDOW_SIZE):
+        self.window_size = window_size
+        self._histograms = collections.defaultdict(dict)
+
+    def histogram(self, platform: str, stage: str) -> RollingHistogram:
+        """获取（必要时创建）某个平台某个阶段的直方图"""
+        histograms = self._histograms[platform]
+        histogram = histograms.get(stage)
+        if histogram is None:
+            histogram = histograms[stage] = RollingHistogram(self.window_size)
+        return histogram
+
+    def record(self, platform: str, stage: str, seconds: float):
+        """
+        记录一个阶段耗时
+
+        Args:
+            platform (str): 平台名称
+            stage (str): 阶段名称
+            seconds (float): 耗时（秒）
+        """
+        self.histogram(platform, stage).record(seconds)
+
+    def summary(self) -> dict:
+        """
+        汇总所有平台所有阶段的耗时分位数（毫秒）
+
+        Returns:
+            dict: 平台 -> 阶段 -> 统计
+        """
+        return {
+            platform: {stage: histogram.summary() for stage, histogram in list(stages.items())}
+            for platform, stages in list(self._histograms.items())
+        }
+
+    def status_text(self, stage: str = 'poll', percent: float = 95) -> str:
+        """
+        生成适合状态栏显示的简短文本，如 "哈哈 p95 120ms | 麻花 p95 80ms"
+
+        Args:
+            stage (str): 阶段名称
+            percent (float): 百分位
+
+        Returns:
+            str: 状态文本，没有数据时返回空字符串
+        """
+        parts = []
+        for platform, stages in list(self._histograms.items()):
+            histogram = stages.get(stage)
+            value = histogram.percentile(percent) if histogram else None
+            if value is not None:
+                parts.append(f"{platform} p{percent:g} {value * 1000:.0f}ms")
+        return ' | '.join(parts)
+
+
+# 进程内共享的指标实例
+pipeline_metrics = PipelineMetrics()
+
+
+class PollTimer:
+    """
+    单次轮询的分阶段计时器，使用单调时钟
+
+    用法:
+        timer = PollTimer('哈哈')
+        with timer.stage('decrypt'):
+            ...
+        timer.finish()
+    """
+
+    def __init__(self, platform: str, metrics: PipelineMetrics = pipeline_metrics):
+        self.platform = platform
+        self.metrics = metrics
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def stage(self, name: str):
+        """返回记录指定阶段耗时的上下文管理器"""
+        return _StageContext(self, name)
+
+    def add(self, name: str, seconds: float):
+        """累加一个阶段的耗时（同一阶段可能执行多次，例如重试）"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def finish(self):
+        """把本次轮询的各阶段耗时和总耗时写入指标"""
+        for name, seconds in self.stages.items():
+            self.metrics.record(self.platform, name, seconds)
+        self.metrics.record(self.platform, 'poll', time.perf_counter() - self.started)
+
+
+class _StageContext:
+    """PollTimer.stage() 返回的上下文管理器"""
+
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer: PollTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def create_trace_config(metrics: PipelineMetrics = pipeline_metrics):
+    """
+    创建记录网络各阶段耗时的 aiohttp TraceConfig
+
+    记录的阶段（请求时需传入 trace_request_ctx={'platform': 平台名称}）：
+        net_dns      DNS解析
+        net_connect  建立连接（TCP + TLS握手，复用连接时不产生）
+        net_ttfb     请求发出到收到响应头（服务器首字节时间）
+
+    Returns:
+        aiohttp.TraceConfig: 跟踪配置
+    """
+    import aiohttp
+
+    def _platform(trace_config_ctx):
+        request_ctx = trace_config_ctx.trace_request_ctx or {}
+        return request_ctx.get('platform', 'unknown')
+
+    async def on_request_start(session, trace_config_ctx, params):
+        trace_config_ctx.request_start = time.perf_counter()
+
+    async def on_dns_start(session, trace_config_ctx, params):
+        trace_config_ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, trace_config_ctx, params):
+        metrics.record(_platform(trace_config_ctx), 'net_dns', time.perf_counter() - trace_config_ctx.dns_start)
+
+    async def on_connection_create_start(session, trace_config_ctx, params):
+        trace_config_ctx.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, trace_config_ctx, params):
+        metrics.record(_platform(trace_config_ctx), 'net_connect',
+                       time.perf_counter() - trace_config_ctx.connect_start)
+
+    async def on_request_headers_sent(session, trace_config_ctx, params):
+        trace_config_ctx.headers_sent = time.perf_counter()
+
+    async def on_request_end(session, trace_config_ctx, params):
+        sent = getattr(trace_config_ctx, 'headers_sent', trace_config_ctx.request_start)
+        metrics.record(_platform(trace_config_ctx), 'net_ttfb', time.perf_counter() - sent)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_headers_sent.append(on_request_headers_sent)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def build_report(adapters: list, persister=None, capture=None, cross_index=None,
+                 metrics: PipelineMetrics = pipeline_metrics) -> dict:
+    """
+    汇总耗时直方图、各适配器的计数指标、持久化、原始响应抓取和跨平台场次索引统计
+
+    Args:
+        adapters (list): 平台适配器列表
+        persister (OrderPersister): 订单持久化器，可选
+        capture (ResponseCapture): 原始响应抓取器，可选
+        cross_index (CrossPlatformIndex): 跨平台场次索引，可选
+
+    Returns:
+        dict: 指标报告
+    """
+    report = {
+        'updated_at': time.time(),
+        'stages_ms': metrics.summary(),
+        'adapters': {adapter.name: adapter.get_metrics() for adapter in adapters}
+    }
+    if persister is not None:
+        report['persistence'] = persister.get_metrics()
+    if capture is not None:
+        report['capture'] = capture.get_metrics()
+    if cross_index is not None:
+        report['cross_platform'] = cross_index.get_metrics()
+    return report
+
+
+def write_report(report: dict, filepath: str = METRICS_FILE) -> bool:
+    """
+    把指标报告写入文件，供Web服务器等其他进程读取
+
+    Args:
+        report (dict): build_report() 生成的报告
+        filepath (str): 文件路径
+
+    Returns:
+        bool: 写入成功返回True
+    """
+    temp_path = f"{filepath}.tmp"
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(jsoncodec.dumps_bytes(report))
+        os.replace(temp_path, filepath)
+        return True
+    except Exception as e:
+        logging.error(f"写入指标文件失败: {e}")
+        return False
+
+
+def read_report(filepath: str = METRICS_FILE):
+    """
+    读取指标文件
+
+    Returns:
+        dict: 指标报告，文件不存在或读取失败时返回None
+    """
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, 'rb') as file:
+            return jsoncodec.loads(file.read())
+    except Exception as e:
+        logging.error(f"读取指标文件失败: {e}")
+        return None
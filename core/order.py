@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单模型模块 - 所有平台共用的紧凑订单表示
+"""
+
+import sys
+
+# 标准化订单包含的字段（updated 由去重器设置：已见过的订单价格相关字段发生了变化）
+ORDER_FIELDS = (
+    'order_id', 'platform', 'bidding_price', 'seat_count', 'city',
+    'cinema_name', 'hall_type', 'movie_name', 'show_time', 'raw_data', 'updated'
+)
+
+
+def intern_text(value) -> str:
+    """
+    驻留字符串，城市/影院/影厅/电影名在订单间大量重复，驻留后所有订单共享同一个对象
+
+    Args:
+        value: 原始字段值
+
+    Returns:
+        str: 驻留后的字符串，None返回空字符串
+    """
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        value = str(value)
+    return sys.intern(value)
+
+
+class Order:
+    """
+    标准化订单
+
+    使用 __slots__ 代替字典以减少每个订单的内存占用；raw_data 只保存原始订单的引用，不做复制。
+    提供与字典一致的 get()/[] 访问方式，规则引擎、数据库和界面无需区分订单类型。
+    """
+
+    __slots__ = ORDER_FIELDS
+
+    def __init__(self, order_id: str, platform: str = '', bidding_price: float = 0.0, seat_count: int = 1,
+                 city: str = '', cinema_name: str = '', hall_type: str = '', movie_name: str = '',
+                 show_time: str = None, raw_data: dict = None, updated: bool = False):
+        """
+        初始化订单
+
+        Args:
+            order_id (str): 订单唯一标识
+            platform (str): 平台名称
+            bidding_price (float): 竞价价格
+            seat_count (int): 票数
+            city (str): 城市名称
+            cinema_name (str): 影院名称
+            hall_type (str): 影厅类型
+            movie_name (str): 电影名称
+            show_time (str): 场次时间，平台未提供时为None
+            raw_data (dict): 平台原始订单（引用）
+            updated (bool): 是否为价格相关字段发生变化的已见过订单
+        """
+        self.order_id = order_id
+        self.platform = intern_text(platform)
+        self.bidding_price = bidding_price
+        self.seat_count = seat_count
+        self.city = intern_text(city)
+        self.cinema_name = intern_text(cinema_name)
+        self.hall_type = intern_text(hall_type)
+        self.movie_name = intern_text(movie_name)
+        self.show_time = show_time
+        self.raw_data = raw_data
+        self.updated = updated
+
+    def get(self, key: str, default=None):
+        """
+        按字段名取值，字段不存在或值为None时返回默认值
+
+        Args:
+            key (str): 字段名
+            default: 默认值
+
+        Returns:
+            字段值
+        """
+        if key not in ORDER_FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in ORDER_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str):
+        return key in ORDER_FIELDS
+
+    def to_dict(self) -> dict:
+        """
+        转换为字典
+
+        Returns:
+            dict: 包含全部字段的字典
+        """
+        return {field: getattr(self, field) for field in ORDER_FIELDS}
+
+    def __repr__(self):
+        return f"Order({self.platform}:{self.order_id} {self.cinema_name} {self.hall_type} {self.bidding_price})"
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单持久化模块 - 在独立线程中把新订单写入数据库，磁盘延迟不会影响抢单提醒
+"""
+
+import time
+import queue
+import logging
+import threading
+from .database import DatabaseManager
+from .metrics import pipeline_metrics
+from config import PERSIST_BATCH_SIZE, PERSIST_MAX_DELAY, PERSIST_CLOSE_TIMEOUT
+
+# 通知后台线程退出的标记
+_STOP = object()
+
+
+class OrderPersister:
+    """
+    后台订单持久化
+
+    后台线程在匹配和提醒完成后通过 submit() 提交新订单，立即返回；
+    持久化线程是唯一的写连接，收到第一批订单后继续收集，直到累积 batch_size 条订单
+    或等待满 max_delay 秒，再按平台合并、每个平台一次批量写入和提交（group commit）。
+    """
+
+    def __init__(self, db_path: str = "orders.db", batch_size: int = PERSIST_BATCH_SIZE,
+                 max_delay: float = PERSIST_MAX_DELAY):
+        """
+        初始化订单持久化器
+
+        Args:
+            db_path (str): 数据库文件路径
+            batch_size (int): 累积到多少条订单时立即写入
+            max_delay (float): 第一批订单到达后最多等待多少秒再写入
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = False  # 已发出退出标记，持久化线程正在写完剩余订单
+        self.failed = False  # 持久化线程无法打开数据库，已退出
+
+        # 统计计数（submitted 由后台线程修改，其余由持久化线程修改；dropped 两者都会修改）
+        self.submitted = 0
+        self.saved = 0
+        self.writes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def start(self):
+        """启动持久化线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='order-persister', daemon=True)
+        self._thread.start()
+        logging.info("订单持久化线程已启动")
+
+    def submit(self, orders: list, platform_name: str):
+        """
+        提交需要保存的新订单，不等待写入完成
+
+        Args:
+            orders (list): 新订单列表
+            platform_name (str): 平台名称
+        """
+        if not orders:
+            return
+        self.submitted += len(orders)
+        if self.failed:
+            # 持久化线程已退出，订单不再排队等待永远不会发生的写入
+            self.dropped += len(orders)
+            logging.warning(f"订单持久化不可用，丢弃{platform_name}平台的 {len(orders)} 条订单")
+            return
+        self._queue.put((time.monotonic(), platform_name, orders))
+
+    def _run(self):
+        """持久化线程主循环"""
+        try:
+            db_manager = DatabaseManager(self.db_path)
+        except Exception as e:
+            logging.error(f"订单持久化线程无法打开数据库 {self.db_path}，新订单将不会保存: {e}")
+            self.failed = True
+            self._drop_queued()
+            return
+        try:
+            while True:
+                batches = self._collect()
+                stopping = batches[-1] is _STOP
+                self._write(db_manager, [batch for batch in batches if batch is not _STOP])
+                if stopping:
+                    break
+        finally:
+            db_manager.close()
+
+    def _drop_queued(self):
+        """丢弃队列中已提交的订单并计数"""
+        while True:
+            try:
+                batch = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if batch is not _STOP:
+                self.dropped += len(batch[2])
+
+    def _collect(self) -> list:
+        """
+        等待第一批订单，再收集后续批次直到订单数达到 batch_size、等待满 max_delay 秒或收到退出标记
+
+        Returns:
+            list: 批次列表，收到退出标记时最后一项为 _STOP
+        """
+        batches = [self._queue.get()]
+        if batches[0] is _STOP:
+            return batches
+
+        pending = len(batches[0][2])
+        expires_at = time.monotonic() + self.max_delay
+        while pending < self.batch_size:
+            timeout = expires_at - time.monotonic()
+            try:
+                batch = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batches.append(batch)
+            if batch is _STOP:
+                break
+            pending += len(batch[2])
+        return batches
+
+    def _write(self, db_manager: DatabaseManager, batches: list):
+        """按平台合并批次并写入数据库"""
+        if not batches:
+            return
+
+        by_platform = {}
+        oldest = {}
+        for submitted_at, platform_name, orders in batches:
+            by_platform.setdefault(platform_name, []).extend(orders)
+            oldest.setdefault(platform_name, submitted_at)
+
+        for platform_name, orders in by_platform.items():
+            started = time.monotonic()
+            try:
+                saved = db_manager.save_orders(orders, platform_name)
+                self.saved += saved
+                self.writes += 1
+                if saved == 0:
+                    # save_orders 在写入出错时回滚并返回0
+                    self.failures += 1
+                    logging.error(f"后台保存{platform_name}平台订单失败: {len(orders)} 条订单均未写入")
+            except Exception as e:
+                self.failures += 1
+                logging.error(f"后台保存{platform_name}平台订单失败: {e}")
+            finished = time.monotonic()
+            pipeline_metrics.record(platform_name, 'persist', finished - started)
+            # 从提交到写入完成的延迟
+            pipeline_metrics.record(platform_name, 'persist_lag', finished - oldest[platform_name])
+
+    def is_alive(self) -> bool:
+        """持久化线程是否仍在运行（close() 超时返回后可能仍在写入剩余订单）"""
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def close(self, timeout: float = PERSIST_CLOSE_TIMEOUT) -> bool:
+        """
+        写完队列中剩余的订单后停止持久化线程
+
+        超时返回时线程继续写入，可以再次调用 close() 或通过 is_alive() 确认是否写完。
+
+        Args:
+            timeout (float): 等待线程结束的最长秒数，None 表示一直等待
+
+        Returns:
+            bool: 线程是否已经结束
+        """
+        # 后台线程和主窗口可能同时调用，只使用局部引用
+        thread = self._thread
+        if thread is None:
+            return True
+        if not self._stopping:
+            self._stopping = True
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            waited = f"{timeout:g} 秒内" if timeout is not None else ""
+            logging.warning(f"订单持久化线程未在{waited}结束，仍有 {self._queue.qsize()} 批订单未写入")
+            return False
+        if self.failed:
+            # 线程退出之后才提交的订单
+            self._drop_queued()
+        logging.info("订单持久化线程已停止")
+        self._thread = None
+        return True
+
+    def get_metrics(self) -> dict:
+        """
+        获取持久化统计
+
+        Returns:
+            dict: 队列积压批次数、提交订单数、实际插入数、写入次数、失败次数，
+                  以及无法打开数据库时丢弃的订单数
+        """
+        return {
+            'queue_depth': self._queue.qsize(),
+            'submitted': self.submitted,
+            'saved': self.saved,
+            'writes': self.writes,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
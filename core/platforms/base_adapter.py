@@ -4,15 +4,31 @@
 平台适配器基类 - 定义所有平台适配器必须实现的接口
 """
 
+import asyncio
+import hashlib
+import logging
+import aiohttp
 from abc import ABC, abstractmethod
+from .dedup import OrderDeduplicator
+from .hedging import RequestHedger
+from .circuit_breaker import CircuitBreaker
+from .order_book import OrderBook
+from .registry import get_converter
+from ..metrics import create_trace_config
+from ..deadline import Deadline, DeadlineExceeded
+from config import POLL_DEADLINE
 
 
 class BaseAdapter(ABC):
     """
     平台适配器基类
     
-    所有平台适配器都必须继承此类并实现其抽象方法
+    所有平台适配器都必须继承此类并实现其抽象方法，
+    并通过 PLATFORM_KEY 关联注册表中的平台声明（字段映射、预过滤）
     """
+
+    # 注册表中的平台标识
+    PLATFORM_KEY = None
     
     def __init__(self, name: str):
         """
@@ -22,6 +38,43 @@ class BaseAdapter(ABC):
             name (str): 平台名称
         """
         self.name = name
+        # 基于哈希表和过期时间的订单去重器
+        self.deduplicator = OrderDeduplicator()
+        # 当前挂出的全部订单，每次轮询与上一次快照对比生成增量事件
+        self.order_book = OrderBook(name)
+
+        # 响应指纹：上一次成功处理的原始响应哈希，以及其中包含的订单ID
+        self._last_payload_hash = None
+        self._pending_payload_hash = None
+        self._last_payload_order_ids = ()
+
+        # 长期复用的HTTP会话，在首次请求时创建（需要运行中的事件循环）
+        self._session = None
+
+        # 列表请求的对冲执行器（默认关闭，见 config.HEDGE_ENABLED）
+        self.hedger = RequestHedger(name)
+
+        # 熔断器：平台连续失败时短路轮询，定期探测恢复
+        self.circuit_breaker = CircuitBreaker(name)
+
+        # 新订单回调 order_sink(platform_name, orders)，流式处理时在下载过程中立即调用
+        self.order_sink = None
+
+        # 原始响应抓取器（ResponseCapture），为None时不抓取
+        self.capture = None
+
+        # 本次轮询的截止时间（由 poll() 设置），本次轮询中已通过去重的新订单，以及它们是否已交给 order_sink
+        self.deadline = Deadline()
+        self._poll_new_orders = []
+        self._poll_emitted = False
+
+        # 运行指标
+        self.metrics = {
+            'payloads': 0,
+            'fingerprint_skips': 0,
+            'deadline_overruns': 0,
+            'late_matches': 0
+        }
     
     @abstractmethod
     async def fetch_and_process(self):
@@ -49,3 +102,247 @@ class BaseAdapter(ABC):
             NotImplementedError: 如果子类没有实现此方法
         """
         raise NotImplementedError("子类必须实现 fetch_and_process 方法")
+
+    async def poll(self):
+        """
+        经过熔断器、在截止时间内执行一次轮询，后台线程应调用此方法而不是直接调用 fetch_and_process
+
+        熔断器打开时不发出任何请求，直接返回带 circuit_open 标记的失败结果。
+        超过 config.POLL_DEADLINE 时取消本次轮询（释放连接），返回带 deadline_exceeded 标记的失败结果。
+        轮询失败或被取消前已通过去重的新订单（流式解析时已经提醒过）随失败结果一并返回并并入挂单簿，
+        否则它们已被去重器记为见过，再也不会被保存。
+
+        Returns:
+            dict: 包含平台名称、成功状态和订单列表的字典
+        """
+        self.deadline = Deadline(POLL_DEADLINE)
+        self._poll_new_orders = []
+        self._poll_emitted = False
+
+        if not self.circuit_breaker.allow_request():
+            result = self._failure_result()
+            result['circuit_open'] = True
+            return result
+
+        try:
+            result = await asyncio.wait_for(self.fetch_and_process(), self.deadline.remaining())
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            self.metrics['deadline_overruns'] += 1
+            self.circuit_breaker.record_failure()
+            logging.warning(f"{self.name}平台轮询超过 {self.deadline.budget:g} 秒的截止时间，已取消本次轮询")
+            result = self._failure_result()
+            result['deadline_exceeded'] = True
+            return self._keep_polled_orders(result)
+        except Exception as e:
+            self.circuit_breaker.record_failure()
+            if not self._poll_new_orders:
+                raise
+            logging.error(f"{self.name}平台轮询出错: {e}")
+            return self._keep_polled_orders(self._failure_result())
+        except BaseException:
+            # 轮询被外部取消时释放探测名额，否则熔断器会一直认为探测仍在进行而永久短路该平台
+            self.circuit_breaker.release_probe()
+            raise
+
+        if isinstance(result, dict) and not result.get('success', False):
+            self.circuit_breaker.record_failure()
+            return self._keep_polled_orders(result)
+        self.circuit_breaker.record_success()
+        return result
+
+    def _keep_polled_orders(self, result: dict) -> dict:
+        """
+        把本次轮询中已通过去重的新订单附加到失败结果上，并并入挂单簿
+
+        Args:
+            result (dict): 失败结果
+
+        Returns:
+            dict: 同一个结果；有订单时带 orders，已交给 order_sink 匹配过时带 streamed 标记
+        """
+        if self._poll_new_orders and not result.get('orders'):
+            result['orders'] = self._poll_new_orders
+            result['streamed'] = self._poll_emitted
+            self.order_book.merge(self._poll_new_orders)
+            logging.warning(f"{self.name}平台轮询未完成，保留已收到的 {len(self._poll_new_orders)} 条新订单")
+        return result
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        获取适配器的HTTP会话
+
+        会话在轮询之间复用，保持与平台的长连接，避免每次轮询都重新进行DNS解析和TLS握手；
+        同时挂载网络跟踪配置，记录DNS、建连和首字节耗时。
+
+        Returns:
+            aiohttp.ClientSession: HTTP会话
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                trace_configs=[create_trace_config()],
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
+        return self._session
+
+    def _request_timeout(self, configured: float) -> aiohttp.ClientTimeout:
+        """
+        本次请求的超时：配置的超时时间，轮询中不超过截止时间的剩余时间
+
+        Args:
+            configured (float): 配置的请求超时时间（秒）
+
+        Returns:
+            aiohttp.ClientTimeout: 请求超时设置
+
+        Raises:
+            DeadlineExceeded: 本次轮询已超过截止时间
+        """
+        self.deadline.check('request')
+        remaining = self.deadline.remaining()
+        return aiohttp.ClientTimeout(total=configured if remaining is None else min(configured, remaining))
+
+    def _emit_orders(self, orders: list) -> bool:
+        """
+        把新订单立即交给 order_sink，回调出错不影响订单处理
+
+        Args:
+            orders (list): 新订单列表
+
+        Returns:
+            bool: 已交给回调时返回True，未设置回调时返回False
+        """
+        if self.order_sink is None:
+            return False
+        self._poll_emitted = True
+        try:
+            self.order_sink(self.name, orders)
+        except Exception as e:
+            logging.error(f"{self.name}平台订单回调出错: {e}")
+        return True
+
+    def _capture_response(self, status: int, body, latency: float):
+        """
+        把订单列表的原始响应交给抓取器（只入队，不阻塞轮询）
+
+        Args:
+            status (int): HTTP状态码
+            body (str | bytes): 原始响应内容
+            latency (float): 从发出请求到收完响应的耗时（秒）
+        """
+        if self.capture is not None:
+            self.capture.record(self.name, status, latency, body)
+
+    def _success_result(self, orders: list) -> dict:
+        """构造成功的处理结果"""
+        return {'name': self.name, 'success': True, 'orders': orders}
+
+    def _failure_result(self) -> dict:
+        """构造失败的处理结果"""
+        return {'name': self.name, 'success': False, 'orders': []}
+
+    def _standardize_orders(self, raw_orders: list) -> list:
+        """
+        预过滤并标准化原始订单，使用注册表中声明的字段映射编译出的转换函数
+
+        Args:
+            raw_orders (list): 原始订单列表
+
+        Returns:
+            list: 标准化后的订单列表
+        """
+        standardized = get_converter(self.PLATFORM_KEY)(raw_orders, self.name)
+        logging.info(f"{self.name}平台数据标准化完成，从 {len(raw_orders)} 条原始订单中得到 {len(standardized)} 条有效订单")
+        return standardized
+
+    def _deduplicate_orders(self, standardized_orders: list) -> list:
+        """
+        去重处理，过滤掉已经见过的订单
+
+        Args:
+            standardized_orders (list): 标准化后的订单列表
+
+        Returns:
+            list: 去重后的新订单列表
+        """
+        new_orders = self.deduplicator.filter_new(standardized_orders)
+        # 通过去重的订单不会再被视为新订单，记录下来以便轮询被取消时仍能交给后台线程
+        self._poll_new_orders.extend(new_orders)
+        return new_orders
+
+    def _is_unchanged_payload(self, payload) -> bool:
+        """
+        判断原始响应是否与上一次成功处理的响应完全相同
+
+        相同时跳过解密、解析、标准化、去重和入库，只刷新上次订单的出现时间，
+        保证仍在列表中的订单不会因为去重记录过期而被重复提醒。
+
+        Args:
+            payload (str | bytes): 原始响应内容
+
+        Returns:
+            bool: 与上一次相同时返回True
+        """
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+
+        self.metrics['payloads'] += 1
+        if digest == self._last_payload_hash:
+            self.metrics['fingerprint_skips'] += 1
+            self.deduplicator.touch(self._last_payload_order_ids)
+            self.order_book.touch()
+            logging.debug(f"{self.name}平台响应与上次相同，跳过处理")
+            return True
+
+        self._pending_payload_hash = digest
+        return False
+
+    def _remember_payload(self, orders: list):
+        """
+        当前响应处理成功后记录其指纹，供下一次轮询比较
+
+        Args:
+            orders (list): 本次响应中标准化后的全部订单
+        """
+        self._last_payload_hash = self._pending_payload_hash
+        self._last_payload_order_ids = tuple(order.get('order_id') for order in orders if order.get('order_id'))
+
+    def get_metrics(self) -> dict:
+        """
+        获取适配器运行指标
+
+        Returns:
+            dict: 运行指标，包含去重器、挂单簿、对冲请求统计和熔断器状态
+        """
+        metrics = dict(self.metrics)
+        metrics['dedup'] = self.deduplicator.get_metrics()
+        metrics['book'] = self.order_book.get_metrics()
+        metrics['hedge'] = self.hedger.get_metrics()
+        metrics['circuit'] = self.circuit_breaker.get_state()
+        return metrics
+
+    def export_state(self) -> dict:
+        """
+        导出需要跨重启保留的适配器状态
+
+        Returns:
+            dict: 可JSON序列化的状态数据
+        """
+        return {'dedup': self.deduplicator.export_state()}
+
+    def restore_state(self, state: dict, restore_dedup: bool = True):
+        """
+        从快照恢复适配器状态
+
+        Args:
+            state (dict): export_state() 导出的数据
+            restore_dedup (bool): 是否恢复去重状态
+        """
+        if restore_dedup:
+            self.deduplicator.restore_state(state.get('dedup', {}))
+
+    async def close(self):
+        """释放适配器持有的资源（HTTP会话），子类重写时需调用父类实现"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
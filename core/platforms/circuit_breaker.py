@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+熔断器模块 - 平台连续失败时暂停轮询，定期用单个探测请求检查平台是否恢复
+"""
+
+import time
+import logging
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
+# 熔断器状态
+CLOSED = 'closed'        # 正常轮询
+OPEN = 'open'            # 熔断中，轮询直接短路
+HALF_OPEN = 'half_open'  # 冷却结束，放行一个探测请求
+
+
+class CircuitBreaker:
+    """
+    单个平台的熔断器
+
+    连续失败（包括超时）达到 failure_threshold 次后打开，打开期间的轮询直接返回失败，
+    不发出任何请求；经过 reset_timeout 秒后进入半开状态，只放行一个探测请求：
+    探测成功则关闭熔断器恢复正常轮询，失败则重新打开并再等待 reset_timeout 秒。
+
+    只在状态变化时记录日志，平台宕机期间日志保持安静。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        """
+        初始化熔断器
+
+        Args:
+            name (str): 平台名称，用于日志
+            failure_threshold (int): 打开熔断器所需的连续失败次数
+            reset_timeout (float): 打开后进入半开状态前的冷却时间（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+        # 统计计数
+        self.open_count = 0
+        self.short_circuited = 0
+
+    def allow_request(self) -> bool:
+        """
+        判断本次轮询是否可以发出请求
+
+        Returns:
+            bool: 可以发出请求时返回True；返回False时本次轮询应被短路
+        """
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            logging.info(f"{self.name}平台熔断冷却结束，发出探测请求")
+
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        """记录一次成功的轮询"""
+        if self.state != CLOSED:
+            logging.info(f"✅ {self.name}平台已恢复，熔断器关闭")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """记录一次失败（或超时）的轮询"""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+
+        if self.state == HALF_OPEN:
+            self._open()
+            logging.warning(f"{self.name}平台探测请求失败，熔断器保持打开，{self.reset_timeout:g}秒后再次探测")
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+            logging.warning(f"⚠️ {self.name}平台连续失败 {self.consecutive_failures} 次，熔断器打开，"
+                            f"暂停轮询 {self.reset_timeout:g} 秒")
+
+    def release_probe(self):
+        """
+        轮询被取消（如程序退出）时调用：既不算成功也不算失败，只释放半开状态下的探测名额，
+        下一次轮询可以重新发出探测请求
+        """
+        self._probe_in_flight = False
+
+    def _open(self):
+        """打开熔断器"""
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.open_count += 1
+
+    def is_closed(self) -> bool:
+        """熔断器是否处于关闭（正常）状态"""
+        return self.state == CLOSED
+
+    def get_state(self) -> dict:
+        """
+        获取熔断器状态
+
+        Returns:
+            dict: 状态、连续失败次数、打开次数、被短路的轮询次数，以及打开状态下距下次探测的秒数
+        """
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'open_count': self.open_count,
+            'short_circuited': self.short_circuited,
+            'retry_in': retry_in
+        }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单去重模块 - 所有平台适配器共用的基于哈希表和过期时间的去重组件
+"""
+
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from config import ORDER_DEDUP_TTL, ORDER_DEDUP_MAX_SIZE, ORDER_FINGERPRINT_FIELDS
+
+
+def order_fingerprint(order, fields: tuple = ORDER_FINGERPRINT_FIELDS) -> int:
+    """
+    计算订单价格相关字段的指纹（32位CRC），跨进程稳定，可以保存到快照
+
+    Args:
+        order: 标准化订单
+        fields (tuple): 参与指纹计算的字段
+
+    Returns:
+        int: 指纹
+    """
+    values = tuple(order.get(field) for field in fields)
+    return zlib.crc32(repr(values).encode('utf-8'))
+
+
+def _mark_updated(order):
+    """给已见过但价格相关字段发生变化的订单打上 updated 标记"""
+    if isinstance(order, dict):
+        order['updated'] = True
+    else:
+        order.updated = True
+
+
+class OrderDeduplicator:
+    """
+    订单去重器
+
+    以 order_id -> 最后一次出现时间 的有序字典保存已见过的订单，成员判断为O(1)。
+    每次轮询都会刷新仍在列表中的订单的出现时间并移到字典末尾，因此字典始终按出现时间排列，
+    只要订单还挂在平台上就不会过期；订单从列表消失超过 ttl 秒后才会被清理。
+    记录总数超过 max_size 时从字典头部淘汰最久未出现的订单，不需要排序，
+    也不会淘汰本次轮询中仍在列表里的订单（否则下一次轮询会被重复提醒）。
+
+    同时为每个订单保存价格相关字段的指纹（32位CRC）：已见过的订单指纹变化时（如平台调高了竞价），
+    该订单作为"已更新"订单再次返回，使其按新价格重新匹配规则并更新数据库。
+    """
+
+    def __init__(self, ttl: float = ORDER_DEDUP_TTL, max_size: int = ORDER_DEDUP_MAX_SIZE,
+                 fingerprint_fields: tuple = ORDER_FINGERPRINT_FIELDS):
+        """
+        初始化去重器
+
+        Args:
+            ttl (float): 订单最后一次出现后保留的秒数
+            max_size (int): 最多保留的订单ID数量
+            fingerprint_fields (tuple): 参与指纹计算的订单字段，为空时只按order_id去重
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.fingerprint_fields = tuple(fingerprint_fields)
+        # order_id -> 最后一次出现时间，按出现时间从早到晚排列
+        self._last_seen = OrderedDict()
+        self._fingerprints = {}
+
+        # 过期清理的时间间隔，避免每次轮询都全量扫描
+        self._sweep_interval = max(ttl / 10, 1)
+        self._last_sweep_time = time.time()
+
+        # 统计指标
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._last_seen)
+
+    def __contains__(self, order_id):
+        last_seen = self._last_seen.get(order_id)
+        return last_seen is not None and last_seen >= time.time() - self.ttl
+
+    def filter_new(self, orders: list) -> list:
+        """
+        过滤出未见过的订单和价格相关字段发生变化的订单，并刷新本次出现的所有订单的时间
+
+        Args:
+            orders (list): 标准化后的订单列表
+
+        Returns:
+            list: 新订单和已更新订单（带 updated 标记）的列表
+        """
+        now = time.time()
+        expire_before = now - self.ttl
+        last_seen = self._last_seen
+        fingerprints = self._fingerprints
+        use_fingerprint = bool(self.fingerprint_fields)
+        new_orders = []
+
+        for order in orders:
+            order_id = order.get('order_id')
+
+            # 跳过没有ID的订单
+            if not order_id:
+                continue
+
+            fingerprint = order_fingerprint(order, self.fingerprint_fields) if use_fingerprint else None
+            previous = last_seen.get(order_id)
+            if previous is None or previous < expire_before:
+                self.misses += 1
+                new_orders.append(order)
+            else:
+                # 只有记录过指纹且指纹变化时才视为更新（从数据库预热的订单没有指纹）
+                previous_fingerprint = fingerprints.get(order_id)
+                if previous_fingerprint is not None and previous_fingerprint != fingerprint:
+                    self.updates += 1
+                    _mark_updated(order)
+                    new_orders.append(order)
+                else:
+                    self.hits += 1
+            last_seen[order_id] = now
+            last_seen.move_to_end(order_id)
+            if use_fingerprint:
+                fingerprints[order_id] = fingerprint
+
+        if now - self._last_sweep_time >= self._sweep_interval or len(last_seen) > self.max_size:
+            self._sweep(now)
+
+        return new_orders
+
+    def touch(self, order_ids):
+        """
+        刷新一组订单ID的出现时间（不做新旧判断）
+
+        Args:
+            order_ids (iterable): 订单ID集合
+        """
+        now = time.time()
+        last_seen = self._last_seen
+        for order_id in order_ids:
+            last_seen[order_id] = now
+            last_seen.move_to_end(order_id)
+
+    def seed(self, order_ids, seen_at: float = None):
+        """
+        将一组订单ID标记为已见过（用于启动时从数据库预热）
+
+        Args:
+            order_ids (iterable): 订单ID集合
+            seen_at (float): 出现时间，默认为当前时间
+        """
+        if seen_at is None:
+            seen_at = time.time()
+        for order_id in order_ids:
+            if order_id and self._last_seen.get(order_id, 0) < seen_at:
+                self._last_seen[order_id] = seen_at
+        self._reorder()
+
+    def export_state(self) -> dict:
+        """
+        导出去重状态，用于保存快照
+
+        Returns:
+            dict: 包含 last_seen（order_id -> 最后一次出现时间）和 fingerprints（order_id -> 指纹）
+        """
+        return {'last_seen': dict(self._last_seen), 'fingerprints': dict(self._fingerprints)}
+
+    def restore_state(self, state: dict):
+        """
+        从快照恢复去重状态，已过期的记录会被丢弃
+
+        Args:
+            state (dict): export_state() 导出的数据
+        """
+        expire_before = time.time() - self.ttl
+        fingerprints = state.get('fingerprints', {})
+        for order_id, seen_at in state.get('last_seen', {}).items():
+            if seen_at >= expire_before and self._last_seen.get(order_id, 0) < seen_at:
+                self._last_seen[order_id] = seen_at
+                if order_id in fingerprints:
+                    self._fingerprints[order_id] = fingerprints[order_id]
+        self._reorder()
+
+        if len(self._last_seen) > self.max_size:
+            self._sweep(time.time())
+
+    def _reorder(self):
+        """按出现时间重新排列记录（只在启动预热和恢复快照时调用，这两处会写入早于现有记录的时间）"""
+        self._last_seen = OrderedDict(sorted(self._last_seen.items(), key=lambda item: item[1]))
+
+    def _sweep(self, now: float):
+        """
+        从字典头部清理过期记录，并在超出容量时淘汰最久未出现的记录
+
+        Args:
+            now (float): 本次轮询的时间，出现时间等于它的订单仍在列表中，不会被淘汰
+        """
+        expire_before = now - self.ttl
+        last_seen = self._last_seen
+        fingerprints = self._fingerprints
+        evicted = 0
+        while last_seen:
+            order_id, seen_at = next(iter(last_seen.items()))
+            if seen_at >= expire_before and (len(last_seen) <= self.max_size or seen_at >= now):
+                break
+            del last_seen[order_id]
+            fingerprints.pop(order_id, None)
+            evicted += 1
+
+        if evicted:
+            self.evictions += evicted
+            logging.debug(f"去重记录清理完成，淘汰 {evicted} 条，剩余 {len(last_seen)} 条")
+        if len(last_seen) > self.max_size:
+            logging.debug(f"当前列表中的订单数超过去重记录上限 {self.max_size}，暂不淘汰")
+
+        self._last_sweep_time = now
+
+    def get_metrics(self) -> dict:
+        """
+        获取去重器的统计指标
+
+        Returns:
+            dict: 包含 size/hits/misses/updates/evictions 的字典
+        """
+        return {
+            'size': len(self._last_seen),
+            'hits': self.hits,
+            'misses': self.misses,
+            'updates': self.updates,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字段映射模块 - 将平台声明的字段映射、类型转换和预过滤编译为单个订单转换函数
+"""
+
+import logging
+from ..order import Order, ORDER_FIELDS
+
+# 可以由平台字段映射填充的标准字段
+MAPPABLE_FIELDS = tuple(field for field in ORDER_FIELDS if field not in ('platform', 'raw_data', 'updated'))
+
+
+class Field:
+    """
+    单个标准字段的映射声明
+
+    Args:
+        *sources (str): 原始字段名，按顺序取第一个不为None的值（如 'discountPriceUp', 'salePrice'）
+        coerce (type): 类型转换函数，如 float/int/str；为None时保持原值
+        default: 原始值缺失、为空或转换失败时使用的默认值
+        required (bool): 为True时，值为空的订单会被跳过
+    """
+
+    __slots__ = ('sources', 'coerce', 'default', 'required')
+
+    def __init__(self, *sources: str, coerce=None, default='', required: bool = False):
+        if not sources:
+            raise ValueError("Field至少需要一个原始字段名")
+        self.sources = sources
+        self.coerce = coerce
+        self.default = default
+        self.required = required
+
+
+def _warn_missing_id(platform: str, raw: dict):
+    logging.warning(f"{platform}平台订单缺少ID字段，跳过此订单: {raw}")
+
+
+def _warn_bad_value(platform: str, order_id, field_name: str, value, default):
+    logging.warning(f"{platform}平台订单 {order_id} 的{field_name}字段值 {value!r} 转换失败，使用默认值{default!r}")
+
+
+def _warn_bad_order(platform: str, raw, error: Exception):
+    logging.warning(f"标准化{platform}平台订单数据失败，跳过此订单: {error}")
+    logging.warning(f"有问题的原始订单数据: {raw}")
+
+
+def compile_converter(platform_key: str, fields: dict, exclude: dict = None):
+    """
+    把字段映射声明编译为一个转换函数
+
+    生成的函数对每条原始订单只做一次字典查找和必要的类型转换，没有逐字段的函数调用开销。
+
+    Args:
+        platform_key (str): 平台标识，仅用于生成的函数名
+        fields (dict): 标准字段名 -> Field
+        exclude (dict): 原始字段名 -> 需要排除的取值集合（预过滤）
+
+    Returns:
+        function: convert(raw_orders, platform) -> list[Order]
+    """
+    unknown = set(fields) - set(MAPPABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"未知的标准字段: {sorted(unknown)}")
+    if 'order_id' not in fields:
+        raise ValueError("字段映射必须包含order_id")
+
+    namespace = {
+        'Order': Order,
+        '_warn_missing_id': _warn_missing_id,
+        '_warn_bad_value': _warn_bad_value,
+        '_warn_bad_order': _warn_bad_order,
+    }
+    lines = [
+        f"def convert_{platform_key}(raw_orders, platform):",
+        "    result = []",
+        "    append = result.append",
+        "    for raw in raw_orders:",
+        "        try:",
+        "            get = raw.get",
+    ]
+    body = "            "
+
+    # 预过滤
+    for index, (source, values) in enumerate((exclude or {}).items()):
+        namespace[f'_exclude_{index}'] = frozenset(values)
+        lines.append(f"{body}if get({source!r}) in _exclude_{index}:")
+        lines.append(f"{body}    continue")
+
+    # order_id 最先处理，后续字段的告警信息需要用到它
+    ordered_fields = ['order_id'] + [name for name in fields if name != 'order_id']
+    for name in ordered_fields:
+        spec = fields[name]
+        target = f"f_{name}"
+        default_ref = f"_default_{name}"
+        namespace[default_ref] = spec.default
+
+        lines.append(f"{body}v = get({spec.sources[0]!r})")
+        for source in spec.sources[1:]:
+            lines.append(f"{body}if v is None:")
+            lines.append(f"{body}    v = get({source!r})")
+
+        if spec.coerce is None:
+            lines.append(f"{body}{target} = {default_ref} if v is None else v")
+        elif spec.coerce is str:
+            lines.append(f"{body}{target} = {default_ref} if v is None else (v if v.__class__ is str else str(v))")
+        else:
+            coerce_ref = f"_coerce_{name}"
+            namespace[coerce_ref] = spec.coerce
+            lines.append(f"{body}if v:")
+            lines.append(f"{body}    try:")
+            lines.append(f"{body}        {target} = {coerce_ref}(v)")
+            lines.append(f"{body}    except (ValueError, TypeError):")
+            lines.append(f"{body}        {target} = {default_ref}")
+            lines.append(f"{body}        _warn_bad_value(platform, f_order_id, {name!r}, v, {default_ref})")
+            lines.append(f"{body}else:")
+            lines.append(f"{body}    {target} = {default_ref}")
+
+        if spec.required:
+            lines.append(f"{body}if not {target}:")
+            if name == 'order_id':
+                lines.append(f"{body}    _warn_missing_id(platform, raw)")
+            lines.append(f"{body}    continue")
+
+    arguments = ', '.join(f"{name}=f_{name}" for name in ordered_fields)
+    lines.append(f"{body}append(Order(platform=platform, raw_data=raw, {arguments}))")
+    lines.append("        except Exception as e:")
+    lines.append("            _warn_bad_order(platform, raw, e)")
+    lines.append("    return result")
+
+    source_code = '\n'.join(lines)
+    exec(compile(source_code, f"<field_mapping:{platform_key}>", 'exec'), namespace)
+    converter = namespace[f"convert_{platform_key}"]
+    converter.source_code = source_code
+    return converter
@@ -4,33 +4,49 @@
 哈哈平台适配器 - 负责处理哈哈平台的API请求、解密和数据处理
 """
 
-import json
+import time
 import logging
-import collections
-import aiohttp
 import hashlib
 import base64
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 from .base_adapter import BaseAdapter
-from ..database import DatabaseManager
-from config import API_URL, API_HEADERS, API_DATA_PAYLOAD, API_TOKEN, MAX_ORDERS_CACHE
+from .. import jsoncodec
+from ..metrics import PollTimer
+from ..deadline import DeadlineExceeded
+from config import API_URL, API_HEADERS, API_DATA_PAYLOAD, API_TOKEN, HAHA_REQUEST_TIMEOUT
 
 
 class HahaAdapter(BaseAdapter):
     """哈哈平台适配器类"""
     
+    PLATFORM_KEY = 'haha'
+
     def __init__(self, name: str):
         """初始化哈哈平台适配器"""
         super().__init__(name)
-        # 用于去重的双端队列，最多保存指定数量的已见过的订单ID
-        self.seen_order_ids = collections.deque(maxlen=MAX_ORDERS_CACHE)
-
-        # 初始化数据库管理器
-        self.db_manager = DatabaseManager()
 
         logging.info(f"{self.name}平台适配器初始化完成")
     
+    async def _request_order_list(self):
+        """
+        请求订单列表接口（复用长连接会话，超时时间见 config.HAHA_REQUEST_TIMEOUT，不超过本次轮询的剩余时间）
+
+        Returns:
+            tuple: (HTTP状态码, 响应文本)
+        """
+        started = time.perf_counter()
+        async with self._get_session().post(
+            API_URL,
+            data=API_DATA_PAYLOAD,
+            headers=API_HEADERS,
+            timeout=self._request_timeout(HAHA_REQUEST_TIMEOUT),
+            trace_request_ctx={'platform': self.name}
+        ) as response:
+            response_text = await response.text()
+            self._capture_response(response.status, response_text, time.perf_counter() - started)
+            return response.status, response_text
+
     async def fetch_and_process(self):
         """
         获取并处理哈哈平台的订单数据
@@ -42,35 +58,39 @@ class HahaAdapter(BaseAdapter):
         4. 去重处理
         5. 返回标准化的订单列表
 
+        每个阶段的耗时都会记录到性能指标中。
+
         Returns:
-            list: 标准化的订单列表
+            dict: 包含平台名称、成功状态和订单列表的字典
         """
+        timer = PollTimer(self.name)
         try:
-            # 执行真实API请求，严格按照config.py中的配置
-            async with aiohttp.ClientSession(headers=API_HEADERS) as session:
-                logging.info("正在请求哈哈平台API...")
+            # 执行真实API请求，严格按照config.py中的配置（启用时对慢请求发出对冲请求）
+            logging.info("正在请求哈哈平台API...")
+            with timer.stage('fetch'):
+                status, response_text = await self.hedger.run(self._request_order_list)
+            logging.info(f"API响应状态码: {status}")
 
-                async with session.post(API_URL, data=API_DATA_PAYLOAD) as response:
-                    # 获取返回的响应文本
-                    response_text = await response.text()
-                    logging.info(f"API响应状态码: {response.status}")
+            # 请求返回后检查截止时间，超时则不再解密和解析
+            self.deadline.check('parse')
 
-                    # 检查HTTP状态码
-                    if response.status != 200:
-                        logging.error(f"HTTP请求失败，状态码: {response.status}")
-                        return []
+            # 检查HTTP状态码
+            if status != 200:
+                logging.error(f"HTTP请求失败，状态码: {status}")
+                return self._failure_result()
 
             # 解析JSON响应并提取数据
             try:
                 # 1. 解析JSON响应
-                api_response = json.loads(response_text)
+                with timer.stage('parse'):
+                    api_response = jsoncodec.loads(response_text)
 
                 # 检查响应状态（根据实际API响应结构调整）
                 if isinstance(api_response, dict):
                     status = api_response.get('status') or api_response.get('code')
                     if status and status != 200:
                         logging.error(f"API返回错误状态: {api_response}")
-                        return []
+                        return self._failure_result()
 
                 # 2. 提取数据内容
                 # 根据实际API响应结构提取数据，可能是加密数据或直接的订单数据
@@ -81,48 +101,54 @@ class HahaAdapter(BaseAdapter):
                     # 如果直接是列表或其他格式
                     raw_data = api_response
 
-                if not raw_data:
-                    logging.warning("API响应中没有找到有效数据")
-                    return []
+                # 响应指纹：与上一次的密文完全相同时跳过解密及后续全部处理
+                payload = raw_data if isinstance(raw_data, str) and raw_data else response_text
+                if self._is_unchanged_payload(payload):
+                    return self._success_result([])
 
                 # 3. 判断是否需要解密
-                if isinstance(raw_data, str):
+                if not raw_data:
+                    # 当前没有挂单：正常的空结果，照常更新挂单簿，让已下架的订单移出
+                    logging.info("API响应中没有订单数据")
+                    decrypted_orders = []
+                elif isinstance(raw_data, str):
                     # 如果是字符串，可能是加密数据
-                    decrypted_orders = await self._decrypt_data(raw_data)
-                    if not decrypted_orders:
+                    with timer.stage('decrypt'):
+                        decrypted_orders = await self._decrypt_data(raw_data)
+                    if decrypted_orders is None:
                         logging.warning("解密后没有获得有效的订单数据")
-                        return []
+                        return self._failure_result()
                 elif isinstance(raw_data, list):
                     # 如果是列表，可能是直接的订单数据
                     logging.info("检测到列表数据，直接处理...")
                     decrypted_orders = raw_data
                 else:
                     logging.warning(f"未知的数据格式: {type(raw_data)}")
-                    return []
+                    return self._failure_result()
 
-            except json.JSONDecodeError as e:
+            except jsoncodec.JSONDecodeError as e:
                 logging.error(f"解析API响应JSON失败: {e}")
                 logging.error(f"原始响应内容: {response_text}")
-                return []
+                return self._failure_result()
 
-            # 4. 精确预过滤：只保留 is_from != '5' 的订单
-            filtered_orders = []
-            for order in decrypted_orders:
-                if order.get('is_from') != '5':
-                    filtered_orders.append(order)
+            # 4. 预过滤（排除is_from='5'）与数据标准化，由注册表中声明的字段映射完成
+            # 去重之前最后一次检查截止时间，之后的订单即视为已处理
+            self.deadline.check('standardize')
+            with timer.stage('standardize'):
+                standardized_orders = self._standardize_orders(decrypted_orders)
 
-            logging.info(f"精确预过滤完成，从 {len(decrypted_orders)} 条订单中筛选出 {len(filtered_orders)} 条有效订单（排除is_from='5'）")
+            # 5. 去重处理
+            with timer.stage('dedup'):
+                new_orders = self._deduplicate_orders(standardized_orders)
 
-            # 5. 数据标准化
-            standardized_orders = self._standardize_orders(filtered_orders)
+            # 更新挂单簿（新增/变化/移除事件）
+            with timer.stage('book'):
+                self.order_book.apply_snapshot(standardized_orders)
 
-            # 6. 去重处理
-            new_orders = self._deduplicate_orders(standardized_orders)
+            # 新订单由后台线程在匹配规则之后交给持久化线程保存，不占用提醒的关键路径
+            self._remember_payload(standardized_orders)
 
-            # 7. 保存新订单到数据库
-            self.db_manager.save_orders(new_orders, self.name)
-
-            # 8. 调试信息：统计 is_lock=1 的订单
+            # 6. 调试信息：统计 is_lock=1 的订单
             locked_orders_count = 0
             for order in new_orders:
                 if order.get('raw_data', {}).get('is_lock') == '1':
@@ -132,28 +158,26 @@ class HahaAdapter(BaseAdapter):
             if locked_orders_count > 0:
                 logging.debug(f"🔒 发现 {locked_orders_count} 条 is_lock=1 订单")
 
-            # 9. 记录处理统计信息
-            logging.debug(f"📋 本次处理了 {len(decrypted_orders)} 条原始订单，过滤后 {len(filtered_orders)} 条，新增 {len(new_orders)} 条")
+            # 7. 记录处理统计信息
+            logging.debug(f"📋 本次处理了 {len(decrypted_orders)} 条原始订单，过滤后 {len(standardized_orders)} 条，新增 {len(new_orders)} 条")
 
             logging.info(f"成功处理 {len(new_orders)} 个新订单")
 
             # 返回新的统一格式
-            return {
-                'name': self.name,
-                'success': True,
-                'orders': new_orders
-            }
+            return self._success_result(new_orders)
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logging.error(f"🚨 {self.name}平台获取订单数据时发生错误: {e}")
             logging.error(f"错误类型: {type(e).__name__}")
-            import traceback
-            logging.error(f"错误堆栈: {traceback.format_exc()}")
-            return {
-                'name': self.name,
-                'success': False,
-                'orders': []
-            }
+            # 只在连续失败的第一次输出完整堆栈，平台宕机期间不重复刷屏
+            if self.circuit_breaker.consecutive_failures == 0:
+                import traceback
+                logging.error(f"错误堆栈: {traceback.format_exc()}")
+            return self._failure_result()
+        finally:
+            timer.finish()
 
     def _aes_decrypt(self, ciphertext: str, token: str) -> str:
         """
@@ -196,7 +220,7 @@ class HahaAdapter(BaseAdapter):
             encrypted_data (str): Base64编码的加密数据
 
         Returns:
-            list: 解密后的订单列表，如果解密失败返回空列表
+            list: 解密后的订单列表（没有订单时为空列表），解密或解析失败时返回None
         """
         try:
             # 调用经过验证的AES解密函数
@@ -204,10 +228,10 @@ class HahaAdapter(BaseAdapter):
 
             if decrypted_json_str is None:
                 logging.error("AES解密失败，返回None")
-                return []
+                return None
 
             # 解析JSON数据
-            decrypted_data = json.loads(decrypted_json_str)
+            decrypted_data = jsoncodec.loads(decrypted_json_str)
 
             # 检查解密后的数据格式
             if isinstance(decrypted_data, list):
@@ -215,120 +239,22 @@ class HahaAdapter(BaseAdapter):
                 return decrypted_data
             elif isinstance(decrypted_data, dict):
                 # 如果是字典，尝试提取订单列表
-                orders = decrypted_data.get('data', decrypted_data.get('list', []))
+                orders = decrypted_data.get('data', decrypted_data.get('list'))
                 if isinstance(orders, list):
                     logging.info(f"✅ 解密成功，从字典中提取 {len(orders)} 条订单数据")
                     return orders
                 else:
                     logging.warning("解密后的字典中没有找到订单列表")
-                    return []
+                    return None
             else:
                 logging.warning(f"解密后的数据格式不正确: {type(decrypted_data)}")
-                return []
+                return None
 
-        except json.JSONDecodeError as e:
+        except jsoncodec.JSONDecodeError as e:
             logging.error(f"解密后JSON解析失败: {e}")
             logging.error(f"解密后的字符串前200字符: {decrypted_json_str[:200] if 'decrypted_json_str' in locals() else 'N/A'}")
-            return []
+            return None
         except Exception as e:
             logging.error(f"解密数据失败: {e}")
             logging.error(f"错误类型: {type(e).__name__}")
-            return []
-    
-    def _standardize_orders(self, filtered_orders: list) -> list:
-        """
-        标准化订单数据格式 - v1.0最终版本
-
-        接收经过预过滤的订单列表，进行字段映射和数据类型转换
-
-        Args:
-            filtered_orders (list): 经过预过滤的订单数据列表（is_from != '5'）
-
-        Returns:
-            list: 标准化后的订单列表
-        """
-        standardized = []
-
-        for order in filtered_orders:
-            try:
-                # 提取订单ID
-                order_id = order.get('order_id', '')
-
-                # 验证必要字段
-                if not order_id:
-                    logging.warning(f"订单缺少order_id字段，跳过此订单: {order}")
-                    continue
-
-                # 安全地转换bidding_price字段 - 从 order.get('maxPrice', 0.0) 获取
-                bidding_price = 0.0
-                try:
-                    price_value = order.get('maxPrice', 0.0)
-                    bidding_price = float(price_value) if price_value else 0.0
-                except (ValueError, TypeError):
-                    logging.warning(f"订单 {order_id} 的maxPrice字段转换失败，使用默认值0.0")
-                    bidding_price = 0.0
-
-                # 安全地转换seat_count字段
-                seat_count = 1
-                try:
-                    seat_value = order.get('seat_num', 1)
-                    seat_count = int(seat_value) if seat_value else 1
-                except (ValueError, TypeError):
-                    logging.warning(f"订单 {order_id} 的seat_num字段转换失败，使用默认值1")
-                    seat_count = 1
-
-                # 提取字符串字段（提供默认值）
-                city = order.get('cityName', '')
-                cinema_name = order.get('cinemaName', '')
-                hall_type = order.get('hallName', '')
-                movie_name = order.get('movieName', '')
-
-                # 构建标准化订单对象
-                standardized_order = {
-                    'order_id': order_id,
-                    'bidding_price': bidding_price,
-                    'seat_count': seat_count,
-                    'city': city,
-                    'cinema_name': cinema_name,
-                    'hall_type': hall_type,
-                    'movie_name': movie_name,
-                    # 保留原始数据以备后用
-                    'raw_data': order
-                }
-
-                standardized.append(standardized_order)
-
-            except Exception as e:
-                logging.warning(f"标准化订单数据失败，跳过此订单: {e}")
-                logging.warning(f"有问题的原始订单数据: {order}")
-                continue
-
-        logging.info(f"数据标准化完成，成功处理 {len(standardized)} 条订单")
-        return standardized
-    
-    def _deduplicate_orders(self, standardized_orders: list) -> list:
-        """
-        去重处理，过滤掉已经见过的订单
-
-        Args:
-            standardized_orders (list): 标准化后的订单列表
-
-        Returns:
-            list: 去重后的新订单列表
-        """
-        new_orders = []
-
-        for order in standardized_orders:
-            order_id = order.get('order_id', '')
-            
-            # 跳过没有ID的订单
-            if not order_id:
-                continue
-            
-            # 检查是否已经见过这个订单
-            if order_id not in self.seen_order_ids:
-                # 新订单，添加到结果列表和已见列表
-                new_orders.append(order)
-                self.seen_order_ids.append(order_id)
-        
-        return new_orders
+            return None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求模块 - 列表请求迟迟未返回时再发出一个相同的请求，先返回的结果生效
+"""
+
+import time
+import asyncio
+import logging
+from ..metrics import RollingHistogram
+from config import (
+    HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES, HEDGE_BUDGET_RATIO
+)
+
+
+class RequestHedger:
+    """
+    对冲请求执行器
+
+    主请求在最近请求耗时的指定分位数内没有返回时，发出一个相同的对冲请求，
+    先成功返回的请求胜出，另一个请求被取消。
+
+    对冲次数受预算限制：每个主请求为预算增加 budget_ratio，每次对冲消耗1，
+    预算最多积累到1，因此对冲请求数不会超过主请求数的 budget_ratio 倍（外加最多1次）。
+    """
+
+    def __init__(self, name: str, enabled: bool = HEDGE_ENABLED, percentile: float = HEDGE_PERCENTILE,
+                 min_delay: float = HEDGE_MIN_DELAY, min_samples: int = HEDGE_MIN_SAMPLES,
+                 budget_ratio: float = HEDGE_BUDGET_RATIO):
+        """
+        初始化对冲请求执行器
+
+        Args:
+            name (str): 平台名称，用于日志
+            enabled (bool): 是否启用对冲
+            percentile (float): 触发对冲的耗时分位数
+            min_delay (float): 触发对冲前的最短等待时间（秒）
+            min_samples (int): 积累到多少个耗时样本后才开始对冲
+            budget_ratio (float): 对冲请求数占主请求数的最大比例
+        """
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self.latency = RollingHistogram()
+        self._budget = 0.0
+
+        # 统计计数
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def _hedge_delay(self):
+        """
+        计算触发对冲前的等待时间
+
+        Returns:
+            float: 等待秒数，样本不足时返回None（不对冲）
+        """
+        if len(self.latency.samples) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    async def _timed(self, request_factory, record_cancelled: bool = False):
+        """
+        执行一次请求，成功时记录其耗时
+
+        Args:
+            request_factory: 无参数的异步函数
+            record_cancelled (bool): 被取消时是否记录已耗时间。主请求被对冲取消时，
+                其真实耗时至少为已耗时间，不记录会使分位数偏低、对冲越发越多
+        """
+        started = time.perf_counter()
+        try:
+            result = await request_factory()
+        except asyncio.CancelledError:
+            if record_cancelled:
+                self.latency.record(time.perf_counter() - started)
+            raise
+        self.latency.record(time.perf_counter() - started)
+        return result
+
+    async def run(self, request_factory):
+        """
+        执行请求，必要时发出对冲请求
+
+        Args:
+            request_factory: 无参数的异步函数，每次调用发出一个相同的请求
+
+        Returns:
+            先成功返回的请求结果；两个请求都失败时抛出主请求的异常
+        """
+        self.requests += 1
+        if not self.enabled:
+            return await request_factory()
+
+        self._budget = min(1.0, self._budget + self.budget_ratio)
+        delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._timed(request_factory, record_cancelled=True))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            if self._budget < 1.0:
+                self.budget_denied += 1
+                return await primary
+
+            self._budget -= 1.0
+            self.hedges += 1
+            logging.debug(f"{self.name}平台请求超过 {delay * 1000:.0f}ms 未返回，发出对冲请求")
+            hedge = asyncio.ensure_future(self._timed(request_factory))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+
+            # 两个请求都失败
+            return primary.result()
+        finally:
+            # 取消仍在进行的请求（对冲的输家，或外部取消时的全部请求），并等待其结束；
+            # 同时取走已失败请求的异常，避免事件循环报告未处理的异常
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_metrics(self) -> dict:
+        """
+        获取对冲统计
+
+        Returns:
+            dict: 主请求数、对冲次数、对冲胜出次数、因预算不足放弃的对冲次数
+        """
+        return {
+            'enabled': self.enabled,
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'budget_denied': self.budget_denied
+        }
@@ -4,23 +4,30 @@
 麻花平台适配器 - 负责麻花平台的数据获取和处理
 """
 
-import json
 import logging
 import time
 import hashlib
-import collections
+import asyncio
 import aiohttp
 from .base_adapter import BaseAdapter
-from ..database import DatabaseManager
+from .registry import get_converter
+from .. import jsoncodec
+from ..metrics import PollTimer
+from ..deadline import DeadlineExceeded
 from config import (
     MAHUA_DEV_CODE, MAHUA_SECRET_KEY, MAHUA_CHANNEL_ID,
-    MAHUA_LOGIN_URL, MAHUA_ORDER_LIST_URL, MAX_ORDERS_CACHE
+    MAHUA_LOGIN_URL, MAHUA_ORDER_LIST_URL,
+    MAHUA_TOKEN_TTL, MAHUA_TOKEN_REFRESH_MARGIN, MAHUA_TOKEN_RETRY_INTERVAL,
+    MAHUA_TOKEN_INVALID_CODES, MAHUA_TOKEN_INVALID_KEYWORDS, MAHUA_STREAMING_PARSE,
+    MAHUA_REQUEST_TIMEOUT, MAHUA_LOGIN_TIMEOUT
 )
 
 
 class MahuaAdapter(BaseAdapter):
     """麻花平台适配器类"""
     
+    PLATFORM_KEY = 'mahua'
+
     def __init__(self, name: str):
         """初始化麻花平台适配器"""
         super().__init__(name)
@@ -28,14 +35,48 @@ class MahuaAdapter(BaseAdapter):
         # Token缓存机制
         self.token = None
         self.token_expiry_time = 0
+        # 进行中的登录任务，并发调用方共享同一次登录（single-flight）
+        self._token_task = None
+        # 后台Token刷新任务，在过期前主动续期
+        self._token_refresher_task = None
+        # Token有效期计算使用的时钟与后台刷新使用的等待函数，测试中可替换为虚拟时间
+        self._clock = time.time
+        self._sleep = asyncio.sleep
+        if MAHUA_TOKEN_TTL <= MAHUA_TOKEN_REFRESH_MARGIN:
+            logging.warning(f"MAHUA_TOKEN_TTL（{MAHUA_TOKEN_TTL}秒）不大于 MAHUA_TOKEN_REFRESH_MARGIN"
+                            f"（{MAHUA_TOKEN_REFRESH_MARGIN}秒），后台将每 {MAHUA_TOKEN_RETRY_INTERVAL} 秒刷新一次Token")
 
-        # 用于去重的双端队列，最多保存指定数量的已见过的订单ID
-        self.seen_order_ids = collections.deque(maxlen=MAX_ORDERS_CACHE)
+        logging.info(f"{self.name}平台适配器初始化完成")
 
-        # 初始化数据库管理器
-        self.db_manager = DatabaseManager()
+    def _build_headers(self, body_json_str: str, token: str = None) -> dict:
+        """
+        构建带签名的请求头
 
-        logging.info(f"{self.name}平台适配器初始化完成")
+        Args:
+            body_json_str (str): 请求体JSON字符串
+            token (str): 访问Token，登录请求不需要
+
+        Returns:
+            dict: 请求头
+        """
+        txntime_ms = str(int(time.time() * 1000))
+
+        # 生成签名
+        string_to_sign = body_json_str + MAHUA_SECRET_KEY + txntime_ms
+        md5 = hashlib.md5()
+        md5.update(string_to_sign.encode('utf-8'))
+        sign = md5.hexdigest()
+
+        headers = {
+            'channelid': MAHUA_CHANNEL_ID,
+            'txntime': txntime_ms,
+            'devCode': MAHUA_DEV_CODE,
+            'sign': sign,
+            'Content-Type': 'application/json; charset=utf-8'
+        }
+        if token:
+            headers['token'] = token
+        return headers
     
     async def _get_token(self):
         """
@@ -47,228 +88,357 @@ class MahuaAdapter(BaseAdapter):
         try:
             logging.info(f"正在获取{self.name}平台Token...")
             
-            # 构建请求体
+            # 构建请求体和请求头
             body_json_str = "{}"
-            txntime_ms = str(int(time.time() * 1000))
-            
-            # 生成签名
-            string_to_sign = body_json_str + MAHUA_SECRET_KEY + txntime_ms
-            md5 = hashlib.md5()
-            md5.update(string_to_sign.encode('utf-8'))
-            sign = md5.hexdigest()
+            headers = self._build_headers(body_json_str)
             
-            # 构建请求头
-            headers = {
-                'channelid': MAHUA_CHANNEL_ID,
-                'txntime': txntime_ms,
-                'devCode': MAHUA_DEV_CODE,
-                'sign': sign,
-                'Content-Type': 'application/json; charset=utf-8'
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    MAHUA_LOGIN_URL,
-                    data=body_json_str.encode('utf-8'),
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    response_text = await response.text()
-                    response_data = json.loads(response_text)
-                    
-                    if response_data.get("rtnCode") == "000000":
-                        token = response_data.get("rtnData", {}).get("token")
-                        if token:
-                            # 更新token和过期时间（30分钟后过期）
-                            self.token = token
-                            self.token_expiry_time = time.time() + 30 * 60  # 30分钟
-                            
-                            logging.info(f"✅ 成功获取{self.name}平台Token")
-                            return token
-                    
-                    logging.error(f"❌ 获取{self.name}平台Token失败: {response_data.get('rtnMsg')}")
-                    return None
-                    
+            async with self._get_session().post(
+                MAHUA_LOGIN_URL,
+                data=body_json_str.encode('utf-8'),
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=MAHUA_LOGIN_TIMEOUT),
+                trace_request_ctx={'platform': self.name}
+            ) as response:
+                response_text = await response.text()
+                response_data = jsoncodec.loads(response_text)
+                
+                if response_data.get("rtnCode") == "000000":
+                    token = response_data.get("rtnData", {}).get("token")
+                    if token:
+                        # 更新token和过期时间
+                        self.token = token
+                        self.token_expiry_time = self._clock() + MAHUA_TOKEN_TTL
+                        
+                        logging.info(f"✅ 成功获取{self.name}平台Token")
+                        return token
+                
+                logging.error(f"❌ 获取{self.name}平台Token失败: {response_data.get('rtnMsg')}")
+                return None
+                
         except Exception as e:
             logging.error(f"❌ 获取{self.name}平台Token时发生错误: {e}")
             return None
+
+    def _is_token_valid(self) -> bool:
+        """判断缓存的Token是否仍在有效期内"""
+        return bool(self.token) and self._clock() < self.token_expiry_time
+
+    async def _refresh_token(self, stale_token: str = None):
+        """
+        刷新Token，并发调用方共享同一次进行中的登录
+
+        Args:
+            stale_token (str): 被平台拒绝的旧Token。如果其他调用方已经换上了新Token，
+                               直接复用新Token，不再重复登录
+
+        Returns:
+            str: 成功时返回token，失败时返回None
+        """
+        if stale_token and self.token != stale_token and self._is_token_valid():
+            return self.token
+
+        if self._token_task is None or self._token_task.done():
+            self._token_task = asyncio.ensure_future(self._get_token())
+
+        # 使用shield，避免某个调用方被取消时连带取消其他调用方共享的登录
+        return await asyncio.shield(self._token_task)
+
+    async def _ensure_token(self):
+        """
+        获取可用的Token，只有缓存失效时才会登录
+
+        Returns:
+            str: 成功时返回token，失败时返回None
+        """
+        if self._is_token_valid():
+            return self.token
+
+        logging.info(f"{self.name}平台Token无效或已过期，正在重新获取...")
+        return await self._refresh_token()
+
+    def _start_token_refresher(self):
+        """启动后台Token刷新任务（已在运行时不重复启动）"""
+        if self._token_refresher_task is None or self._token_refresher_task.done():
+            self._token_refresher_task = asyncio.ensure_future(self._token_refresher_loop())
+
+    async def _token_refresher_loop(self):
+        """后台循环：在Token过期前提前刷新，避免登录请求落在订单轮询的关键路径上"""
+        while True:
+            delay = self.token_expiry_time - MAHUA_TOKEN_REFRESH_MARGIN - self._clock()
+            if delay > 0:
+                await self._sleep(delay)
+                continue
+
+            # 平台熔断期间不在后台反复登录，恢复后由探测轮询按需获取Token
+            if not self.circuit_breaker.is_closed():
+                await self._sleep(MAHUA_TOKEN_RETRY_INTERVAL)
+                continue
+
+            logging.info(f"{self.name}平台Token即将过期，后台提前刷新...")
+            token = await self._refresh_token()
+            if not token:
+                logging.warning(f"{self.name}平台后台刷新Token失败，{MAHUA_TOKEN_RETRY_INTERVAL}秒后重试")
+                await self._sleep(MAHUA_TOKEN_RETRY_INTERVAL)
+                continue
+
+            # 刷新成功后至少间隔 MAHUA_TOKEN_RETRY_INTERVAL 秒，
+            # 有效期不长于提前量（配置不当）时也不会不停地登录
+            delay = self.token_expiry_time - MAHUA_TOKEN_REFRESH_MARGIN - self._clock()
+            await self._sleep(max(delay, MAHUA_TOKEN_RETRY_INTERVAL))
+
+    def _is_token_rejected(self, response_data: dict) -> bool:
+        """
+        判断平台响应是否表示Token已失效
+
+        Args:
+            response_data (dict): 平台返回的响应数据
+
+        Returns:
+            bool: Token被拒绝时返回True
+        """
+        rtn_code = response_data.get("rtnCode")
+        if rtn_code == "000000":
+            return False
+        if rtn_code in MAHUA_TOKEN_INVALID_CODES:
+            return True
+
+        rtn_msg = str(response_data.get('rtnMsg') or '').lower()
+        return any(keyword in rtn_msg for keyword in MAHUA_TOKEN_INVALID_KEYWORDS)
+
+    async def _request_order_list(self, token: str) -> str:
+        """
+        使用指定Token请求订单列表接口
+
+        Args:
+            token (str): 访问Token
+
+        Returns:
+            str: 原始响应内容
+        """
+        logging.info(f"正在请求{self.name}平台API...")
+
+        # 构建请求体
+        body_data = {"pageNum": 1, "pageLimit": 200}  # 获取更多订单
+        body_json_str = jsoncodec.dumps(body_data)
+        headers = self._build_headers(body_json_str, token)
+        started = time.perf_counter()
+
+        async with self._get_session().post(
+            MAHUA_ORDER_LIST_URL,
+            data=body_json_str.encode('utf-8'),
+            headers=headers,
+            timeout=self._request_timeout(MAHUA_REQUEST_TIMEOUT),
+            trace_request_ctx={'platform': self.name}
+        ) as response:
+            response_text = await response.text()
+            logging.info(f"{self.name}平台API响应状态码: {response.status}")
+            self._capture_response(response.status, response_text, time.perf_counter() - started)
+            return response_text
     
-    def _standardize_orders(self, raw_orders):
+    async def _stream_order_list(self, token: str, timer: PollTimer):
+        """
+        流式请求订单列表：边下载边解析rtnData数组，每批完整到达的订单立即标准化、去重并交给 order_sink
+
+        Args:
+            token (str): 访问Token
+            timer (PollTimer): 本次轮询的计时器
+
+        Returns:
+            tuple: (不含订单的响应外层数据, 标准化后的全部订单, 新订单)
+        """
+        logging.info(f"正在流式请求{self.name}平台API...")
+
+        body_json_str = jsoncodec.dumps({"pageNum": 1, "pageLimit": 200})
+        headers = self._build_headers(body_json_str, token)
+        decoder = jsoncodec.ArrayStreamDecoder('rtnData')
+        convert = get_converter(self.PLATFORM_KEY)
+        standardized_orders = []
+        new_orders = []
+        # 启用抓取时保留原始分块，下载完成后拼接为完整响应
+        chunks = [] if self.capture is not None else None
+        started = time.perf_counter()
+
+        async with self._get_session().post(
+            MAHUA_ORDER_LIST_URL,
+            data=body_json_str.encode('utf-8'),
+            headers=headers,
+            timeout=self._request_timeout(MAHUA_REQUEST_TIMEOUT),
+            trace_request_ctx={'platform': self.name}
+        ) as response:
+            logging.info(f"{self.name}平台API响应状态码: {response.status}")
+            async for chunk in response.content.iter_any():
+                if chunks is not None:
+                    chunks.append(chunk)
+                raw_orders = decoder.feed(chunk)
+                if not raw_orders:
+                    continue
+                self.deadline.check('standardize')
+
+                with timer.stage('standardize'):
+                    orders = convert(raw_orders, self.name)
+                with timer.stage('dedup'):
+                    fresh_orders = self._deduplicate_orders(orders)
+                standardized_orders.extend(orders)
+
+                if fresh_orders:
+                    if not new_orders:
+                        # 从发出请求到第一批新订单可以匹配的耗时
+                        timer.add('first_order', time.perf_counter() - started)
+                    new_orders.extend(fresh_orders)
+                    self._emit_orders(fresh_orders)
+
+            if chunks is not None:
+                self._capture_response(response.status, b''.join(chunks), time.perf_counter() - started)
+
+        with timer.stage('parse'):
+            response_data = decoder.envelope()
+        return response_data, standardized_orders, new_orders
+
+    async def _fetch_streaming(self, token: str, timer: PollTimer):
         """
-        标准化麻花平台的订单数据
+        流式模式下的订单获取与处理
 
-        字段映射关系：
-        - order_id: id 或 orderId
-        - bidding_price: discountPriceUp (主要) 或 salePrice (备选)
-        - seat_count: buyNum 或 seatCount
-        - city: movieCityName
-        - cinema_name: movieCinemaName
-        - hall_type: movieHallName
-        - movie_name: movieName
+        订单在整个响应到达之前就已处理，因此不做响应指纹比较，也不使用对冲请求。
 
         Args:
-            raw_orders (list): 原始订单数据列表
+            token (str): 访问Token
+            timer (PollTimer): 本次轮询的计时器
 
         Returns:
-            list: 标准化后的订单列表
+            dict: 包含平台名称、成功状态和订单列表的字典；
+                  订单已交给 order_sink 匹配时带 streamed 标记
         """
-        standardized = []
-        
-        for order in raw_orders:
+        with timer.stage('fetch'):
+            response_data, standardized_orders, new_orders = await self._stream_order_list(token, timer)
+
+        # Token被平台拒绝时立即刷新一次并重试
+        if self._is_token_rejected(response_data):
+            logging.warning(f"{self.name}平台Token被拒绝: {response_data.get('rtnMsg')}，立即刷新后重试")
+            with timer.stage('token'):
+                token = await self._refresh_token(stale_token=token)
+            if not token:
+                return self._failure_result()
+            with timer.stage('fetch'):
+                response_data, standardized_orders, new_orders = await self._stream_order_list(token, timer)
+
+        if response_data.get("rtnCode") != "000000":
+            logging.error(f"❌ {self.name}平台API返回错误: {response_data.get('rtnMsg')}")
+            return self._failure_result()
+
+        logging.info(f"{self.name}平台流式解析完成，{len(standardized_orders)} 条订单中有 {len(new_orders)} 条新订单")
+
+        with timer.stage('book'):
+            self.order_book.apply_snapshot(standardized_orders)
+
+        result = self._success_result(new_orders)
+        result['streamed'] = self.order_sink is not None
+        return result
+
+    def export_state(self) -> dict:
+        """导出去重状态以及Token缓存"""
+        state = super().export_state()
+        state['token'] = self.token
+        state['token_expiry_time'] = self.token_expiry_time
+        return state
+
+    def restore_state(self, state: dict, restore_dedup: bool = True):
+        """恢复去重状态，Token仍在有效期内时一并恢复，避免重启后重新登录"""
+        super().restore_state(state, restore_dedup)
+
+        token = state.get('token')
+        token_expiry_time = state.get('token_expiry_time', 0)
+        if token and token_expiry_time > self._clock():
+            self.token = token
+            self.token_expiry_time = token_expiry_time
+            logging.info(f"{self.name}平台已从快照恢复Token")
+
+    async def close(self):
+        """停止后台Token刷新任务并关闭会话"""
+        if self._token_refresher_task and not self._token_refresher_task.done():
+            self._token_refresher_task.cancel()
             try:
-                # 提取订单ID
-                order_id = order.get('id', order.get('orderId', ''))
-                
-                # 验证必要字段
-                if not order_id:
-                    logging.warning(f"麻花平台订单缺少ID字段，跳过此订单: {order}")
-                    continue
-                
-                # 安全地转换bidding_price字段（使用discountPriceUp作为麻花平台的正确竞标价格字段）
-                bidding_price = 0.0
-                try:
-                    # 优先使用discountPriceUp字段，如果不存在则回退到salePrice
-                    price_value = order.get('discountPriceUp')
-                    if price_value is None:
-                        price_value = order.get('salePrice', 0.0)
-                        logging.debug(f"麻花平台订单 {order_id} 未找到discountPriceUp字段，使用salePrice: {price_value}")
-
-                    bidding_price = float(price_value) if price_value else 0.0
-                except (ValueError, TypeError):
-                    logging.warning(f"麻花平台订单 {order_id} 的价格字段转换失败，使用默认值0.0")
-                    bidding_price = 0.0
-                
-                # 安全地转换seat_count字段
-                seat_count = 1
-                try:
-                    seat_value = order.get('buyNum', order.get('seatCount', 1))
-                    seat_count = int(seat_value) if seat_value else 1
-                except (ValueError, TypeError):
-                    logging.warning(f"麻花平台订单 {order_id} 的座位数字段转换失败，使用默认值1")
-                    seat_count = 1
-                
-                # 提取字符串字段（根据麻花平台官方文档字段映射）
-                city = order.get('movieCityName', '')
-                cinema_name = order.get('movieCinemaName', '')
-                hall_type = order.get('movieHallName', '')
-                movie_name = order.get('movieName', '')
-
-                # 数据验证：确保关键字段存在且有效
-                if not cinema_name and not movie_name:
-                    logging.warning(f"麻花平台订单 {order_id} 缺少关键信息（影院名和电影名），但仍保留此订单")
-
-                # 验证价格字段的有效性
-                if bidding_price <= 0:
-                    logging.debug(f"麻花平台订单 {order_id} 的竞标价格为0或负数: {bidding_price}")
-                
-                # 构建标准化订单对象
-                standardized_order = {
-                    'order_id': order_id,
-                    'bidding_price': bidding_price,
-                    'seat_count': seat_count,
-                    'city': city,
-                    'cinema_name': cinema_name,
-                    'hall_type': hall_type,
-                    'movie_name': movie_name,
-                    # 保留原始数据以备后用
-                    'raw_data': order
-                }
-                
-                standardized.append(standardized_order)
-                
-            except Exception as e:
-                logging.warning(f"标准化麻花平台订单数据失败，跳过此订单: {e}")
-                logging.warning(f"有问题的原始订单数据: {order}")
-                continue
-        
-        logging.info(f"麻花平台数据标准化完成，成功处理 {len(standardized)} 条订单")
-        return standardized
-    
+                await self._token_refresher_task
+            except asyncio.CancelledError:
+                pass
+        await super().close()
+
     async def fetch_and_process(self):
         """
         获取并处理麻花平台的订单数据
+
+        每个阶段的耗时都会记录到性能指标中。
         
         Returns:
             dict: 包含平台名称、成功状态和订单列表的字典
         """
+        timer = PollTimer(self.name)
         try:
-            # 1. 检查Token是否有效或过期
-            current_time = time.time()
-            if not self.token or current_time >= self.token_expiry_time:
-                logging.info(f"{self.name}平台Token无效或已过期，正在重新获取...")
-                token = await self._get_token()
-                if not token:
-                    return {'name': self.name, 'success': False, 'orders': []}
-            
-            # 2. 使用有效的Token调用订单列表接口
-            logging.info(f"正在请求{self.name}平台API...")
-            
-            # 构建请求体
-            body_data = {"pageNum": 1, "pageLimit": 200}  # 获取更多订单
-            body_json_str = json.dumps(body_data, separators=(',', ':'))
-            txntime_ms = str(int(time.time() * 1000))
-            
-            # 生成签名
-            string_to_sign = body_json_str + MAHUA_SECRET_KEY + txntime_ms
-            md5 = hashlib.md5()
-            md5.update(string_to_sign.encode('utf-8'))
-            sign = md5.hexdigest()
+            # 1. 获取有效Token（后台任务会提前续期，这里通常直接命中缓存）
+            with timer.stage('token'):
+                token = await self._ensure_token()
+            if not token:
+                return self._failure_result()
+            self._start_token_refresher()
+
+            # 流式模式：边下载边处理
+            if MAHUA_STREAMING_PARSE:
+                return await self._fetch_streaming(token, timer)
             
-            # 构建请求头
-            headers = {
-                'channelid': MAHUA_CHANNEL_ID,
-                'txntime': txntime_ms,
-                'devCode': MAHUA_DEV_CODE,
-                'token': self.token,
-                'sign': sign,
-                'Content-Type': 'application/json; charset=utf-8'
-            }
+            # 2. 使用有效的Token调用订单列表接口（启用时对慢请求发出对冲请求）
+            with timer.stage('fetch'):
+                response_text = await self.hedger.run(lambda: self._request_order_list(token))
+
+            self.deadline.check('parse')
+            with timer.stage('parse'):
+                response_data = jsoncodec.loads(response_text)
+
+            # Token被平台拒绝时立即刷新一次并重试，而不是等待下一个轮询周期
+            if self._is_token_rejected(response_data):
+                logging.warning(f"{self.name}平台Token被拒绝: {response_data.get('rtnMsg')}，立即刷新后重试")
+                with timer.stage('token'):
+                    token = await self._refresh_token(stale_token=token)
+                if not token:
+                    return self._failure_result()
+                with timer.stage('fetch'):
+                    response_text = await self.hedger.run(lambda: self._request_order_list(token))
+                with timer.stage('parse'):
+                    response_data = jsoncodec.loads(response_text)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    MAHUA_ORDER_LIST_URL,
-                    data=body_json_str.encode('utf-8'),
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=15)
-                ) as response:
-                    response_text = await response.text()
-                    response_data = json.loads(response_text)
-                    
-                    logging.info(f"{self.name}平台API响应状态码: {response.status}")
-                    
-                    if response_data.get("rtnCode") == "000000":
-                        raw_orders = response_data.get('rtnData', [])
-                        logging.info(f"✅ {self.name}平台解析成功，获得 {len(raw_orders)} 条订单数据")
-                        
-                        # 3. 标准化订单数据
-                        standardized_orders = self._standardize_orders(raw_orders)
-
-                        # 4. 去重处理 - 只返回新订单
-                        new_orders = []
-                        for order in standardized_orders:
-                            order_id = order.get('order_id')
-                            if order_id and order_id not in self.seen_order_ids:
-                                # 添加到已见过的订单ID缓存
-                                self.seen_order_ids.append(order_id)
-                                new_orders.append(order)
-
-                        logging.info(f"{self.name}平台去重完成，从 {len(standardized_orders)} 条订单中筛选出 {len(new_orders)} 条新订单")
-
-
-
-                        # 6. 保存新订单到数据库
-                        self.db_manager.save_orders(new_orders, self.name)
-
-                        # 7. 返回成功结果
-                        return {
-                            'name': self.name,
-                            'success': True,
-                            'orders': new_orders
-                        }
-                    else:
-                        logging.error(f"❌ {self.name}平台API返回错误: {response_data.get('rtnMsg')}")
-                        return {'name': self.name, 'success': False, 'orders': []}
+            if response_data.get("rtnCode") == "000000":
+                # 响应指纹：确认是有效的订单列表后，与上一次成功处理的响应完全相同时跳过后续全部处理
+                if self._is_unchanged_payload(response_text):
+                    return self._success_result([])
+                raw_orders = response_data.get('rtnData') or []
+                logging.info(f"✅ {self.name}平台解析成功，获得 {len(raw_orders)} 条订单数据")
+                
+                # 3. 标准化订单数据（去重之前最后一次检查截止时间）
+                self.deadline.check('standardize')
+                with timer.stage('standardize'):
+                    standardized_orders = self._standardize_orders(raw_orders)
+
+                # 4. 去重处理 - 只返回新订单
+                with timer.stage('dedup'):
+                    new_orders = self._deduplicate_orders(standardized_orders)
+
+                logging.info(f"{self.name}平台去重完成，从 {len(standardized_orders)} 条订单中筛选出 {len(new_orders)} 条新订单")
+
+                # 更新挂单簿（新增/变化/移除事件）
+                with timer.stage('book'):
+                    self.order_book.apply_snapshot(standardized_orders)
+
+                # 新订单由后台线程在匹配规则之后交给持久化线程保存，不占用提醒的关键路径
+                self._remember_payload(standardized_orders)
+
+                # 5. 返回成功结果
+                return self._success_result(new_orders)
+            else:
+                logging.error(f"❌ {self.name}平台API返回错误: {response_data.get('rtnMsg')}")
+                return self._failure_result()
                         
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logging.error(f"❌ {self.name}平台处理过程中发生错误: {e}")
-            return {'name': self.name, 'success': False, 'orders': []}
+            return self._failure_result()
+        finally:
+            timer.finish()
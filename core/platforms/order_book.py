@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时挂单簿模块 - 保存每个平台当前挂出的全部订单，逐次对比轮询快照生成增量事件
+"""
+
+import time
+import logging
+from .dedup import order_fingerprint
+from config import ORDER_FINGERPRINT_FIELDS
+
+
+class BookEntry:
+    """挂单簿中的一条订单记录"""
+
+    __slots__ = ('order', 'fingerprint', 'first_seen', 'last_seen')
+
+    def __init__(self, order, fingerprint: int, first_seen: float):
+        self.order = order
+        self.fingerprint = fingerprint
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+
+    @property
+    def order_id(self):
+        return self.order.get('order_id')
+
+    def __repr__(self):
+        return f"BookEntry({self.order!r}, first_seen={self.first_seen:.0f}, last_seen={self.last_seen:.0f})"
+
+
+class BookDiff:
+    """
+    一次快照相对上一次快照的变化
+
+    Attributes:
+        platform (str): 平台名称
+        added (list): 新挂出的订单记录
+        changed (list): 价格相关字段发生变化的订单记录
+        removed (list): 从列表中消失的订单记录（被抢走或被撤回），last_seen 为最后一次出现的时间
+        initial (bool): 是否为挂单簿的第一次快照（此时全部订单都在 added 中）
+        timestamp (float): 快照时间
+    """
+
+    __slots__ = ('platform', 'added', 'changed', 'removed', 'initial', 'timestamp')
+
+    def __init__(self, platform: str, added: list, changed: list, removed: list, initial: bool, timestamp: float):
+        self.platform = platform
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.initial = initial
+        self.timestamp = timestamp
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return (f"BookDiff({self.platform}: +{len(self.added)} ~{len(self.changed)} "
+                f"-{len(self.removed)}{' initial' if self.initial else ''})")
+
+
+class OrderBook:
+    """
+    单个平台的实时挂单簿
+
+    以 order_id -> BookEntry 的字典保存当前快照，每次轮询用完整列表替换并与上一次比较，
+    查找和比较都基于哈希表，耗时与快照大小成线性关系。
+    有变化时依次通知订阅者，订阅者收到的是增量事件而不是整个列表。
+    """
+
+    def __init__(self, platform: str, fingerprint_fields: tuple = ORDER_FINGERPRINT_FIELDS):
+        """
+        初始化挂单簿
+
+        Args:
+            platform (str): 平台名称
+            fingerprint_fields (tuple): 判断订单是否变化的字段
+        """
+        self.platform = platform
+        self.fingerprint_fields = tuple(fingerprint_fields)
+        self._entries = {}
+        self._listeners = []
+        self.snapshot_count = 0
+
+        # 统计计数
+        self.added = 0
+        self.changed = 0
+        self.removed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, order_id):
+        return order_id in self._entries
+
+    def get(self, order_id):
+        """
+        查找挂单
+
+        Args:
+            order_id (str): 订单ID
+
+        Returns:
+            BookEntry: 订单记录，不在挂单簿中时返回None
+        """
+        return self._entries.get(order_id)
+
+    def orders(self) -> list:
+        """返回当前挂出的全部订单"""
+        return [entry.order for entry in self._entries.values()]
+
+    def subscribe(self, listener):
+        """
+        订阅挂单簿变化
+
+        Args:
+            listener: 回调函数 listener(diff)，diff 为 BookDiff
+        """
+        self._listeners.append(listener)
+
+    def apply_snapshot(self, orders: list, now: float = None) -> BookDiff:
+        """
+        用一次轮询得到的完整订单列表更新挂单簿
+
+        Args:
+            orders (list): 标准化后的完整订单列表
+            now (float): 快照时间，默认为当前时间
+
+        Returns:
+            BookDiff: 本次快照的变化
+        """
+        if now is None:
+            now = time.time()
+        previous = self._entries
+        current = {}
+        added = []
+        changed = []
+        fields = self.fingerprint_fields
+
+        for order in orders:
+            order_id = order.get('order_id')
+            if not order_id or order_id in current:
+                continue
+
+            fingerprint = order_fingerprint(order, fields)
+            entry = previous.get(order_id)
+            if entry is None:
+                entry = BookEntry(order, fingerprint, now)
+                added.append(entry)
+            else:
+                if entry.fingerprint != fingerprint:
+                    entry.fingerprint = fingerprint
+                    changed.append(entry)
+                entry.order = order
+                entry.last_seen = now
+            current[order_id] = entry
+
+        removed = [entry for order_id, entry in previous.items() if order_id not in current]
+        self._entries = current
+
+        diff = BookDiff(self.platform, added, changed, removed, self.snapshot_count == 0, now)
+        self.snapshot_count += 1
+        self.added += len(added)
+        self.changed += len(changed)
+        self.removed += len(removed)
+
+        if diff:
+            logging.debug(f"{self.platform}平台挂单簿更新: {diff!r}")
+            self._notify(diff)
+        return diff
+
+    def merge(self, orders: list, now: float = None) -> BookDiff:
+        """
+        把一次未完成的轮询中已经收到的部分订单并入挂单簿（只新增或更新，不移除未出现的订单）
+
+        Args:
+            orders (list): 标准化后的部分订单列表
+            now (float): 快照时间，默认为当前时间
+
+        Returns:
+            BookDiff: 本次合并的变化（removed 始终为空）
+        """
+        if now is None:
+            now = time.time()
+        entries = self._entries
+        added = []
+        changed = []
+
+        for order in orders:
+            order_id = order.get('order_id')
+            if not order_id:
+                continue
+
+            fingerprint = order_fingerprint(order, self.fingerprint_fields)
+            entry = entries.get(order_id)
+            if entry is None:
+                entry = BookEntry(order, fingerprint, now)
+                entries[order_id] = entry
+                added.append(entry)
+            else:
+                if entry.fingerprint != fingerprint:
+                    entry.fingerprint = fingerprint
+                    changed.append(entry)
+                entry.order = order
+                entry.last_seen = now
+
+        diff = BookDiff(self.platform, added, changed, [], False, now)
+        self.added += len(added)
+        self.changed += len(changed)
+
+        if diff:
+            logging.debug(f"{self.platform}平台挂单簿合并部分订单: {diff!r}")
+            self._notify(diff)
+        return diff
+
+    def touch(self, now: float = None):
+        """
+        快照与上一次完全相同时只刷新最后出现时间
+
+        Args:
+            now (float): 快照时间，默认为当前时间
+        """
+        if now is None:
+            now = time.time()
+        for entry in self._entries.values():
+            entry.last_seen = now
+
+    def _notify(self, diff: BookDiff):
+        """通知订阅者，单个订阅者出错不影响其他订阅者"""
+        for listener in self._listeners:
+            try:
+                listener(diff)
+            except Exception as e:
+                logging.error(f"{self.platform}平台挂单簿订阅者处理出错: {e}")
+
+    def get_metrics(self) -> dict:
+        """
+        获取挂单簿统计
+
+        Returns:
+            dict: 当前挂单数，以及累计新增、变化、移除的订单数
+        """
+        return {
+            'size': len(self._entries),
+            'added': self.added,
+            'changed': self.changed,
+            'removed': self.removed
+        }
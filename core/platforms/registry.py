@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+平台注册表模块 - 声明各平台的适配器位置、字段映射和预过滤规则，按配置按需加载适配器
+
+新增平台只需在 PLATFORM_SPECS 中添加一项声明并实现对应的适配器模块，
+后台线程无需任何改动；未启用的平台不会被导入，也不会拖慢启动。
+"""
+
+import logging
+import importlib
+from .field_mapping import Field, compile_converter
+from config import ENABLED_PLATFORMS, HAHA_PLATFORM_NAME, MAHUA_PLATFORM_NAME
+
+PLATFORM_SPECS = {
+    'haha': {
+        'name': HAHA_PLATFORM_NAME,
+        'module': 'core.platforms.haha_adapter',
+        'class_name': 'HahaAdapter',
+        # 精确预过滤：排除 is_from == '5' 的订单
+        'exclude': {'is_from': ('5',)},
+        'fields': {
+            'order_id': Field('order_id', coerce=str, required=True),
+            'bidding_price': Field('maxPrice', coerce=float, default=0.0),
+            'seat_count': Field('seat_num', coerce=int, default=1),
+            'city': Field('cityName'),
+            'cinema_name': Field('cinemaName'),
+            'hall_type': Field('hallName'),
+            'movie_name': Field('movieName'),
+            # 场次时间字段名尚未对照平台实际响应确认，确认之前 config.CROSS_PLATFORM_DEDUP 保持关闭；
+            # 字段名不对时跨平台索引会警告 show_time 始终缺失
+            'show_time': Field('showTime', default=None),
+        }
+    },
+    'mahua': {
+        'name': MAHUA_PLATFORM_NAME,
+        'module': 'core.platforms.mahua_adapter',
+        'class_name': 'MahuaAdapter',
+        'exclude': {},
+        'fields': {
+            'order_id': Field('id', 'orderId', coerce=str, required=True),
+            # discountPriceUp 是麻花平台的竞标价格字段，不存在时回退到 salePrice
+            'bidding_price': Field('discountPriceUp', 'salePrice', coerce=float, default=0.0),
+            'seat_count': Field('buyNum', 'seatCount', coerce=int, default=1),
+            'city': Field('movieCityName'),
+            'cinema_name': Field('movieCinemaName'),
+            'hall_type': Field('movieHallName'),
+            'movie_name': Field('movieName'),
+            # 场次时间字段名尚未对照平台实际响应确认，同上
+            'show_time': Field('movieShowTime', 'showTime', default=None),
+        }
+    },
+}
+
+# 已编译的转换函数缓存，每个平台只编译一次
+_converters = {}
+
+
+def get_platform_spec(platform_key: str) -> dict:
+    """
+    获取平台声明
+
+    Args:
+        platform_key (str): 平台标识，如 'haha'
+
+    Returns:
+        dict: 平台声明
+
+    Raises:
+        KeyError: 平台未注册
+    """
+    return PLATFORM_SPECS[platform_key]
+
+
+def get_converter(platform_key: str):
+    """
+    获取平台的订单转换函数（首次调用时编译）
+
+    Args:
+        platform_key (str): 平台标识
+
+    Returns:
+        function: convert(raw_orders, platform) -> list[Order]
+    """
+    converter = _converters.get(platform_key)
+    if converter is None:
+        spec = get_platform_spec(platform_key)
+        converter = compile_converter(platform_key, spec['fields'], spec.get('exclude'))
+        _converters[platform_key] = converter
+    return converter
+
+
+def load_adapter_class(platform_key: str):
+    """
+    导入并返回平台适配器类
+
+    Args:
+        platform_key (str): 平台标识
+
+    Returns:
+        type: 适配器类
+    """
+    spec = get_platform_spec(platform_key)
+    module = importlib.import_module(spec['module'])
+    return getattr(module, spec['class_name'])
+
+
+def create_enabled_adapters(enabled_platforms=None) -> list:
+    """
+    实例化配置中启用的所有平台适配器
+
+    Args:
+        enabled_platforms (list): 启用的平台标识列表，默认使用 config.ENABLED_PLATFORMS
+
+    Returns:
+        list: 适配器实例列表，加载失败的平台会被跳过
+    """
+    if enabled_platforms is None:
+        enabled_platforms = ENABLED_PLATFORMS
+
+    adapters = []
+    for platform_key in enabled_platforms:
+        try:
+            adapter_class = load_adapter_class(platform_key)
+            adapters.append(adapter_class(get_platform_spec(platform_key)['name']))
+        except KeyError:
+            logging.error(f"未注册的平台: {platform_key}")
+        except Exception as e:
+            logging.error(f"加载平台 {platform_key} 的适配器失败: {e}")
+
+    logging.info(f"已启用 {len(adapters)} 个平台: {', '.join(adapter.name for adapter in adapters)}")
+    return adapters
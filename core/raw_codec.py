@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始订单编解码模块 - 把平台原始订单压缩为数据库中保存的二进制数据
+
+压缩结果的第一个字节是格式版本，之后是zlib数据，以后可以在不改动已有数据的情况下增加新的格式。
+目前只使用不带字典的zlib。zlib预置字典可以进一步压缩单条几百字节的订单，但字典一旦用于写入就
+永远不能修改，必须用抓取的真实平台响应（见 core.capture）训练，并用基准测试证明压缩率确有提升后
+再作为新的格式版本加入 _ZDICTS。
+"""
+
+import zlib
+import logging
+
+from . import jsoncodec
+
+# 格式版本：0 = 不带字典的zlib
+FORMAT_PLAIN = 0
+
+# zlib压缩级别
+COMPRESS_LEVEL = 6
+
+# 格式版本 -> zlib预置字典（目前没有）
+_ZDICTS = {}
+
+# 写入时使用的格式
+CURRENT_FORMAT = FORMAT_PLAIN
+
+
+def compress_json(json_bytes: bytes) -> bytes:
+    """
+    压缩已经序列化的JSON字节串（迁移旧数据时直接压缩原文，不必先解析）
+
+    Args:
+        json_bytes (bytes): UTF-8编码的JSON
+
+    Returns:
+        bytes: 格式版本字节 + zlib数据
+    """
+    zdict = _ZDICTS.get(CURRENT_FORMAT)
+    if zdict is None:
+        compressor = zlib.compressobj(COMPRESS_LEVEL)
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zdict=zdict)
+    return bytes((CURRENT_FORMAT,)) + compressor.compress(json_bytes) + compressor.flush()
+
+
+def encode_raw(raw_data) -> bytes:
+    """
+    序列化并压缩原始订单
+
+    Args:
+        raw_data (dict): 平台原始订单
+
+    Returns:
+        bytes: 压缩后的数据
+    """
+    return compress_json(jsoncodec.dumps_bytes(raw_data if raw_data is not None else {}))
+
+
+def decompress_json(data: bytes) -> bytes:
+    """
+    解压为JSON字节串
+
+    Args:
+        data (bytes): compress_json() 的结果
+
+    Returns:
+        bytes: UTF-8编码的JSON
+
+    Raises:
+        ValueError: 未知的格式版本
+        zlib.error: 数据损坏
+    """
+    data = bytes(data)
+    format_version, payload = data[0], data[1:]
+    if format_version == FORMAT_PLAIN:
+        return zlib.decompress(payload)
+    zdict = _ZDICTS.get(format_version)
+    if zdict is None:
+        raise ValueError(f"未知的原始订单压缩格式: {format_version}")
+    decompressor = zlib.decompressobj(zdict=zdict)
+    return decompressor.decompress(payload) + decompressor.flush()
+
+
+def decode_raw(data):
+    """
+    解压并解析原始订单
+
+    Args:
+        data (bytes): 压缩后的数据，为空时返回空字典
+
+    Returns:
+        dict: 原始订单，数据损坏时返回空字典
+    """
+    if not data:
+        return {}
+    try:
+        return jsoncodec.loads(decompress_json(data))
+    except Exception as e:
+        logging.warning(f"解析原始订单数据失败: {e}")
+        return {}
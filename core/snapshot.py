@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+状态快照模块 - 负责在退出和运行期间保存适配器状态，并在启动时恢复（热启动）
+"""
+
+import os
+import time
+import logging
+from config import STATE_SNAPSHOT_FILE, ORDER_DEDUP_TTL, ORDER_DEDUP_MAX_SIZE
+from .database import DatabaseManager
+from . import jsoncodec
+
+SNAPSHOT_VERSION = 2
+
+
+class StateSnapshot:
+    """
+    状态快照类
+
+    快照内容包括每个平台的去重状态、麻花平台Token及过期时间，以及规则哈希。
+    启动时优先从快照恢复；没有可用快照时，从数据库最近入库的订单预热去重状态，
+    使重启后的第一次轮询与平时一样不会重复提醒。
+    """
+
+    def __init__(self, filepath: str = STATE_SNAPSHOT_FILE):
+        """
+        初始化状态快照
+
+        Args:
+            filepath (str): 快照文件路径
+        """
+        self.filepath = filepath
+
+    def build(self, adapters: list, rules_hash: str) -> dict:
+        """
+        收集当前状态，生成快照数据
+
+        Args:
+            adapters (list): 平台适配器列表
+            rules_hash (str): 当前规则哈希
+
+        Returns:
+            dict: 快照数据
+        """
+        return {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'rules_hash': rules_hash,
+            'adapters': {adapter.name: adapter.export_state() for adapter in adapters}
+        }
+
+    def write(self, snapshot: dict) -> bool:
+        """
+        将快照数据写入文件（先写临时文件再替换，避免写到一半时退出导致快照损坏）
+
+        Args:
+            snapshot (dict): build() 生成的快照数据
+
+        Returns:
+            bool: 写入成功返回True
+        """
+        temp_path = f"{self.filepath}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(jsoncodec.dumps_bytes(snapshot))
+            os.replace(temp_path, self.filepath)
+            logging.debug(f"状态快照已保存: {self.filepath}")
+            return True
+
+        except Exception as e:
+            logging.error(f"保存状态快照失败: {e}")
+            return False
+
+    def save(self, adapters: list, rules_hash: str) -> bool:
+        """
+        收集当前状态并写入快照文件
+
+        Args:
+            adapters (list): 平台适配器列表
+            rules_hash (str): 当前规则哈希
+
+        Returns:
+            bool: 写入成功返回True
+        """
+        try:
+            snapshot = self.build(adapters, rules_hash)
+        except Exception as e:
+            logging.error(f"收集状态快照失败: {e}")
+            return False
+        return self.write(snapshot)
+
+    def load(self):
+        """
+        读取快照文件
+
+        Returns:
+            dict: 快照数据，文件不存在或格式不正确时返回None
+        """
+        if not os.path.exists(self.filepath):
+            return None
+
+        try:
+            with open(self.filepath, 'rb') as file:
+                snapshot = jsoncodec.loads(file.read())
+
+            if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+                logging.warning("状态快照版本不匹配，忽略此快照")
+                return None
+
+            return snapshot
+
+        except Exception as e:
+            logging.error(f"读取状态快照失败: {e}")
+            return None
+
+    def restore(self, adapters: list, rules_hash: str, db_manager: DatabaseManager = None):
+        """
+        恢复适配器状态
+
+        规则哈希与快照一致时恢复完整状态；规则已变化时只恢复Token，
+        让仍在列表中的订单按新规则重新评估一次。
+        没有可用快照的平台从数据库最近入库的订单预热去重状态。
+
+        Args:
+            adapters (list): 平台适配器列表
+            rules_hash (str): 当前规则哈希
+            db_manager (DatabaseManager): 用于预热的数据库管理器，默认临时创建
+        """
+        snapshot = self.load() or {}
+        adapter_states = snapshot.get('adapters', {})
+        rules_changed = bool(snapshot) and snapshot.get('rules_hash') != rules_hash
+        if rules_changed:
+            logging.info("规则自上次快照以来已变化，仅恢复Token，订单将按新规则重新评估")
+
+        pending_seed = []
+        for adapter in adapters:
+            state = adapter_states.get(adapter.name)
+            if state is not None:
+                adapter.restore_state(state, restore_dedup=not rules_changed)
+                logging.info(f"{adapter.name}平台已从快照恢复，去重记录 {len(adapter.deduplicator)} 条")
+            elif not rules_changed:
+                pending_seed.append(adapter)
+
+        if pending_seed:
+            self._seed_from_database(pending_seed, db_manager)
+
+    def _seed_from_database(self, adapters: list, db_manager: DatabaseManager = None):
+        """从数据库最近入库的订单预热去重状态"""
+        owns_db = db_manager is None
+        try:
+            if owns_db:
+                db_manager = DatabaseManager()
+
+            since_timestamp = time.time() - ORDER_DEDUP_TTL
+            for adapter in adapters:
+                order_ids = db_manager.get_recent_order_ids(adapter.name, since_timestamp, ORDER_DEDUP_MAX_SIZE)
+                adapter.deduplicator.seed(order_ids)
+                logging.info(f"{adapter.name}平台从数据库预热去重记录 {len(order_ids)} 条")
+
+        except Exception as e:
+            logging.error(f"从数据库预热去重状态失败: {e}")
+        finally:
+            if owns_db and db_manager is not None:
+                db_manager.close()
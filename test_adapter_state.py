@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+适配器响应指纹与状态快照验证脚本
+"""
+
+import time
+import json
+import asyncio
+
+import pytest
+
+from core.deadline import Deadline, DeadlineExceeded
+from core.snapshot import StateSnapshot
+from core.platforms import mahua_adapter
+from core.platforms.mahua_adapter import MahuaAdapter
+from tools.replay import ReplaySession
+
+
+def _payload(*order_ids, price=40.0):
+    return json.dumps({'rtnCode': '000000', 'rtnMsg': '成功', 'rtnData': [
+        {'id': order_id, 'discountPriceUp': price, 'buyNum': 2, 'movieCityName': '成都',
+         'movieCinemaName': '万达影城', 'movieHallName': 'IMAX厅', 'movieName': '流浪地球3'}
+        for order_id in order_ids
+    ]}, ensure_ascii=False)
+
+
+def _adapter(responses):
+    """创建麻花平台适配器，Token和订单列表请求替换为按顺序返回给定响应的假请求"""
+    adapter = MahuaAdapter('麻花')
+    adapter.token = 'token'
+    adapter.token_expiry_time = time.time() + 600
+    adapter._start_token_refresher = lambda: None
+    responses = list(responses)
+
+    async def fake_request(token):
+        return responses.pop(0)
+
+    adapter._request_order_list = fake_request
+    return adapter
+
+
+def test_unchanged_payload_skips_processing_and_touches_seen_orders():
+    """响应与上次完全相同时跳过处理，但刷新去重记录和挂单簿的出现时间，订单不会过期后被重复提醒"""
+    adapter = _adapter([_payload('a', 'b'), _payload('a', 'b'), _payload('a', 'b', price=45.0)])
+
+    result = asyncio.run(adapter.poll())
+    assert result['success'] and [order['order_id'] for order in result['orders']] == ['a', 'b']
+
+    # 模拟距上次处理已经过了很久
+    stale = time.time() - 1000
+    for order_id in ('a', 'b'):
+        adapter.deduplicator._last_seen[order_id] = stale
+    for entry in adapter.order_book._entries.values():
+        entry.last_seen = stale
+
+    result = asyncio.run(adapter.poll())
+    assert result['success'] and result['orders'] == []
+    assert adapter.metrics['fingerprint_skips'] == 1
+    assert all(adapter.deduplicator._last_seen[order_id] > stale for order_id in ('a', 'b'))
+    assert all(entry.last_seen > stale for entry in adapter.order_book._entries.values())
+
+    # 响应变化时照常处理，调价订单作为已更新订单返回
+    result = asyncio.run(adapter.poll())
+    assert [(order['order_id'], order.get('updated')) for order in result['orders']] == [('a', True), ('b', True)]
+    assert adapter.metrics['fingerprint_skips'] == 1
+
+
+def test_snapshot_round_trip_restores_dedup_and_token(tmp_path):
+    """快照保存后恢复：规则未变时恢复去重记录和Token，规则变化时只恢复Token"""
+    adapter = _adapter([_payload('a', 'b')])
+    seen_orders = asyncio.run(adapter.poll())['orders']
+    snapshot = StateSnapshot(str(tmp_path / 'state_snapshot.json'))
+    assert snapshot.save([adapter], 'rules-1')
+
+    restored = MahuaAdapter('麻花')
+    snapshot.restore([restored], 'rules-1')
+    assert restored.token == 'token' and restored.token_expiry_time == adapter.token_expiry_time
+    assert restored.deduplicator.filter_new(seen_orders + [{'order_id': 'c'}]) == [{'order_id': 'c'}]
+
+    rules_changed = MahuaAdapter('麻花')
+    snapshot.restore([rules_changed], 'rules-2')
+    assert rules_changed.token == 'token'
+    assert len(rules_changed.deduplicator) == 0
+
+
+def test_streamed_orders_survive_failed_poll(monkeypatch):
+    """流式解析时订单已提醒，之后响应返回错误码：失败结果仍带回这些订单，并并入挂单簿"""
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_STREAMING_PARSE', True)
+    # 订单数组在前，错误码在数组之后才到达
+    rtn_data = json.loads(_payload('a', 'b'))['rtnData']
+    body = json.dumps({'rtnData': rtn_data, 'rtnCode': '999999', 'rtnMsg': '系统繁忙'}, ensure_ascii=False)
+    adapter = _adapter([])
+    adapter._session = ReplaySession([{'ts': 0, 'status': 200, 'body': body}], chunk_size=64)
+    emitted = []
+    adapter.order_sink = lambda platform_name, orders: emitted.extend(orders)
+
+    result = asyncio.run(adapter.poll())
+    assert not result['success'] and result['streamed']
+    assert [order['order_id'] for order in result['orders']] == ['a', 'b'] == [order['order_id'] for order in emitted]
+    assert 'a' in adapter.order_book and 'b' in adapter.order_book
+
+
+def test_request_timeout_never_outlives_poll_deadline():
+    """请求超时取配置值与本次轮询剩余时间中较小的一个，轮询之外使用配置值，截止时间已过时不再发出请求"""
+    adapter = MahuaAdapter('麻花')
+    assert adapter._request_timeout(15).total == 15
+
+    adapter.deadline = Deadline(2)
+    assert 1.9 < adapter._request_timeout(15).total <= 2
+    assert adapter._request_timeout(1).total == 1
+
+    adapter.deadline = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        adapter._request_timeout(15)
+
+
+def test_fingerprint_checked_once_per_poll_on_valid_order_lists_only(monkeypatch):
+    """Token被拒绝后重试的轮询只比较一次指纹；被拒绝的响应和错误响应不参与指纹比较"""
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_INVALID_CODES', ('401',))
+    rejected = json.dumps({'rtnCode': '401', 'rtnMsg': 'token expired'})
+    adapter = _adapter([rejected, _payload('a'), json.dumps({'rtnCode': '500', 'rtnMsg': '系统繁忙'}), _payload('a')])
+
+    async def fake_refresh(stale_token=None):
+        return 'token-2'
+
+    adapter._refresh_token = fake_refresh
+
+    result = asyncio.run(adapter.poll())
+    assert result['success'] and [order['order_id'] for order in result['orders']] == ['a']
+    assert adapter.metrics['payloads'] == 1
+
+    assert not asyncio.run(adapter.poll())['success']
+    assert adapter.metrics['payloads'] == 1
+
+    assert asyncio.run(adapter.poll())['success']
+    assert adapter.metrics['payloads'] == 2 and adapter.metrics['fingerprint_skips'] == 1
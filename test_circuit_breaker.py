@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+熔断器验证脚本
+"""
+
+import time
+import asyncio
+
+from core import jsoncodec
+from core.platforms.base_adapter import BaseAdapter
+from core.platforms.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from core.platforms.haha_adapter import HahaAdapter
+from core.platforms.mahua_adapter import MahuaAdapter
+
+
+class SlowAdapter(BaseAdapter):
+    """轮询一直等待的适配器，用于模拟轮询进行中被取消"""
+
+    async def fetch_and_process(self):
+        await asyncio.sleep(10)
+        return self._success_result([])
+
+
+def test_breaker_opens_probes_and_closes():
+    """连续失败达到阈值后打开，冷却结束后只放行一个探测请求，探测成功后关闭"""
+    breaker = CircuitBreaker('测试', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request() and breaker.state == HALF_OPEN
+    # 探测进行中，其他轮询继续短路
+    assert not breaker.allow_request()
+
+    # 探测失败重新打开，再次冷却后探测成功则关闭
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+    assert breaker.get_state()['open_count'] == 2 and breaker.get_state()['short_circuited'] == 2
+
+
+def test_cancelled_probe_is_released():
+    """半开状态下探测轮询被取消时释放探测名额，下一次轮询仍可以探测"""
+    adapter = SlowAdapter('测试')
+    adapter.circuit_breaker = CircuitBreaker('测试', failure_threshold=1, reset_timeout=0.0)
+    adapter.circuit_breaker.record_failure()
+
+    async def scenario():
+        poll = asyncio.ensure_future(adapter.poll())
+        await asyncio.sleep(0.01)
+        assert adapter.circuit_breaker.state == HALF_OPEN and adapter.circuit_breaker._probe_in_flight
+        poll.cancel()
+        try:
+            await poll
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    assert adapter.circuit_breaker.state == HALF_OPEN
+    assert adapter.circuit_breaker.allow_request()
+
+
+def test_idle_platforms_keep_breaker_closed():
+    """平台正常但没有订单时，连续超过阈值次的空响应不会打开熔断器"""
+    haha = HahaAdapter('哈哈')
+    mahua = MahuaAdapter('麻花')
+    mahua.token = 'token'
+    mahua.token_expiry_time = time.time() + 600
+    mahua._start_token_refresher = lambda: None
+    polls = haha.circuit_breaker.failure_threshold + 1
+    haha_responses = [jsoncodec.dumps({'code': 200, 'data': [] if i % 2 else None}) for i in range(polls)]
+    mahua_responses = [jsoncodec.dumps({'rtnCode': '000000', 'rtnData': [] if i % 2 else None}) for i in range(polls)]
+
+    async def haha_request():
+        return 200, haha_responses.pop(0)
+
+    async def mahua_request(token):
+        return mahua_responses.pop(0)
+
+    haha._request_order_list = haha_request
+    mahua._request_order_list = mahua_request
+
+    for _ in range(polls):
+        for adapter in (haha, mahua):
+            result = asyncio.run(adapter.poll())
+            assert result['success'] and result['orders'] == []
+    for adapter in (haha, mahua):
+        assert adapter.circuit_breaker.state == CLOSED and adapter.circuit_breaker.consecutive_failures == 0
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨平台场次索引验证脚本
+"""
+
+import logging
+
+from core.cross_platform import CrossPlatformIndex, show_signature
+from core.platforms.order_book import OrderBook
+from core.platforms.registry import get_converter
+
+
+def _order(order_id, cinema='万达影城（万象城店）', show_time='2025-07-05 19:30', seats=2):
+    return {
+        'order_id': order_id, 'city': '成都', 'cinema_name': cinema, 'hall_type': 'IMAX厅',
+        'movie_name': '流浪地球3', 'show_time': show_time, 'seat_count': seats, 'bidding_price': 40.0
+    }
+
+
+def test_signature_normalizes_names_and_show_time():
+    """全角括号、空格和场次时间格式不同的同一场次得到相同签名，票数不同则不同"""
+    assert show_signature(_order('a')) == show_signature(
+        _order('b', cinema='万达影城 (万象城店)', show_time='2025/07/05 19:30:00'))
+    assert show_signature(_order('a')) != show_signature(_order('c', seats=3))
+    assert show_signature(_order('d', show_time=None)) is None
+
+
+def test_duplicate_routes_to_higher_profit_and_expires_with_order_book():
+    """同一场次只提醒利润更高的平台，订单从挂单簿移除后同步移出索引"""
+    index = CrossPlatformIndex()
+    book = OrderBook('麻花')
+    index.attach(book)
+
+    assert index.route('哈哈', _order('h1'), 20.0) == (True, [])
+
+    # 利润更低的重复订单不提醒，指向利润更高的平台
+    book.apply_snapshot([_order('m1')], now=100)
+    notify, alternatives = index.route('麻花', _order('m1', cinema='万达影城(万象城店)'), 15.0)
+    assert not notify and alternatives[0]['platform'] == '哈哈' and alternatives[0]['total_profit'] == 20.0
+
+    # 利润更高的重复订单照常提醒，并注明另一个平台
+    notify, alternatives = index.route('麻花', _order('m2'), 25.0)
+    assert notify and [item['order_id'] for item in alternatives] == ['h1']
+
+    book.apply_snapshot([], now=105)
+    assert index.get_metrics() == {'size': 2, 'shows': 1, 'duplicates': 2, 'suppressed': 1, 'expired': 1}
+
+
+def test_signature_requires_full_show_date():
+    """只有时分的场次时间无法区分不同日期的场次，不生成签名；不同日期同一时刻的场次签名不同"""
+    assert show_signature(_order('a', show_time='19:30')) is None
+    assert show_signature(_order('b', show_time='07-05 19:30')) is None
+    assert show_signature(_order('c', show_time='2025-07-05 19:30')) != show_signature(
+        _order('d', show_time='2025-07-06 19:30'))
+
+    index = CrossPlatformIndex()
+    assert index.route('哈哈', _order('h1', show_time='19:30'), 20.0) == (True, [])
+    assert index.route('麻花', _order('m1', show_time='19:30'), 15.0) == (True, [])
+    assert len(index) == 0
+
+
+def test_converters_map_show_time_and_warn_when_always_missing(caplog):
+    """两个平台的场次时间字段转换到 show_time；某个平台始终没有完整场次时间时警告一次"""
+    haha = get_converter('haha')([{'order_id': 'h1', 'cinemaName': '万达影城', 'showTime': '2025-07-05 19:30'}], '哈哈')
+    mahua = get_converter('mahua')([{'id': 'm1', 'movieCinemaName': '万达影城', 'movieShowTime': '2025-07-05 19:30:00'}], '麻花')
+    assert haha[0]['show_time'] == '2025-07-05 19:30' and mahua[0]['show_time'] == '2025-07-05 19:30:00'
+    assert get_converter('mahua')([{'id': 'm2'}], '麻花')[0]['show_time'] is None
+
+    index = CrossPlatformIndex()
+    with caplog.at_level(logging.WARNING):
+        for i in range(50):
+            index.route('麻花', _order(f'm{i}', show_time=None), 15.0)
+            index.route('哈哈', _order(f'h{i}', show_time='19:30' if i % 2 else '2025-07-05 19:30'), 20.0)
+    warnings = [record.getMessage() for record in caplog.records if 'show_time' in record.getMessage()]
+    assert len(warnings) == 1 and warnings[0].startswith('麻花')
+
+
+def test_batch_routes_each_show_to_the_best_platform_regardless_of_order():
+    """同一周期内低利润平台先处理也只提醒利润最高的平台；同一平台同一场次的不同订单各自提醒"""
+    index = CrossPlatformIndex()
+    decisions = index.route_batch([
+        ('哈哈', _order('h1'), 15.0),
+        ('麻花', _order('m1'), 25.0),
+        ('哈哈', _order('h2', show_time='2025-07-05 21:00'), 18.0),
+        ('哈哈', _order('h3', show_time='2025-07-05 21:00'), 12.0),
+    ])
+    assert [decision['notify'] for decision in decisions] == [False, True, True, True]
+    assert decisions[0]['alternatives'][0]['order_id'] == 'm1'
+    assert [item['order_id'] for item in decisions[1]['alternatives']] == ['h1']
+    assert all(decision['replaces'] == [] for decision in decisions)
+
+    # 利润相同时本批中先出现的订单提醒
+    decisions = CrossPlatformIndex().route_batch([('麻花', _order('m1'), 20.0), ('哈哈', _order('h1'), 20.0)])
+    assert [decision['notify'] for decision in decisions] == [True, False]
+
+
+def test_later_higher_profit_alert_replaces_earlier_one():
+    """之前已提醒的低利润订单被之后周期中利润更高的其他平台订单取代，只取代一次"""
+    index = CrossPlatformIndex()
+    assert index.route_batch([('哈哈', _order('h1'), 15.0)])[0] == {'notify': True, 'alternatives': [], 'replaces': []}
+
+    decision = index.route_batch([('麻花', _order('m1'), 25.0)])[0]
+    assert decision['notify'] and decision['replaces'] == [{'platform': '哈哈', 'order_id': 'h1', 'total_profit': 15.0}]
+
+    # 利润更低的第三个订单不提醒；利润更高的订单取代当前显示的 m1，不再取代 h1
+    assert not index.route_batch([('哈哈', _order('h2'), 20.0)])[0]['notify']
+    decision = index.route_batch([('哈哈', _order('h3'), 30.0)])[0]
+    assert decision['notify'] and [item['order_id'] for item in decision['replaces']] == ['m1']
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单数据库与后台持久化验证脚本
+"""
+
+import time
+import sqlite3
+import threading
+
+import pytest
+
+from core import raw_codec
+from core.database import DatabaseManager, ReadConnectionPool
+from core.persistence import OrderPersister
+
+
+def _order(order_id, price=30.0, updated=False):
+    return {
+        'order_id': order_id, 'bidding_price': price, 'seat_count': 2, 'city': '成都',
+        'cinema_name': '万达影城', 'hall_type': 'IMAX厅', 'movie_name': '流浪地球3',
+        'show_time': '2025-07-05 19:30', 'raw_data': {'id': order_id}, 'updated': updated
+    }
+
+
+def test_save_orders_batches_inserts_and_upserts(tmp_path):
+    """整批写入：已存在的新订单被忽略，调价订单更新价格，返回实际写入的数量"""
+    db = DatabaseManager(str(tmp_path / 'orders.db'))
+    assert db.connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    assert db.save_orders([_order('a'), _order('b')], '哈哈') == 2
+    assert db.save_orders([_order('a'), _order('b', price=35.0, updated=True), _order('c')], '哈哈') == 2
+    assert db.get_orders_count() == 3
+    prices = dict(db.connection.execute("SELECT order_id, bidding_price FROM orders").fetchall())
+    assert prices == {'a': 30.0, 'b': 35.0, 'c': 30.0}
+    db.close()
+
+
+def test_raw_data_stored_compressed_and_decoded_on_request(tmp_path):
+    """原始订单压缩后单独保存，列表查询默认不返回，显式请求时才解压"""
+    db = DatabaseManager(str(tmp_path / 'orders.db'))
+    order = _order('a')
+    order['raw_data'] = {'order_id': 'a', 'cinemaName': '万达影城（万象城店）', 'remark': ''}
+    db.save_orders([order], '哈哈')
+    db.save_orders([dict(_order('a', updated=True), raw_data={'order_id': 'a', 'maxPrice': '35'})], '哈哈')
+
+    assert db.connection.execute("SELECT raw_data FROM orders").fetchone()[0] == ''
+    data = db.connection.execute("SELECT data FROM order_raw").fetchone()[0]
+    # 不带预置字典的zlib格式
+    assert isinstance(data, bytes) and data[0] == raw_codec.FORMAT_PLAIN
+    assert 'raw_data' not in db.get_recent_orders()[0]
+    assert db.get_recent_orders(include_raw=True)[0]['raw_data'] == {'order_id': 'a', 'maxPrice': '35'}
+    assert db.get_all_orders_as_dicts(include_raw=True)[0]['raw_data'] == db.get_raw_data('a')
+    assert db.get_raw_data('missing') is None
+    db.close()
+
+
+def test_keyset_pages_and_since_id_delta(tmp_path):
+    """键集分页按 (created_at_ms, id) 倒序不重不漏，增量查询只返回ID更大的新订单"""
+    db = DatabaseManager(str(tmp_path / 'orders.db'))
+    # 同一批订单的入库时间相同，按ID区分先后
+    db.save_orders([_order(f'h{i}') for i in range(5)], '哈哈')
+    db.save_orders([_order(f'm{i}') for i in range(3)], '麻花')
+
+    pages = []
+    cursor = None
+    while True:
+        orders, cursor = db.get_orders_page(3, cursor)
+        pages.append([order['order_id'] for order in orders])
+        if cursor is None:
+            break
+    assert pages == [['m2', 'm1', 'm0'], ['h4', 'h3', 'h2'], ['h1', 'h0']]
+
+    orders, cursor = db.get_orders_page(10, platform_name='哈哈')
+    assert len(orders) == 5 and cursor is None
+
+    last_id = db.get_recent_orders(1)[0]['id']
+    assert db.get_orders_since(last_id) == []
+    db.save_orders([_order('new1'), _order('new2')], '哈哈')
+    assert [order['order_id'] for order in db.get_orders_since(last_id)] == ['new1', 'new2']
+    db.close()
+
+
+def test_stats_rollups_follow_inserts_and_deletes(tmp_path):
+    """统计汇总表随订单插入和删除增减，重复的新订单和调价订单不重复计数"""
+    db = DatabaseManager(str(tmp_path / 'orders.db'))
+    db.save_orders([_order('a'), _order('b'), dict(_order('c'), city='北京')], '哈哈')
+    db.save_orders([_order('a'), _order('b', price=35.0, updated=True)], '哈哈')
+    db.save_orders([_order('m1')], '麻花')
+
+    stats = db.get_order_stats()
+    assert db.get_orders_count() == stats['total'] == 4
+    assert stats['platforms'] == {'哈哈': 3, '麻花': 1}
+    assert stats['cities'] == [{'name': '成都', 'count': 3}, {'name': '北京', 'count': 1}]
+    assert stats['cinemas'] == [{'name': '万达影城', 'count': 4}]
+    assert sum(item['count'] for item in stats['hourly']) == 4
+
+    db.connection.execute("DELETE FROM orders WHERE order_id IN ('c', 'm1')")
+    db.connection.commit()
+    stats = db.get_order_stats(platform_name='哈哈')
+    assert stats['platforms'] == {'哈哈': 2} and stats['cities'] == [{'name': '成都', 'count': 2}]
+    assert db.get_order_stats()['platforms'] == {'哈哈': 2}
+    db.close()
+
+
+def test_persister_group_commits_and_drains_on_close(tmp_path):
+    """多次提交的订单在合并窗口内一起写入，关闭时写完剩余订单"""
+    db_path = str(tmp_path / 'orders.db')
+    persister = OrderPersister(db_path, batch_size=1000, max_delay=0.5)
+    persister.start()
+    for i in range(10):
+        persister.submit([_order(f'h{i}')], '哈哈')
+        persister.submit([_order(f'm{i}')], '麻花')
+    persister.close()
+
+    metrics = persister.get_metrics()
+    assert metrics['saved'] == 20 and metrics['failures'] == 0
+    # 两个平台各一次写入
+    assert metrics['writes'] == 2
+    assert DatabaseManager(db_path).get_orders_count() == 20
+
+
+def _wait_for(condition, timeout=2.0):
+    """等待后台线程满足条件"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_persister_writes_when_batch_full_or_delay_expires(tmp_path):
+    """累积到 batch_size 条订单时立即写入，不足时等待满 max_delay 秒后写入，不必等到关闭"""
+    persister = OrderPersister(str(tmp_path / 'orders.db'), batch_size=5, max_delay=1.0)
+    persister.start()
+
+    persister.submit([_order(f'a{i}') for i in range(5)], '哈哈')
+    assert _wait_for(lambda: persister.get_metrics()['writes'] == 1, timeout=0.5)
+
+    persister.submit([_order('b')], '哈哈')
+    time.sleep(0.1)
+    assert persister.get_metrics()['writes'] == 1
+    assert _wait_for(lambda: persister.get_metrics()['writes'] == 2)
+    assert persister.close() and persister.get_metrics()['saved'] == 6
+
+
+def test_persister_close_drains_queue_behind_slow_writes(tmp_path, monkeypatch):
+    """写入变慢时队列积压，close() 等待全部写完；超时返回时线程继续写入，再次关闭后全部写入"""
+    original_save = DatabaseManager.save_orders
+
+    def slow_save(self, orders, platform_name):
+        time.sleep(0.1)
+        return original_save(self, orders, platform_name)
+
+    monkeypatch.setattr(DatabaseManager, 'save_orders', slow_save)
+    db_path = str(tmp_path / 'orders.db')
+    persister = OrderPersister(db_path, batch_size=1, max_delay=0)
+    persister.start()
+    for i in range(5):
+        persister.submit([_order(f'o{i}')], '哈哈')
+
+    assert not persister.close(timeout=0.05)
+    assert persister.is_alive()
+    assert persister.close(timeout=None)
+    assert not persister.is_alive()
+
+    metrics = persister.get_metrics()
+    assert metrics['queue_depth'] == 0 and metrics['saved'] == 5 and metrics['writes'] == 5
+    assert DatabaseManager(db_path).get_orders_count() == 5
+
+
+def test_persister_counts_failed_writes_and_keeps_running(tmp_path, monkeypatch):
+    """某个平台写入失败时计入失败次数，其他平台和之后的订单照常写入"""
+    original_save = DatabaseManager.save_orders
+
+    def failing_save(self, orders, platform_name):
+        if platform_name == '麻花':
+            raise sqlite3.OperationalError('disk I/O error')
+        return original_save(self, orders, platform_name)
+
+    monkeypatch.setattr(DatabaseManager, 'save_orders', failing_save)
+    persister = OrderPersister(str(tmp_path / 'orders.db'), batch_size=1000, max_delay=0.2)
+    persister.start()
+    persister.submit([_order('m1')], '麻花')
+    persister.submit([_order('h1')], '哈哈')
+    assert _wait_for(lambda: persister.get_metrics()['failures'] == 1)
+
+    persister.submit([_order('h2')], '哈哈')
+    assert persister.close()
+    metrics = persister.get_metrics()
+    assert metrics['failures'] == 1 and metrics['saved'] == 2 and metrics['writes'] == 2
+
+
+def test_persister_counts_batches_that_save_nothing(tmp_path, monkeypatch):
+    """save_orders 出错时回滚并返回0，整批订单没有写入也计为失败"""
+    monkeypatch.setattr(DatabaseManager, 'save_orders', lambda self, orders, platform_name: 0)
+    persister = OrderPersister(str(tmp_path / 'orders.db'), batch_size=1000, max_delay=0)
+    persister.start()
+    persister.submit([_order('a')], '哈哈')
+    assert persister.close()
+    assert persister.get_metrics()['failures'] == 1 and persister.get_metrics()['saved'] == 0
+
+
+def test_persister_drops_orders_when_database_cannot_open(tmp_path, monkeypatch):
+    """持久化线程无法打开数据库时记录失败状态，之后提交的订单直接丢弃并计数，不会无限积压"""
+    import core.persistence
+
+    def broken_database(db_path):
+        raise sqlite3.OperationalError('unable to open database file')
+
+    monkeypatch.setattr(core.persistence, 'DatabaseManager', broken_database)
+    persister = OrderPersister(str(tmp_path / 'orders.db'))
+    persister.start()
+    assert _wait_for(lambda: persister.failed)
+
+    persister.submit([_order('a'), _order('b')], '哈哈')
+    metrics = persister.get_metrics()
+    assert metrics['dropped'] == 2 and metrics['queue_depth'] == 0 and metrics['failed']
+    assert persister.close(timeout=None)
+
+
+def test_read_pool_does_not_block_behind_open_write(tmp_path):
+    """写连接持有未提交的写事务时，多个线程通过只读连接池并发读取已提交的数据"""
+    db_path = str(tmp_path / 'orders.db')
+    writer = DatabaseManager(db_path)
+    writer.save_orders([_order('a'), _order('b')], '哈哈')
+    writer.connection.execute("BEGIN IMMEDIATE")
+    writer.connection.execute("DELETE FROM orders")
+
+    pool = ReadConnectionPool(db_path, size=2, timeout=5)
+    counts = []
+
+    def read():
+        with pool.connection() as db:
+            counts.append(db.get_orders_count())
+
+    threads = [threading.Thread(target=read) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counts == [2] * 6
+    assert pool.get_metrics()['open'] <= 2 and pool.get_metrics()['borrows'] == 6
+    # 只读连接不允许写入
+    with pool.connection() as db, pytest.raises(sqlite3.OperationalError):
+        db.connection.execute("DELETE FROM orders")
+
+    writer.connection.rollback()
+    pool.close()
+    writer.close()
+
+
+def test_migration_adds_epoch_columns_and_backfills(tmp_path):
+    """旧版本数据库打开时迁移到当前版本：增加毫秒时间戳列并回填，按整数列排序，原始数据移到压缩表，回填统计汇总"""
+    db_path = str(tmp_path / 'orders.db')
+    legacy = sqlite3.connect(db_path)
+    legacy.execute("""
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, order_id TEXT UNIQUE NOT NULL, bidding_price REAL NOT NULL,
+            seat_count INTEGER NOT NULL, city TEXT NOT NULL, cinema_name TEXT NOT NULL, hall_type TEXT NOT NULL,
+            movie_name TEXT NOT NULL, show_timestamp TEXT, platform TEXT NOT NULL, raw_data TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    legacy.executemany(
+        "INSERT INTO orders (order_id, bidding_price, seat_count, city, cinema_name, hall_type, movie_name, "
+        "show_timestamp, platform, raw_data, created_at) VALUES (?, 30, 1, '成都', '万达', 'IMAX', '电影', ?, '哈哈', ?, ?)",
+        [('old1', '2025-07-05 19:30', '{"id": "old1"}', '2025-07-01 08:00:00'),
+         ('old2', '', '{}', '2025-07-02 08:00:00')]
+    )
+    legacy.commit()
+    legacy.close()
+
+    db = DatabaseManager(db_path)
+    assert db.connection.execute("PRAGMA user_version").fetchone()[0] == len(DatabaseManager._MIGRATIONS)
+    rows = {row['order_id']: row for row in db.get_recent_orders()}
+    # 2025-07-01 08:00:00（UTC+8）
+    assert rows['old1']['created_at_ms'] == 1751328000000
+    assert rows['old1']['show_time_ms'] == 1751715000000 and rows['old2']['show_time_ms'] is None
+    assert db.get_orders_count() == 2
+    # 原始数据压缩后移到 order_raw 表
+    assert db.get_raw_data('old1') == {'id': 'old1'}
+    assert db.connection.execute("SELECT COUNT(*) FROM orders WHERE raw_data != ''").fetchone()[0] == 0
+
+    db.save_orders([_order('new')], '哈哈')
+    assert [order['order_id'] for order in db.get_recent_orders()] == ['new', 'old2', 'old1']
+    assert db.get_recent_order_ids('哈哈', 1751328000, 10) == ['new', 'old2', 'old1']
+    db.close()
+
+
+def test_migration_backfills_null_created_at_for_keyset_paging(tmp_path):
+    """入库时间为空的旧订单迁移后有回退的入库时间，键集分页能取到，按小时汇总也计入"""
+    db_path = str(tmp_path / 'orders.db')
+    db = DatabaseManager(db_path)
+    db.save_orders([_order('a'), _order('b')], '哈哈')
+    # 模拟旧版本中 created_at 无法解析、迁移后仍为空的订单
+    db.connection.execute(
+        "INSERT INTO orders (order_id, bidding_price, seat_count, city, cinema_name, hall_type, movie_name, "
+        "show_timestamp, platform, raw_data, created_at, created_at_ms) "
+        "VALUES ('x', 30, 1, '成都', '万达影城', 'IMAX厅', '电影', '', '哈哈', '', 'bad', NULL)"
+    )
+    db.connection.execute("PRAGMA user_version = 3")
+    db.connection.commit()
+    db.save_orders([_order('c')], '哈哈')
+    assert db.get_order_stats()['total'] == 4 and sum(item['count'] for item in db.get_order_stats()['hourly']) == 3
+    b_created_at_ms = db.connection.execute("SELECT created_at_ms FROM orders WHERE order_id = 'b'").fetchone()[0]
+    db.close()
+
+    db = DatabaseManager(db_path)
+    assert db.connection.execute("PRAGMA user_version").fetchone()[0] == len(DatabaseManager._MIGRATIONS)
+    assert db.connection.execute("SELECT created_at_ms FROM orders WHERE order_id = 'x'").fetchone()[0] == b_created_at_ms
+
+    seen = []
+    cursor = None
+    while True:
+        orders, cursor = db.get_orders_page(1, cursor)
+        seen.extend(order['order_id'] for order in orders)
+        if cursor is None:
+            break
+    assert seen == ['c', 'x', 'b', 'a']
+    assert sum(item['count'] for item in db.get_order_stats()['hourly']) == 4
+
+    db.connection.execute("DELETE FROM orders WHERE order_id = 'x'")
+    db.connection.commit()
+    assert sum(item['count'] for item in db.get_order_stats()['hourly']) == 3
+    db.close()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+哈哈平台响应处理验证脚本
+"""
+
+import base64
+import asyncio
+import hashlib
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+from core import jsoncodec
+from core.platforms.haha_adapter import HahaAdapter
+from config import API_TOKEN
+
+
+def _encrypt(orders) -> str:
+    """按哈哈平台的算法加密订单列表"""
+    key = hashlib.md5(f"{API_TOKEN}piaofan@123".encode('utf-8')).hexdigest().encode('utf-8')
+    iv = hashlib.md5(f"{API_TOKEN}piaofan@456".encode('utf-8')).hexdigest()[:16].encode('utf-8')
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    return base64.b64encode(cipher.encrypt(pad(jsoncodec.dumps(orders).encode('utf-8'), AES.block_size))).decode()
+
+
+def _response(data) -> str:
+    return jsoncodec.dumps({'code': 200, 'data': data})
+
+
+def _order(order_id):
+    return {'order_id': order_id, 'maxPrice': '40', 'seat_num': '2', 'cityName': '成都',
+            'cinemaName': '万达影城', 'hallName': 'IMAX厅', 'movieName': '流浪地球3'}
+
+
+def _adapter(responses):
+    """创建哈哈平台适配器，订单列表请求替换为按顺序返回给定响应的假请求"""
+    adapter = HahaAdapter('哈哈')
+    responses = list(responses)
+
+    async def fake_request():
+        return 200, responses.pop(0)
+
+    adapter._request_order_list = fake_request
+    return adapter
+
+
+def test_empty_order_list_is_a_successful_poll():
+    """平台当前没有订单是正常的空结果：轮询成功，之前的订单从挂单簿移除"""
+    adapter = _adapter([_response([_order('h1')]), _response([]), _response(_encrypt([])), _response(None)])
+
+    result = asyncio.run(adapter.poll())
+    assert result['success'] and [order['order_id'] for order in result['orders']] == ['h1']
+    assert 'h1' in adapter.order_book
+
+    for _ in range(3):
+        result = asyncio.run(adapter.poll())
+        assert result['success'] and result['orders'] == []
+    assert 'h1' not in adapter.order_book
+    assert adapter.circuit_breaker.consecutive_failures == 0
+
+
+def test_decrypt_errors_are_failures():
+    """密文无法解密或解密后不是订单列表时轮询失败，与合法的空列表区分"""
+    adapter = _adapter([_response('bm90IGVuY3J5cHRlZA=='), _response(_encrypt({'message': 'x'}))])
+    for _ in range(2):
+        assert not asyncio.run(adapter.poll())['success']
+    assert adapter.circuit_breaker.consecutive_failures == 2
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式数组解析验证脚本
+"""
+
+import json
+
+import pytest
+
+from core.jsoncodec import ArrayStreamDecoder
+
+
+def _decode(body: bytes, chunk_size: int):
+    """按固定大小分块输入响应，返回解析出的数组元素和解码器"""
+    decoder = ArrayStreamDecoder('rtnData')
+    items = []
+    for start in range(0, len(body), chunk_size):
+        items.extend(decoder.feed(body[start:start + chunk_size]))
+    return items, decoder
+
+
+def test_chunks_split_inside_strings_escapes_and_multibyte_characters():
+    """分块边界落在字符串、转义序列和多字节字符中间时，解析结果与整体解析一致"""
+    payload = {
+        'rtnCode': '000000',
+        'rtnMsg': '成功，含 "引号" 和 \\ 反斜杠',
+        'rtnData': [
+            {'id': 'MH1', 'movieName': '流浪地球3', 'remark': 'a "quoted" ] , { text'},
+            {'id': 'MH2', 'movieName': '哪吒\u4e4b魔童闹海', 'remark': 'C:\\path\\"x"\\'},
+            12.5,
+            'tail ] string',
+        ],
+        'total': 4,
+    }
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    escaped = json.dumps(payload).encode('utf-8')
+
+    for data in (body, escaped):
+        for chunk_size in range(1, 8):
+            items, decoder = _decode(data, chunk_size)
+            assert items == payload['rtnData'], chunk_size
+            assert decoder.envelope() == dict(payload, rtnData=[])
+
+
+def test_key_text_in_string_value_or_nested_object_is_not_matched():
+    """字符串值和嵌套对象中出现的同名文本不是数组起点，只匹配最外层对象的键"""
+    body = ('{"rtnMsg": "\\"rtnData", "\\"rtnData": ["fake"], "meta": {"rtnData": [0]}, '
+            '"note": "\\"rtnData\\": [1]", "rtnData": [{"id": 1}, {"id": 2}], "rtnCode": "000000"}').encode('utf-8')
+    expected = json.loads(body)
+
+    for chunk_size in (1, 3, len(body)):
+        items, decoder = _decode(body, chunk_size)
+        assert items == [{'id': 1}, {'id': 2}], chunk_size
+        assert decoder.envelope() == dict(expected, rtnData=[])
+
+
+def test_non_array_value_falls_back_to_envelope():
+    """键的值不是数组时不流式返回元素，envelope() 返回整个响应"""
+    body = b'{"rtnCode": "999999", "rtnData": null, "rtnMsg": "[]"}'
+    items, decoder = _decode(body, 4)
+    assert items == []
+    assert decoder.envelope() == {'rtnCode': '999999', 'rtnData': None, 'rtnMsg': '[]'}
+
+
+def test_truncated_input_returns_complete_items_only():
+    """响应在元素中间截断：只返回完整到达的元素，envelope() 报告响应不完整"""
+    body = b'{"rtnCode": "000000", "rtnData": [{"id": 1}, {"id": 2}, {"id": 3, "movieName": "\xe6\xb5\x81\xe6'
+    items, decoder = _decode(body, 5)
+    assert items == [{'id': 1}, {'id': 2}]
+    with pytest.raises(json.JSONDecodeError):
+        decoder.envelope()
+
+    # 数组中的数字位于末尾时可能被截断，不提前返回
+    items, decoder = _decode(b'{"rtnData": [1, 2, 34', 100)
+    assert items == [1, 2]
+    with pytest.raises(json.JSONDecodeError):
+        decoder.envelope()
+
+    # 数组起点之前就截断
+    items, decoder = _decode(b'{"rtnCode": "000000", "rtnDa', 3)
+    assert items == []
+    with pytest.raises(json.JSONDecodeError):
+        decoder.envelope()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+麻花平台Token刷新验证脚本
+"""
+
+import asyncio
+
+from core.platforms import mahua_adapter
+from core.platforms.mahua_adapter import MahuaAdapter
+
+
+def _adapter_with_fake_login(delay=0.05):
+    """创建适配器，登录请求替换为计数的假登录"""
+    adapter = MahuaAdapter('麻花')
+    adapter.logins = 0
+
+    async def fake_get_token():
+        adapter.logins += 1
+        await asyncio.sleep(delay)
+        adapter.token = f'token-{adapter.logins}'
+        adapter.token_expiry_time = adapter._clock() + mahua_adapter.MAHUA_TOKEN_TTL
+        return adapter.token
+
+    adapter._get_token = fake_get_token
+    return adapter
+
+
+def test_concurrent_refreshes_share_one_login():
+    """多个调用方同时刷新Token时只登录一次，全部拿到同一个Token"""
+    async def scenario():
+        adapter = _adapter_with_fake_login()
+        tokens = await asyncio.gather(*[adapter._refresh_token() for _ in range(10)])
+        return adapter.logins, tokens
+
+    logins, tokens = asyncio.run(scenario())
+    assert logins == 1
+    assert tokens == ['token-1'] * 10
+
+
+def test_cancelled_caller_does_not_cancel_shared_refresh():
+    """某个调用方被取消时，共享的登录继续完成，其他调用方正常拿到Token"""
+    async def scenario():
+        adapter = _adapter_with_fake_login(delay=0.1)
+        cancelled = asyncio.ensure_future(adapter._refresh_token())
+        waiting = asyncio.ensure_future(adapter._refresh_token())
+        await asyncio.sleep(0.02)
+        cancelled.cancel()
+        token = await waiting
+        return adapter, cancelled, token
+
+    adapter, cancelled, token = asyncio.run(scenario())
+    assert cancelled.cancelled()
+    assert token == 'token-1' and adapter.logins == 1
+    assert adapter._token_task.done() and not adapter._token_task.cancelled()
+
+
+def _run_refresher(adapter, max_sleeps):
+    """用虚拟时钟运行后台刷新循环，第 max_sleeps 次等待时停止，返回每次等待的秒数"""
+    now = [1000.0]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) >= max_sleeps:
+            raise asyncio.CancelledError
+        now[0] += delay
+
+    adapter._clock = lambda: now[0]
+    adapter._sleep = fake_sleep
+
+    async def scenario():
+        try:
+            await adapter._token_refresher_loop()
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    return sleeps
+
+
+def test_refresher_does_not_spin_when_ttl_within_margin(monkeypatch):
+    """Token有效期不长于提前量时，后台刷新按重试间隔进行，每次等待只登录一次"""
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_TTL', 1)
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_REFRESH_MARGIN', 10)
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_RETRY_INTERVAL', 5)
+
+    adapter = _adapter_with_fake_login(delay=0)
+    sleeps = _run_refresher(adapter, max_sleeps=4)
+
+    assert sleeps == [5, 5, 5, 5]
+    assert adapter.logins == 4
+
+
+def test_refresher_sleeps_until_margin_before_expiry(monkeypatch):
+    """有效期长于提前量时，刷新后等待到过期前 MARGIN 秒再刷新"""
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_TTL', 3600)
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_REFRESH_MARGIN', 120)
+    monkeypatch.setattr(mahua_adapter, 'MAHUA_TOKEN_RETRY_INTERVAL', 5)
+
+    adapter = _adapter_with_fake_login(delay=0)
+    sleeps = _run_refresher(adapter, max_sleeps=3)
+
+    assert sleeps == [3480, 3480, 3480]
+    assert adapter.logins == 3
+
+
+def test_only_explicit_token_messages_count_as_rejected():
+    """只有明确的Token失效提示触发刷新，其他提到登录的错误不触发"""
+    adapter = MahuaAdapter('麻花')
+    assert adapter._is_token_rejected({'rtnCode': '100001', 'rtnMsg': 'Token已过期'})
+    assert adapter._is_token_rejected({'rtnCode': '100001', 'rtnMsg': '登录已失效，请重新登录'})
+    assert not adapter._is_token_rejected({'rtnCode': '100002', 'rtnMsg': '登录过于频繁，请稍后再试'})
+    assert not adapter._is_token_rejected({'rtnCode': '100003', 'rtnMsg': '当前登录设备无接单权限'})
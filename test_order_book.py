@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时挂单簿验证脚本
+"""
+
+from core.platforms.order_book import OrderBook
+
+
+def _order(order_id, price=30.0, seats=1):
+    return {'order_id': order_id, 'bidding_price': price, 'seat_count': seats}
+
+
+def test_snapshot_diff_reports_added_changed_removed():
+    """相邻两次快照的差异按订单ID分为新增、变化和移除"""
+    book = OrderBook('测试')
+    events = []
+    book.subscribe(events.append)
+
+    first = book.apply_snapshot([_order('a'), _order('b'), _order('c')], now=100)
+    assert first.initial and [e.order_id for e in first.added] == ['a', 'b', 'c']
+
+    diff = book.apply_snapshot([_order('a'), _order('b', price=35.0), _order('d')], now=105)
+    assert not diff.initial
+    assert [e.order_id for e in diff.added] == ['d']
+    assert [e.order_id for e in diff.changed] == ['b']
+    assert [(e.order_id, e.last_seen) for e in diff.removed] == [('c', 100)]
+    assert len(events) == 2
+
+    entry = book.get('a')
+    assert (entry.first_seen, entry.last_seen) == (100, 105)
+    assert 'c' not in book and len(book) == 3
+
+
+def test_unchanged_snapshot_emits_nothing():
+    """快照没有变化时不通知订阅者"""
+    book = OrderBook('测试')
+    events = []
+    book.apply_snapshot([_order('a')], now=100)
+    book.subscribe(events.append)
+
+    assert not book.apply_snapshot([_order('a')], now=105)
+    assert events == []
+    assert book.get_metrics() == {'size': 1, 'added': 1, 'changed': 0, 'removed': 0}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单去重组件验证脚本
+"""
+
+import time
+from core.platforms.dedup import OrderDeduplicator
+
+
+def _orders(*order_ids):
+    return [{'order_id': order_id} for order_id in order_ids]
+
+
+def test_filter_new_only_returns_unseen_orders():
+    """同一订单只在第一次出现时被视为新订单"""
+    dedup = OrderDeduplicator(ttl=60, max_size=100)
+
+    assert [o['order_id'] for o in dedup.filter_new(_orders('a', 'b'))] == ['a', 'b']
+    assert [o['order_id'] for o in dedup.filter_new(_orders('a', 'b', 'c'))] == ['c']
+    assert dedup.get_metrics() == {'size': 3, 'hits': 2, 'misses': 3, 'updates': 0, 'evictions': 0}
+
+
+def test_orders_still_listed_never_expire():
+    """仍在列表中的订单每次轮询都会刷新出现时间，不会被重复提醒"""
+    dedup = OrderDeduplicator(ttl=60, max_size=100)
+    dedup.filter_new(_orders('a'))
+
+    # 模拟订单在50秒前最后一次出现，本次轮询仍在列表中
+    dedup._last_seen['a'] = time.time() - 50
+    assert dedup.filter_new(_orders('a')) == []
+    assert 'a' in dedup
+
+
+def test_expired_orders_are_evicted():
+    """订单消失超过ttl后被清理，再次出现时视为新订单"""
+    dedup = OrderDeduplicator(ttl=60, max_size=100)
+    dedup.filter_new(_orders('a', 'b'))
+    dedup._last_seen['a'] = time.time() - 120
+    dedup._sweep(time.time())
+
+    assert 'a' not in dedup
+    assert len(dedup) == 1
+    assert dedup.get_metrics()['evictions'] == 1
+    assert [o['order_id'] for o in dedup.filter_new(_orders('a'))] == ['a']
+
+
+def test_size_is_bounded():
+    """记录数量超过上限时淘汰最久未出现的订单"""
+    dedup = OrderDeduplicator(ttl=3600, max_size=3)
+    for index in range(5):
+        dedup.filter_new(_orders(f'order-{index}'))
+        dedup._last_seen[f'order-{index}'] -= 10 - index
+
+    assert len(dedup) <= 3
+    assert 'order-4' in dedup
+    assert 'order-0' not in dedup
+
+
+def test_repriced_orders_are_returned_as_updated():
+    """已见过的订单调价后作为已更新订单再次返回，价格不变的订单仍被过滤"""
+    dedup = OrderDeduplicator(ttl=60, max_size=100)
+    dedup.filter_new([{'order_id': 'a', 'bidding_price': 30.0, 'seat_count': 2},
+                      {'order_id': 'b', 'bidding_price': 40.0, 'seat_count': 1}])
+
+    orders = dedup.filter_new([{'order_id': 'a', 'bidding_price': 35.0, 'seat_count': 2},
+                               {'order_id': 'b', 'bidding_price': 40.0, 'seat_count': 1}])
+    assert [(o['order_id'], o.get('updated')) for o in orders] == [('a', True)]
+    assert dedup.get_metrics()['updates'] == 1
+
+    # 调价后的价格再次出现时不会重复返回
+    assert dedup.filter_new([{'order_id': 'a', 'bidding_price': 35.0, 'seat_count': 2}]) == []
+
+
+def test_size_bound_never_evicts_currently_listed_orders():
+    """本次轮询中仍在列表的订单即使超过上限也不淘汰，不会在下一次轮询被重复提醒"""
+    dedup = OrderDeduplicator(ttl=3600, max_size=3)
+    listed = _orders('a', 'b', 'c', 'd', 'e')
+    assert len(dedup.filter_new(listed)) == 5
+    assert len(dedup) == 5 and dedup.get_metrics()['evictions'] == 0
+    assert dedup.filter_new(listed) == []
+
+    # 旧订单下架后，新订单出现时从最久未出现的开始淘汰
+    time.sleep(0.01)
+    dedup.filter_new(_orders('f', 'g'))
+    assert len(dedup) == 3
+    assert 'f' in dedup and 'g' in dedup and 'e' in dedup and 'a' not in dedup
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求执行器验证脚本
+"""
+
+import asyncio
+
+from core.platforms.hedging import RequestHedger
+
+
+class FakeRequests:
+    """按调用顺序返回不同耗时的假请求，记录被取消的请求"""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = []
+
+    async def __call__(self):
+        index = self.calls
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delays[index])
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        return f'response-{index}'
+
+
+def _warm_hedger(**kwargs):
+    """创建已积累耗时样本的执行器（最近请求都在10ms左右返回）"""
+    hedger = RequestHedger('测试', enabled=True, min_delay=0.05, min_samples=3, **kwargs)
+    for _ in range(50):
+        hedger.latency.record(0.01)
+    return hedger
+
+
+def test_hedging_disabled_by_default():
+    """默认关闭：慢请求也只发出一次"""
+    hedger = RequestHedger('测试')
+    requests = FakeRequests(0.3, 0.0)
+
+    assert not hedger.enabled
+    assert asyncio.run(hedger.run(requests)) == 'response-0'
+    assert requests.calls == 1 and hedger.get_metrics()['hedges'] == 0
+
+
+def test_hedge_fires_after_delay_and_cancels_slower_request():
+    """主请求超过等待时间未返回时发出对冲请求，先返回的胜出，较慢的请求被取消"""
+    hedger = _warm_hedger(budget_ratio=1.0)
+    requests = FakeRequests(1.0, 0.01)
+
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        result = await hedger.run(requests)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == 'response-1'
+    assert 0.05 <= elapsed < 0.5
+    assert requests.cancelled == [0]
+    assert hedger.get_metrics()['hedges'] == 1 and hedger.get_metrics()['hedge_wins'] == 1
+
+    # 主请求在等待时间内返回时不发出对冲请求
+    requests = FakeRequests(0.0)
+    assert asyncio.run(hedger.run(requests)) == 'response-0'
+    assert requests.calls == 1
+
+
+def test_hedges_respect_budget():
+    """每个主请求只为预算增加 budget_ratio，预算不足时等待主请求而不对冲"""
+    hedger = _warm_hedger(budget_ratio=0.5)
+
+    first = FakeRequests(0.3, 0.0)
+    assert asyncio.run(hedger.run(first)) == 'response-0'
+    assert first.calls == 1 and hedger.budget_denied == 1
+
+    second = FakeRequests(0.3, 0.0)
+    assert asyncio.run(hedger.run(second)) == 'response-1'
+    assert second.calls == 2 and hedger.hedges == 1
+
+    third = FakeRequests(0.3, 0.0)
+    asyncio.run(hedger.run(third))
+    assert third.calls == 1 and hedger.budget_denied == 2
+
+
+def test_cancelled_primary_records_elapsed_time():
+    """对冲胜出时，被取消的慢主请求按已耗时间记入耗时样本，对冲等待时间不会因此缩短"""
+    hedger = _warm_hedger(budget_ratio=1.0)
+    requests = FakeRequests(1.0, 0.2)
+
+    assert asyncio.run(hedger.run(requests)) == 'response-1'
+    assert requests.cancelled == [0]
+
+    # 对冲请求耗时约0.2秒，主请求被取消时已耗时约0.25秒（等待0.05秒 + 对冲0.2秒）
+    samples = sorted(hedger.latency.samples)
+    assert len(samples) == 52
+    hedge_latency, primary_elapsed = samples[-2:]
+    assert 0.2 <= hedge_latency < primary_elapsed
+    assert primary_elapsed >= 0.25
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始响应抓取验证脚本
+"""
+
+import os
+import gzip
+import json
+import time
+
+from core.capture import ResponseCapture
+
+
+def test_capture_writes_jsonl_and_rotates(tmp_path):
+    """每条响应写成一行JSON，文件超过大小上限后轮转并压缩，只保留指定个数"""
+    filepath = str(tmp_path / 'responses.jsonl')
+    capture = ResponseCapture(filepath, max_bytes=2000, backup_count=2, flush_interval=0.05)
+    capture.start()
+    # 分几次提交，写入线程每写完一批检查一次文件大小
+    for i in range(30):
+        capture.record('哈哈', 200, 0.0123, f'{{"code": 200, "data": "{"x" * 200}{i}"}}')
+        if i % 10 == 9:
+            time.sleep(0.1)
+    capture.record('麻花', 500, 0.5, 'error'.encode('utf-8'))
+    capture.close()
+
+    metrics = capture.get_metrics()
+    assert metrics['captured'] == 31 and metrics['dropped'] == 0 and metrics['failures'] == 0
+    assert metrics['rotations'] >= 3
+
+    backups = sorted(name for name in os.listdir(tmp_path) if name.endswith('.jsonl.gz'))
+    assert len(backups) == 2
+
+    lines = []
+    for name in backups:
+        with gzip.open(tmp_path / name, 'rt', encoding='utf-8') as file:
+            lines.extend(json.loads(line) for line in file)
+    with open(filepath, encoding='utf-8') as file:
+        lines.extend(json.loads(line) for line in file)
+
+    assert lines[0]['platform'] == '哈哈' and lines[0]['status'] == 200 and lines[0]['latency_ms'] == 12.3
+    assert lines[-1] == {'ts': lines[-1]['ts'], 'platform': '麻花', 'status': 500, 'latency_ms': 500.0, 'body': 'error'}
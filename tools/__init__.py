@@ -0,0 +1 @@
+# tools模块初始化文件
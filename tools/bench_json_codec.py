@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码基准测试 - 对比标准库json与core.jsoncodec当前后端在真实结构数据上的耗时
+
+用法（在项目根目录执行）:
+    python -m tools.bench_json_codec [--orders 200] [--repeat 200]
+"""
+
+import json
+import time
+import random
+import argparse
+from core import jsoncodec
+from tools.fake_orders import make_orders
+
+
+def _bench(func, repeat: int) -> float:
+    """执行 repeat 次并返回单次平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def build_cases(order_count: int) -> list:
+    """
+    构建与实际调用点一致的测试用例
+
+    Returns:
+        list: (用例名称, 标准库实现, codec实现) 列表
+    """
+    rng = random.Random(42)
+    mahua_orders = make_orders('mahua', order_count, rng)
+    haha_orders = make_orders('haha', order_count, rng)
+
+    mahua_body = json.dumps({'rtnCode': '000000', 'rtnMsg': '成功', 'rtnData': mahua_orders}, ensure_ascii=False)
+    haha_plain = json.dumps(haha_orders, ensure_ascii=False)
+    raw_rows = [json.dumps(order, ensure_ascii=False) for order in haha_orders]
+    api_payload = {
+        'success': True,
+        'message': f'成功获取 {order_count} 条订单数据',
+        'total_count': order_count,
+        'data': [dict(order, raw_data=order) for order in haha_orders]
+    }
+
+    return [
+        ('麻花响应解析 loads(body)',
+         lambda: json.loads(mahua_body),
+         lambda: jsoncodec.loads(mahua_body)),
+        ('哈哈解密后解析 loads(plaintext)',
+         lambda: json.loads(haha_plain),
+         lambda: jsoncodec.loads(haha_plain)),
+        ('save_orders 逐行 dumps(raw_data)',
+         lambda: [json.dumps(order, ensure_ascii=False) for order in haha_orders],
+         lambda: [jsoncodec.dumps(order) for order in haha_orders]),
+        ('查询结果逐行 loads(raw_data)',
+         lambda: [json.loads(row) for row in raw_rows],
+         lambda: [jsoncodec.loads(row) for row in raw_rows]),
+        ('web_server 响应序列化',
+         lambda: json.dumps(api_payload, ensure_ascii=False, indent=2).encode('utf-8'),
+         lambda: jsoncodec.dumps_bytes(api_payload)),
+    ]
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='JSON编解码基准测试')
+    parser.add_argument('--orders', type=int, default=200, help='每个用例的订单数量')
+    parser.add_argument('--repeat', type=int, default=200, help='每个用例的重复次数')
+    args = parser.parse_args()
+
+    print(f"JSON后端: {jsoncodec.BACKEND}，订单数量: {args.orders}，重复次数: {args.repeat}")
+    print("=" * 80)
+    print(f"{'用例':<36}{'标准库(μs)':>12}{'codec(μs)':>12}{'加速比':>10}")
+
+    for name, stdlib_func, codec_func in build_cases(args.orders):
+        stdlib_us = _bench(stdlib_func, args.repeat)
+        codec_us = _bench(codec_func, args.repeat)
+        print(f"{name:<36}{stdlib_us:>12.1f}{codec_us:>12.1f}{stdlib_us / codec_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
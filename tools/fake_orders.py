@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟订单生成模块 - 生成与哈哈、麻花平台字段结构一致的原始订单，用于基准测试和本地压测
+"""
+
+import random
+import itertools
+
+CITIES = ['北京', '上海', '广州', '深圳', '成都', '杭州', '武汉', '西安', '南京', '重庆']
+CINEMA_BRANDS = ['万达影城', 'CGV影城', '博纳国际影城', '金逸影城', '大地影院', '横店电影城', '中影国际影城']
+CINEMA_AREAS = ['万象城店', '来福士店', '吾悦广场店', '龙湖天街店', '银泰城店', '大悦城店']
+HALLS = ['1号厅', '2号厅', 'IMAX厅', 'VIP厅', '杜比全景声厅', '4DX厅', 'CINITY厅', '激光厅']
+MOVIES = ['流浪地球3', '哪吒之魔童闹海', '封神第二部', '唐探1900', '热辣滚烫', '飞驰人生3', '志愿军']
+
+_order_counter = itertools.count(1)
+
+
+def _pick_show(rng: random.Random) -> dict:
+    """随机挑选一个场次的公共信息"""
+    return {
+        'city': rng.choice(CITIES),
+        'cinema': f"{rng.choice(CINEMA_BRANDS)}({rng.choice(CINEMA_AREAS)})",
+        'hall': rng.choice(HALLS),
+        'movie': rng.choice(MOVIES),
+        'show_time': f"2025-07-{rng.randint(1, 28):02d} {rng.randint(9, 23):02d}:{rng.choice(['00', '15', '30', '45'])}",
+        'seats': rng.randint(1, 6),
+        'price': round(rng.uniform(25, 90), 1)
+    }
+
+
+def make_haha_order(rng: random.Random = random) -> dict:
+    """
+    生成一条哈哈平台原始订单（解密后的结构）
+
+    Returns:
+        dict: 原始订单
+    """
+    show = _pick_show(rng)
+    order_no = next(_order_counter)
+    return {
+        'order_id': f"HH{order_no:012d}",
+        'maxPrice': str(show['price']),
+        'seat_num': str(show['seats']),
+        'cityName': show['city'],
+        'cinemaName': show['cinema'],
+        'hallName': show['hall'],
+        'movieName': show['movie'],
+        'showTime': show['show_time'],
+        'is_from': rng.choice(['1', '2', '3', '5']),
+        'is_lock': rng.choice(['0', '0', '0', '1']),
+        'seat_info': ','.join(f"{rng.randint(1, 15)}排{rng.randint(1, 20)}座" for _ in range(show['seats'])),
+        'remark': '',
+        'create_time': f"2025-07-05 {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+    }
+
+
+def make_mahua_order(rng: random.Random = random) -> dict:
+    """
+    生成一条麻花平台原始订单（rtnData中的元素）
+
+    Returns:
+        dict: 原始订单
+    """
+    show = _pick_show(rng)
+    order_no = next(_order_counter)
+    return {
+        'id': f"MH{order_no:012d}",
+        'discountPriceUp': show['price'],
+        'salePrice': round(show['price'] + rng.uniform(5, 20), 1),
+        'buyNum': show['seats'],
+        'movieCityName': show['city'],
+        'movieCinemaName': show['cinema'],
+        'movieHallName': show['hall'],
+        'movieName': show['movie'],
+        'movieShowTime': show['show_time'],
+        'seatNames': ','.join(f"{rng.randint(1, 15)}排{rng.randint(1, 20)}座" for _ in range(show['seats'])),
+        'biddingStatus': 1,
+        'createTime': f"2025-07-05 {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+    }
+
+
+def make_orders(platform: str, count: int, rng: random.Random = random) -> list:
+    """
+    批量生成原始订单
+
+    Args:
+        platform (str): 'haha' 或 'mahua'
+        count (int): 订单数量
+
+    Returns:
+        list: 原始订单列表
+    """
+    factory = make_haha_order if platform == 'haha' else make_mahua_order
+    return [factory(rng) for _ in range(count)]
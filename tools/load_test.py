@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+适配器压测脚本 - 让启用的平台适配器以远高于正常频率的速度轮询本地模拟服务器
+
+用法（在项目根目录执行，先启动 tools.stub_server）:
+    python -m tools.load_test --base-url http://127.0.0.1:8765 --interval 0.05 --duration 30
+
+默认在临时目录中运行，避免把压测订单写入正式的 orders.db。
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+import config
+
+
+def override_urls(base_url: str):
+    """
+    把平台接口地址指向模拟服务器，必须在导入适配器模块之前调用
+
+    Args:
+        base_url (str): 模拟服务器地址，如 http://127.0.0.1:8765
+    """
+    base_url = base_url.rstrip('/')
+    config.API_URL = f"{base_url}/api/Synchro/pcToList"
+    config.MAHUA_LOGIN_URL = f"{base_url}/api/user-server/user/dev/login"
+    config.MAHUA_ORDER_LIST_URL = f"{base_url}/api/movie-server/movie/bidding/info/list"
+
+
+async def poll_adapter(adapter, persister, interval: float, deadline: float, stats: dict):
+    """以固定间隔轮询单个适配器直到压测结束，新订单交给持久化线程保存"""
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        result = await adapter.poll()
+        elapsed = time.monotonic() - started
+
+        stats['polls'] += 1
+        stats['latency_total'] += elapsed
+        stats['latency_max'] = max(stats['latency_max'], elapsed)
+        if isinstance(result, dict) and result.get('success'):
+            stats['success'] += 1
+            stats['new_orders'] += len(result.get('orders', []))
+            persister.submit(result.get('orders', []), adapter.name)
+        elif isinstance(result, dict) and result.get('orders'):
+            # 轮询失败或超时取消前已通过去重的订单
+            stats['new_orders'] += len(result.get('orders', []))
+            persister.submit(result.get('orders', []), adapter.name)
+
+        await asyncio.sleep(max(0.0, interval - elapsed))
+
+
+async def run(args):
+    """创建适配器并并发压测"""
+    from core.metrics import pipeline_metrics
+    from core.persistence import OrderPersister
+    from core.capture import ResponseCapture
+    from core.platforms.registry import create_enabled_adapters
+
+    adapters = create_enabled_adapters(args.platforms)
+    persister = OrderPersister()
+    persister.start()
+    capture = None
+    if args.capture:
+        capture = ResponseCapture(args.capture)
+        capture.start()
+        for adapter in adapters:
+            adapter.capture = capture
+    deadline = time.monotonic() + args.duration
+    all_stats = {
+        adapter.name: {'polls': 0, 'success': 0, 'new_orders': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+        for adapter in adapters
+    }
+
+    await asyncio.gather(*[
+        poll_adapter(adapter, persister, args.interval, deadline, all_stats[adapter.name])
+        for adapter in adapters
+    ])
+    for adapter in adapters:
+        await adapter.close()
+    await asyncio.to_thread(persister.close)
+    if capture is not None:
+        await asyncio.to_thread(capture.close)
+
+    print("=" * 80)
+    print(f"压测时长 {args.duration}s，轮询间隔 {args.interval}s（正常频率的 {config.API_REQUEST_INTERVAL / args.interval:.0f} 倍）")
+    for adapter in adapters:
+        stats = all_stats[adapter.name]
+        polls = stats['polls'] or 1
+        print(f"{adapter.name}: 轮询 {stats['polls']} 次（{stats['polls'] / args.duration:.1f}/s），"
+              f"成功 {stats['success']} 次，新订单 {stats['new_orders']} 条，"
+              f"平均耗时 {stats['latency_total'] / polls * 1000:.1f}ms，最大耗时 {stats['latency_max'] * 1000:.1f}ms")
+        print(f"    指标: {adapter.get_metrics()}")
+        for stage, summary in pipeline_metrics.summary().get(adapter.name, {}).items():
+            print(f"    {stage:<12} p50 {summary['p50']}ms  p95 {summary['p95']}ms  p99 {summary['p99']}ms  "
+                  f"max {summary['max']}ms  (n={summary['count']})")
+    print(f"持久化: {persister.get_metrics()}")
+    if capture is not None:
+        print(f"原始响应抓取: {capture.get_metrics()}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='平台适配器压测')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8765', help='模拟服务器地址')
+    parser.add_argument('--interval', type=float, default=0.05, help='每个平台的轮询间隔（秒）')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒）')
+    parser.add_argument('--platforms', nargs='*', default=None, help='参与压测的平台标识，默认使用配置')
+    parser.add_argument('--hedge', action='store_true', help='启用对冲请求（覆盖 config.HEDGE_ENABLED）')
+    parser.add_argument('--stream', action='store_true', help='麻花平台使用流式解析（覆盖 config.MAHUA_STREAMING_PARSE）')
+    parser.add_argument('--deadline', type=float, default=None, help='单次轮询截止时间（覆盖 config.POLL_DEADLINE）')
+    parser.add_argument('--capture', default=None, help='把原始订单列表响应抓取到指定的JSON Lines文件')
+    parser.add_argument('--keep-db', action='store_true', help='在当前目录写入orders.db，而不是临时目录')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    override_urls(args.base_url)
+    if args.hedge:
+        config.HEDGE_ENABLED = True
+    if args.stream:
+        config.MAHUA_STREAMING_PARSE = True
+    if args.deadline is not None:
+        config.POLL_DEADLINE = args.deadline
+    if args.capture:
+        args.capture = os.path.abspath(args.capture)
+    if not args.keep_db:
+        os.chdir(tempfile.mkdtemp(prefix='order_load_test_'))
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取回放脚本 - 用抓取到的原始响应（core.capture 写入的JSON Lines文件）驱动完整的处理流水线
+
+适配器的HTTP会话被替换为回放会话，按抓取顺序返回记录的响应，依次经过解密、解析、标准化、
+去重、规则匹配和持久化，最后输出吞吐量和各阶段耗时，用于在真实流量形态下对比流水线改动的效果。
+
+用法（在项目根目录执行）:
+    python -m tools.replay captures/responses.jsonl                  # 按抓取时的节奏回放
+    python -m tools.replay captures/responses-*.jsonl.gz --speed 10  # 10倍速回放
+    python -m tools.replay captures/responses.jsonl --speed 0        # 不等待，尽可能快地回放
+
+默认在临时目录中运行，避免把回放订单写入正式的 orders.db。
+"""
+
+import os
+import gzip
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import deque
+
+import aiohttp
+
+import config
+from core import jsoncodec
+
+
+def load_records(paths: list) -> list:
+    """
+    读取抓取文件（.jsonl 或轮转后压缩的 .jsonl.gz），按响应时间排序
+
+    Args:
+        paths (list): 抓取文件路径列表
+
+    Returns:
+        list: 抓取记录列表，无法解析的行会被跳过
+    """
+    records = []
+    skipped = 0
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(jsoncodec.loads(line))
+                except jsoncodec.JSONDecodeError:
+                    skipped += 1
+    if skipped:
+        logging.warning(f"跳过 {skipped} 行无法解析的抓取记录")
+    records.sort(key=lambda record: record['ts'])
+    return records
+
+
+class ReplayResponse:
+    """回放响应，提供适配器用到的 aiohttp 响应接口（status、text()、content.iter_any()）"""
+
+    def __init__(self, status: int, body: bytes, chunk_size: int, delay: float):
+        self.status = status
+        self._body = body
+        self._chunk_size = chunk_size
+        self._delay = delay
+        self.content = self
+
+    async def __aenter__(self):
+        # 模拟抓取时记录的请求耗时
+        if self._delay > 0:
+            await asyncio.sleep(self._delay)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def text(self) -> str:
+        return self._body.decode('utf-8', errors='replace')
+
+    async def iter_any(self):
+        """按固定大小分块返回响应内容，供流式解析使用"""
+        for start in range(0, len(self._body), self._chunk_size):
+            yield self._body[start:start + self._chunk_size]
+            await asyncio.sleep(0)
+
+
+class ReplaySession:
+    """
+    回放会话，替代适配器的 aiohttp.ClientSession
+
+    每次订单列表请求按顺序返回下一条抓取记录；麻花平台的登录请求直接返回一个有效Token，
+    不消耗抓取记录。记录用完后请求抛出连接错误。
+    """
+
+    def __init__(self, records: list, chunk_size: int = 16 * 1024, latency_scale: float = 0.0):
+        """
+        初始化回放会话
+
+        Args:
+            records (list): 单个平台的抓取记录，按时间排序
+            chunk_size (int): 流式读取时每块的字节数
+            latency_scale (float): 请求耗时的缩放系数，0表示不模拟请求耗时
+        """
+        self._records = deque(records)
+        self.chunk_size = chunk_size
+        self.latency_scale = latency_scale
+        self.closed = False
+        self.replayed = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def peek(self) -> dict:
+        """下一条将要返回的抓取记录"""
+        return self._records[0]
+
+    def post(self, url, **kwargs) -> ReplayResponse:
+        """返回下一条抓取记录对应的响应"""
+        if url == config.MAHUA_LOGIN_URL:
+            body = jsoncodec.dumps_bytes({'rtnCode': '000000', 'rtnMsg': '成功', 'rtnData': {'token': 'replay'}})
+            return ReplayResponse(200, body, self.chunk_size, 0.0)
+
+        if not self._records:
+            raise aiohttp.ClientConnectionError("抓取记录已全部回放")
+        record = self._records.popleft()
+        self.replayed += 1
+        delay = record.get('latency_ms', 0) / 1000 * self.latency_scale
+        return ReplayResponse(record.get('status', 200), record['body'].encode('utf-8'), self.chunk_size, delay)
+
+    get = post
+
+    async def close(self):
+        self.closed = True
+
+
+async def replay_platform(adapter, session: ReplaySession, match_orders, persister,
+                          speed: float, started: float, origin: float, stats: dict):
+    """
+    回放单个平台的全部抓取记录
+
+    speed > 0 时按抓取记录的请求时间（收到响应的时间减去请求耗时）除以 speed 安排每次轮询，
+    speed 为0时上一次轮询结束后立即开始下一次。
+    """
+    while len(session):
+        if speed > 0:
+            record = session.peek()
+            request_at = record['ts'] - record.get('latency_ms', 0) / 1000
+            delay = started + (request_at - origin) / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        result = await adapter.poll()
+        stats['polls'] += 1
+        orders = result.get('orders', []) if isinstance(result, dict) else []
+        if isinstance(result, dict) and (result.get('success') or orders):
+            if result.get('success'):
+                stats['success'] += 1
+            stats['new_orders'] += len(orders)
+            if orders:
+                # 与后台线程相同：先匹配规则（流式解析的订单已经匹配过），再交给持久化线程
+                if not result.get('streamed'):
+                    match_orders(adapter.name, orders)
+                persister.submit(orders, adapter.name)
+
+
+async def run(args, records: list) -> dict:
+    """
+    创建适配器并回放抓取记录
+
+    Returns:
+        dict: 回放报告，包含吞吐量、各阶段耗时和各组件统计
+    """
+    from core.engine import RuleEngine
+    from core.cross_platform import CrossPlatformIndex
+    from core.metrics import pipeline_metrics, build_report
+    from core.persistence import OrderPersister
+    from core.platforms.registry import PLATFORM_SPECS, create_enabled_adapters
+
+    by_platform = {}
+    for record in records:
+        by_platform.setdefault(record['platform'], []).append(record)
+
+    platform_keys = [key for key, spec in PLATFORM_SPECS.items() if spec['name'] in by_platform]
+    unknown = set(by_platform) - {PLATFORM_SPECS[key]['name'] for key in platform_keys}
+    if unknown:
+        logging.warning(f"抓取记录中的平台未注册，已跳过: {', '.join(sorted(unknown))}")
+
+    adapters = create_enabled_adapters(platform_keys)
+    sessions = {}
+    for adapter in adapters:
+        sessions[adapter.name] = ReplaySession(by_platform[adapter.name], args.chunk_size,
+                                               args.latency / args.speed if args.speed > 0 else 0.0)
+        adapter._session = sessions[adapter.name]
+        # 对冲请求会多消耗一条抓取记录，回放时关闭
+        adapter.hedger.enabled = False
+
+    engine = RuleEngine(args.rules)
+    cross_index = CrossPlatformIndex() if config.CROSS_PLATFORM_DEDUP else None
+    match_stats = {'matches': 0, 'updated_matches': 0}
+
+    def match_orders(platform_name, orders):
+        """检查一批订单的规则匹配，与后台线程的处理一致（跨平台同一场次只计一次提醒）"""
+        match_started = time.perf_counter()
+        for order in orders:
+            match_result = engine.check_order(order)
+            if match_result is None:
+                if cross_index is not None and order.get('updated'):
+                    cross_index.discard(platform_name, order.get('order_id'))
+                continue
+            if cross_index is not None and not cross_index.route(platform_name, order, match_result['total_profit'])[0]:
+                continue
+            match_stats['matches'] += 1
+            if order.get('updated'):
+                match_stats['updated_matches'] += 1
+        pipeline_metrics.record(platform_name, 'match', time.perf_counter() - match_started)
+
+    for adapter in adapters:
+        adapter.order_sink = match_orders
+        if cross_index is not None:
+            cross_index.attach(adapter.order_book)
+
+    persister = OrderPersister()
+    persister.start()
+    all_stats = {adapter.name: {'polls': 0, 'success': 0, 'new_orders': 0} for adapter in adapters}
+    origin = min((record['ts'] - record.get('latency_ms', 0) / 1000 for record in records), default=0.0)
+    started = time.monotonic()
+
+    await asyncio.gather(*[
+        replay_platform(adapter, sessions[adapter.name], match_orders, persister,
+                        args.speed, started, origin, all_stats[adapter.name])
+        for adapter in adapters
+    ])
+    elapsed = time.monotonic() - started
+    for adapter in adapters:
+        await adapter.close()
+    await asyncio.to_thread(persister.close)
+
+    replayed = sum(session.replayed for session in sessions.values())
+    report = build_report(adapters, persister, cross_index=cross_index)
+    report['replay'] = {
+        'records': len(records),
+        'replayed': replayed,
+        'speed': args.speed,
+        'elapsed': round(elapsed, 3),
+        'captured_span': round(max((record['ts'] for record in records), default=origin) - origin, 3),
+        'responses_per_second': round(replayed / elapsed, 1) if elapsed > 0 else None,
+        'platforms': all_stats,
+        **match_stats
+    }
+    return report
+
+
+def print_report(report: dict):
+    """输出回放报告"""
+    replay = report['replay']
+    speed_text = '不等待' if replay['speed'] <= 0 else f"{replay['speed']:g}倍速"
+    print("=" * 80)
+    print(f"回放 {replay['replayed']}/{replay['records']} 条响应（{speed_text}），"
+          f"抓取时长 {replay['captured_span']}s，回放用时 {replay['elapsed']}s，"
+          f"吞吐量 {replay['responses_per_second']} 条响应/s")
+    print(f"规则匹配提醒 {replay['matches']} 次（其中调价后匹配 {replay['updated_matches']} 次）")
+    if 'cross_platform' in report:
+        print(f"跨平台场次索引: {report['cross_platform']}")
+    for platform_name, stats in replay['platforms'].items():
+        print(f"{platform_name}: 轮询 {stats['polls']} 次，成功 {stats['success']} 次，新订单 {stats['new_orders']} 条")
+        print(f"    指标: {report['adapters'].get(platform_name)}")
+        for stage, summary in report['stages_ms'].get(platform_name, {}).items():
+            print(f"    {stage:<12} p50 {summary['p50']}ms  p95 {summary['p95']}ms  p99 {summary['p99']}ms  "
+                  f"max {summary['max']}ms  (n={summary['count']})")
+    print(f"持久化: {report['persistence']}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='用抓取的原始响应回放处理流水线')
+    parser.add_argument('captures', nargs='+', help='抓取文件（.jsonl 或 .jsonl.gz）')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，0表示不等待、尽可能快')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='按抓取记录的请求耗时乘以该系数模拟网络等待（再除以倍速），默认不模拟')
+    parser.add_argument('--chunk-size', type=int, default=16 * 1024, help='流式解析时每块的字节数')
+    parser.add_argument('--stream', action='store_true', help='麻花平台使用流式解析（覆盖 config.MAHUA_STREAMING_PARSE）')
+    parser.add_argument('--rules', default=config.RULES_FILE, help='规则文件')
+    parser.add_argument('--report', default=None, help='把回放报告写入JSON文件，便于对比不同版本')
+    parser.add_argument('--keep-db', action='store_true', help='在当前目录写入orders.db，而不是临时目录')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.stream:
+        config.MAHUA_STREAMING_PARSE = True
+
+    records = load_records([os.path.abspath(path) for path in args.captures])
+    if not records:
+        print("抓取文件中没有可回放的记录")
+        return
+    args.rules = os.path.abspath(args.rules)
+    report_path = os.path.abspath(args.report) if args.report else None
+    if not args.keep_db:
+        os.chdir(tempfile.mkdtemp(prefix='order_replay_'))
+
+    report = asyncio.run(run(args, records))
+    print_report(report)
+    if report_path:
+        with open(report_path, 'wb') as file:
+            file.write(jsoncodec.dumps_bytes(report, pretty=True))
+        print(f"回放报告已写入 {report_path}")
+
+
+if __name__ == "__main__":
+    main()
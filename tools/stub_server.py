@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地平台模拟服务器 - 在本机模拟哈哈、麻花平台的接口，用于离线压测轮询流程
+
+模拟的接口：
+    POST /api/Synchro/pcToList                          哈哈订单列表（AES加密，与 _aes_decrypt 使用相同的密钥推导）
+    POST /api/user-server/user/dev/login                麻花登录（校验md5签名）
+    POST /api/movie-server/movie/bidding/info/list      麻花竞价订单列表（校验md5签名和Token）
+
+用法（在项目根目录执行）:
+    python -m tools.stub_server --port 8765 --order-rate 20 --latency-ms 80 --error-rate 0.01
+
+然后把 config.py 中的地址指向本机：
+    API_URL = 'http://127.0.0.1:8765/api/Synchro/pcToList'
+    MAHUA_LOGIN_URL = 'http://127.0.0.1:8765/api/user-server/user/dev/login'
+    MAHUA_ORDER_LIST_URL = 'http://127.0.0.1:8765/api/movie-server/movie/bidding/info/list'
+或者使用 tools.load_test 直接在压测进程内覆盖这些地址。
+"""
+
+import time
+import uuid
+import json
+import random
+import base64
+import asyncio
+import hashlib
+import logging
+import argparse
+from urllib.parse import parse_qs
+
+from aiohttp import web
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+from config import API_TOKEN, MAHUA_SECRET_KEY, MAHUA_DEV_CODE
+from tools.fake_orders import make_haha_order, make_mahua_order
+
+
+def aes_encrypt(plaintext: str, token: str) -> str:
+    """
+    按哈哈平台的算法加密数据，是 HahaAdapter._aes_decrypt 的逆过程
+
+    Args:
+        plaintext (str): 明文JSON字符串
+        token (str): 用于生成密钥的token
+
+    Returns:
+        str: Base64编码的密文
+    """
+    key = hashlib.md5(f"{token}piaofan@123".encode('utf-8')).hexdigest().encode('utf-8')
+    iv = hashlib.md5(f"{token}piaofan@456".encode('utf-8')).hexdigest()[:16].encode('utf-8')
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    encrypted = cipher.encrypt(pad(plaintext.encode('utf-8'), AES.block_size, style='pkcs7'))
+    return base64.b64encode(encrypted).decode('ascii')
+
+
+def mahua_sign(body: str, txntime: str) -> str:
+    """计算麻花平台请求签名"""
+    return hashlib.md5((body + MAHUA_SECRET_KEY + txntime).encode('utf-8')).hexdigest()
+
+
+class StubPlatform:
+    """
+    单个模拟平台的挂单列表
+
+    按 order_rate 持续产生新订单，每个订单挂出 order_lifetime 秒后被"抢走"从列表移除；
+    按 reprice_rate 随机给挂单加价，模拟平台调价。
+    列表未变化时复用上一次序列化的结果，模拟平台在平静期返回完全相同的响应。
+    """
+
+    def __init__(self, factory, order_rate: float, order_lifetime: float, padding: int, seed: int,
+                 price_field: str = None, reprice_rate: float = 0.0):
+        self.factory = factory
+        self.order_rate = order_rate
+        self.order_lifetime = order_lifetime
+        self.price_field = price_field
+        self.reprice_rate = reprice_rate
+        self.padding = 'x' * padding
+        self.rng = random.Random(seed)
+        self.orders = []  # (挂出时间, 原始订单)
+        self._pending = 0.0
+        self._pending_reprice = 0.0
+        self._last_advance = time.monotonic()
+        self._version = 0
+        self._cache = {}
+
+    def advance(self):
+        """根据时间推进挂单列表：产生新订单、移除过期订单"""
+        now = time.monotonic()
+        elapsed = now - self._last_advance
+        self._pending += elapsed * self.order_rate
+        self._pending_reprice += elapsed * self.reprice_rate
+        self._last_advance = now
+
+        reprice_count = int(self._pending_reprice)
+        self._pending_reprice -= reprice_count
+        if reprice_count and self.orders and self.price_field:
+            for _ in range(reprice_count):
+                order = self.rng.choice(self.orders)[1]
+                price = float(order[self.price_field]) + 5
+                order[self.price_field] = str(price) if isinstance(order[self.price_field], str) else price
+
+        new_count = int(self._pending)
+        self._pending -= new_count
+        for _ in range(new_count):
+            order = self.factory(self.rng)
+            if self.padding:
+                order['padding'] = self.padding
+            self.orders.append((now, order))
+
+        expire_before = now - self.order_lifetime
+        live_orders = [item for item in self.orders if item[0] >= expire_before]
+        if new_count or reprice_count or len(live_orders) != len(self.orders):
+            self.orders = live_orders
+            self._version += 1
+            self._cache.clear()
+
+    def page(self, page_size: int) -> list:
+        """返回最新挂出的一页订单"""
+        return [order for _, order in self.orders[-page_size:]][::-1]
+
+    def cached(self, key, builder):
+        """列表未变化时复用上次的序列化结果"""
+        if key not in self._cache:
+            self._cache[key] = builder()
+        return self._cache[key]
+
+
+class StubServer:
+    """模拟服务器，负责延迟、错误注入以及两个平台的接口实现"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.haha = StubPlatform(make_haha_order, args.order_rate, args.order_lifetime, args.padding, args.seed,
+                                 price_field='maxPrice', reprice_rate=args.reprice_rate)
+        self.mahua = StubPlatform(make_mahua_order, args.order_rate, args.order_lifetime, args.padding, args.seed + 1,
+                                  price_field='discountPriceUp', reprice_rate=args.reprice_rate)
+        self.tokens = {}  # token -> 过期时间
+        self.stats = {'requests': 0, 'errors': 0, 'hangs': 0, 'rejected': 0}
+
+    async def _simulate_network(self):
+        """
+        模拟服务端延迟和故障
+
+        Returns:
+            web.Response: 注入错误时返回错误响应，否则返回None
+        """
+        self.stats['requests'] += 1
+        args = self.args
+
+        if args.hang_rate and self.rng.random() < args.hang_rate:
+            self.stats['hangs'] += 1
+            await asyncio.sleep(args.hang_seconds)
+
+        delay_ms = max(0.0, self.rng.gauss(args.latency_ms, args.jitter_ms))
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+
+        if args.error_rate and self.rng.random() < args.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=500, text='Internal Server Error')
+        return None
+
+    async def _respond(self, request: web.Request, body: str) -> web.StreamResponse:
+        """
+        返回JSON响应；设置了 chunk_delay_ms 时分块发送，模拟大响应体的慢速传输
+
+        Args:
+            request (web.Request): 当前请求
+            body (str): 响应体
+        """
+        if not self.args.chunk_delay_ms:
+            return web.Response(text=body, content_type='application/json')
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/json; charset=utf-8'})
+        await response.prepare(request)
+        data = body.encode('utf-8')
+        for start in range(0, len(data), self.args.chunk_size):
+            await response.write(data[start:start + self.args.chunk_size])
+            await asyncio.sleep(self.args.chunk_delay_ms / 1000)
+        await response.write_eof()
+        return response
+
+    async def haha_list(self, request: web.Request) -> web.Response:
+        """哈哈平台订单列表接口"""
+        error = await self._simulate_network()
+        if error is not None:
+            return error
+
+        form = parse_qs(await request.text())
+        page_size = int(form.get('limit', ['200'])[0])
+        token = request.headers.get('token', API_TOKEN)
+
+        self.haha.advance()
+
+        def build():
+            plaintext = json.dumps(self.haha.page(page_size), ensure_ascii=False)
+            return json.dumps({'code': 200, 'msg': 'success', 'data': aes_encrypt(plaintext, token)})
+
+        body = self.haha.cached(('list', page_size, token), build)
+        return await self._respond(request, body)
+
+    def _check_mahua_sign(self, request: web.Request, body: str) -> bool:
+        """校验麻花平台请求签名"""
+        txntime = request.headers.get('txntime', '')
+        return (request.headers.get('devCode') == MAHUA_DEV_CODE
+                and request.headers.get('sign') == mahua_sign(body, txntime))
+
+    async def mahua_login(self, request: web.Request) -> web.Response:
+        """麻花平台登录接口"""
+        error = await self._simulate_network()
+        if error is not None:
+            return error
+
+        body = await request.text()
+        if not self._check_mahua_sign(request, body):
+            return web.json_response({'rtnCode': '100002', 'rtnMsg': '签名错误', 'rtnData': None})
+
+        token = uuid.uuid4().hex
+        self.tokens[token] = time.time() + self.args.token_ttl
+        return web.json_response({'rtnCode': '000000', 'rtnMsg': '成功', 'rtnData': {'token': token}})
+
+    async def mahua_list(self, request: web.Request) -> web.Response:
+        """麻花平台竞价订单列表接口"""
+        error = await self._simulate_network()
+        if error is not None:
+            return error
+
+        body = await request.text()
+        if not self._check_mahua_sign(request, body):
+            return web.json_response({'rtnCode': '100002', 'rtnMsg': '签名错误', 'rtnData': None})
+
+        token = request.headers.get('token')
+        expiry = self.tokens.get(token, 0)
+        reject = self.args.token_reject_rate and self.rng.random() < self.args.token_reject_rate
+        if expiry < time.time() or reject:
+            self.stats['rejected'] += 1
+            self.tokens.pop(token, None)
+            return web.json_response({'rtnCode': '100001', 'rtnMsg': 'token已失效，请重新登录', 'rtnData': None})
+
+        page_size = int(json.loads(body or '{}').get('pageLimit', 200))
+        self.mahua.advance()
+
+        def build():
+            return json.dumps({'rtnCode': '000000', 'rtnMsg': '成功', 'rtnData': self.mahua.page(page_size)},
+                              ensure_ascii=False)
+
+        response_body = self.mahua.cached(('list', page_size), build)
+        return await self._respond(request, response_body)
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        """模拟服务器自身的统计信息"""
+        return web.json_response({
+            **self.stats,
+            'haha_live_orders': len(self.haha.orders),
+            'mahua_live_orders': len(self.mahua.orders)
+        })
+
+    def build_app(self) -> web.Application:
+        """创建aiohttp应用并注册路由"""
+        app = web.Application()
+        app.router.add_post('/api/Synchro/pcToList', self.haha_list)
+        app.router.add_post('/api/user-server/user/dev/login', self.mahua_login)
+        app.router.add_post('/api/movie-server/movie/bidding/info/list', self.mahua_list)
+        app.router.add_get('/stats', self.stats_handler)
+        return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(description='哈哈/麻花平台本地模拟服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--order-rate', type=float, default=0.5, help='每个平台每秒产生的新订单数')
+    parser.add_argument('--order-lifetime', type=float, default=120, help='订单挂出后被抢走前的秒数')
+    parser.add_argument('--reprice-rate', type=float, default=0.0, help='每个平台每秒随机加价的挂单数')
+    parser.add_argument('--padding', type=int, default=0, help='每条订单附加的填充字节数，用于放大响应体')
+    parser.add_argument('--latency-ms', type=float, default=50, help='平均响应延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='响应延迟的标准差（毫秒）')
+    parser.add_argument('--chunk-size', type=int, default=4096, help='分块发送时每块的字节数')
+    parser.add_argument('--chunk-delay-ms', type=float, default=0, help='分块发送时每块之间的间隔（毫秒），0表示一次性发送')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回HTTP 500的概率')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='请求挂起的概率')
+    parser.add_argument('--hang-seconds', type=float, default=30, help='挂起请求的持续秒数')
+    parser.add_argument('--token-ttl', type=float, default=30 * 60, help='麻花Token有效期（秒）')
+    parser.add_argument('--token-reject-rate', type=float, default=0.0, help='麻花列表接口随机拒绝Token的概率')
+    parser.add_argument('--seed', type=int, default=42, help='随机数种子')
+    return parser
+
+
+def main():
+    """主函数"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args()
+    server = StubServer(args)
+    logging.info(f"模拟服务器启动: http://{args.host}:{args.port}")
+    web.run_app(server.build_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
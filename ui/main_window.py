@@ -6,6 +6,7 @@
 
 import sys
 import json
+import time
 import uuid
 import asyncio
 import logging
@@ -21,10 +22,17 @@ from PyQt6.QtCore import QObject, QThread, pyqtSignal, Qt
 from PyQt6.QtGui import QColor
 
 from core.engine import RuleEngine
-from core.platforms.haha_adapter import HahaAdapter
-from core.platforms.mahua_adapter import MahuaAdapter
+from core.platforms.registry import create_enabled_adapters
 from core.audio import TTSPlayer
-from config import RULES_FILE, API_REQUEST_INTERVAL, ALERT_TEXT_TEMPLATE, HAHA_PLATFORM_NAME, MAHUA_PLATFORM_NAME
+from core.snapshot import StateSnapshot
+from core.metrics import pipeline_metrics, build_report, write_report
+from core.persistence import OrderPersister
+from core.capture import ResponseCapture
+from core.cross_platform import CrossPlatformIndex
+from config import (
+    RULES_FILE, API_REQUEST_INTERVAL, ALERT_TEXT_TEMPLATE, HAHA_PLATFORM_NAME,
+    STATE_SNAPSHOT_INTERVAL, CAPTURE_ENABLED, CROSS_PLATFORM_DEDUP, SHUTDOWN_TIMEOUT
+)
 
 
 class Worker(QObject):
@@ -41,36 +49,157 @@ class Worker(QObject):
         """初始化Worker，接受规则引擎实例"""
         super().__init__()
         self.engine = engine
+        # 后台事件循环及退出事件，供其他线程请求停止
+        self._loop = None
+        self._stop_event = None
+        # 订单持久化器，退出时主窗口据此判断是否仍在写入剩余订单
+        self.persister = None
+
+    def stop(self):
+        """请求后台循环退出（可从GUI线程调用）"""
+        if self._loop is None or self._stop_event is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        except RuntimeError:
+            # 事件循环已经关闭
+            pass
+
+    async def _wait_or_stop(self, seconds):
+        """等待指定秒数，收到退出请求时立即返回"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
 
     def run(self):
         """后台任务主方法"""
         # 使用传入的规则引擎实例
         engine = self.engine
+        # 跨平台场次索引：同一场次出现在多个平台时只提醒利润更高的平台
+        cross_index = CrossPlatformIndex() if CROSS_PLATFORM_DEDUP else None
+
+        def evaluate_orders(platform_name, orders):
+            """检查一批订单的规则匹配，返回匹配成功的 [(平台名称, 订单, 匹配结果)]"""
+            match_started = time.perf_counter()
+            matches = []
+            for order in orders:
+                # 使用规则引擎检查订单
+                match_result = engine.check_order(order)
+                if match_result is not None:
+                    matches.append((platform_name, order, match_result))
+                elif cross_index is not None and order.get('updated'):
+                    # 调价后不再匹配规则的订单移出索引
+                    cross_index.discard(platform_name, order.get('order_id'))
+            pipeline_metrics.record(platform_name, 'match', time.perf_counter() - match_started)
+            return matches
+
+        def emit_opportunities(matches):
+            """把匹配成功的订单按场次合并后发射信号：同一场次只提醒利润最高的平台"""
+            if not matches:
+                return
+            if cross_index is not None:
+                decisions = cross_index.route_batch(
+                    [(platform_name, order, match_result['total_profit']) for platform_name, order, match_result in matches]
+                )
+            else:
+                decisions = [{'notify': True, 'alternatives': [], 'replaces': []}] * len(matches)
+
+            for (platform_name, order, match_result), decision in zip(matches, decisions):
+                if not decision['notify']:
+                    best = decision['alternatives'][0]
+                    logging.info(f"{platform_name}平台订单与{best['platform']}平台为同一场次，"
+                                 f"{best['platform']}平台利润更高（{best['total_profit']:.1f}元），不重复提醒")
+                    continue
+
+                # 创建包含平台信息的opportunity_data
+                opportunity_data = {
+                    'platform': platform_name,  # 新增平台信息
+                    'order_id': order.get('order_id'),
+                    'timestamp': order.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                    'show_time': order.get('show_time', '未知'),
+                    'total_profit': match_result['total_profit'],
+                    'seat_count': match_result['seat_count'],
+                    'rule_name': match_result['rule_name'],
+                    'order_details': match_result['order_details'],
+                    'updated': order.get('updated', False),  # 调价后重新匹配成功的订单
+                    'alternatives': decision['alternatives'],  # 其他平台同一场次的订单（利润更低）
+                    'replaces': decision['replaces']  # 之前已提醒、被本订单取代的同一场次订单
+                }
+
+                change_text = "（调价）" if opportunity_data['updated'] else ""
+                logging.info(f"发现抢单机会{change_text}: {match_result['rule_name']} - 总利润{match_result['total_profit']:.1f}元 ({match_result['seat_count']}张票)")
+
+                # 发射信号到主窗口
+                self.new_opportunity.emit(opportunity_data)
+
+        def match_orders(platform_name, orders):
+            """流式解析时的回调：下载过程中到达的一批订单立即匹配并提醒"""
+            emit_opportunities(evaluate_orders(platform_name, orders))
 
         async def main_loop():
             """主要的异步循环，从多个平台获取订单数据"""
             logging.info("后台监控线程启动")
 
-            # 实例化多个平台适配器
-            adapters = [
-                HahaAdapter(HAHA_PLATFORM_NAME),
-                MahuaAdapter(MAHUA_PLATFORM_NAME)
-            ]
+            # 按配置实例化启用的平台适配器（未启用的平台不会被导入）
+            adapters = create_enabled_adapters()
+            # 流式解析模式下，适配器在下载过程中就把新订单交给规则匹配
+            for adapter in adapters:
+                adapter.order_sink = match_orders
+                if cross_index is not None:
+                    cross_index.attach(adapter.order_book)
+
+            self._loop = asyncio.get_running_loop()
+            self._stop_event = asyncio.Event()
+
+            # 从状态快照恢复去重记录和Token（热启动）
+            snapshot = StateSnapshot()
+            snapshot.restore(adapters, engine.get_rules_hash())
+            last_snapshot_time = time.monotonic()
+
+            # 新订单在匹配规则之后交给后台持久化线程写入数据库
+            persister = OrderPersister()
+            persister.start()
+            self.persister = persister
+
+            # 可选：把原始订单列表响应写入抓取文件，供排查规则误判
+            capture = None
+            if CAPTURE_ENABLED:
+                capture = ResponseCapture()
+                capture.start()
+                for adapter in adapters:
+                    adapter.capture = capture
 
-            while True:
+            try:
+                await polling_loop(adapters, persister, capture, snapshot, last_snapshot_time)
+            finally:
+                # 退出前保存快照、写完剩余订单并释放适配器资源
+                snapshot.save(adapters, engine.get_rules_hash())
+                await asyncio.to_thread(persister.close)
+                if capture is not None:
+                    await asyncio.to_thread(capture.close)
+                for adapter in adapters:
+                    await adapter.close()
+                logging.info("后台监控线程已退出")
+
+        async def polling_loop(adapters, persister, capture, snapshot, last_snapshot_time):
+            """轮询循环，收到退出请求时结束"""
+            while not self._stop_event.is_set():
                 try:
                     # 发射状态更新信号 - 开始获取订单
                     self.status_update.emit("正在获取多平台订单...")
 
                     # 并发执行所有平台的任务
                     results = await asyncio.gather(
-                        *[adapter.fetch_and_process() for adapter in adapters],
+                        *[adapter.poll() for adapter in adapters],
                         return_exceptions=True
                     )
 
-                    # 处理结果
+                    # 处理结果：各平台匹配成功的订单收集起来按场次一起决定提醒，提醒之后再保存
                     successful_platforms = []
                     total_new_orders = 0
+                    cycle_matches = []
+                    pending_saves = []
 
                     for i, result in enumerate(results):
                         if isinstance(result, Exception):
@@ -87,28 +216,25 @@ class Worker(QObject):
                                 total_new_orders += len(orders)
                                 logging.info(f"{platform_name}平台获取成功，新增 {len(orders)} 条订单")
 
-                                # 遍历当前平台的订单并检查规则匹配
-                                for order in orders:
-                                    # 使用规则引擎检查订单
-                                    match_result = engine.check_order(order)
-
-                                    # 如果匹配成功，发射信号
-                                    if match_result is not None:
-                                        # 创建包含平台信息的opportunity_data
-                                        opportunity_data = {
-                                            'platform': platform_name,  # 新增平台信息
-                                            'timestamp': order.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                                            'show_time': order.get('show_time', '未知'),
-                                            'total_profit': match_result['total_profit'],
-                                            'seat_count': match_result['seat_count'],
-                                            'rule_name': match_result['rule_name'],
-                                            'order_details': match_result['order_details']
-                                        }
-
-                                        logging.info(f"发现抢单机会: {match_result['rule_name']} - 总利润{match_result['total_profit']:.1f}元 ({match_result['seat_count']}张票)")
-
-                                        # 发射信号到主窗口
-                                        self.new_opportunity.emit(opportunity_data)
+                                # 检查当前平台新订单的规则匹配（流式解析的订单在下载过程中已经匹配过）
+                                if not result.get('streamed'):
+                                    cycle_matches.extend(evaluate_orders(platform_name, orders))
+                                    # 从轮询开始到匹配完成超过截止时间的次数
+                                    if adapters[i].deadline.expired():
+                                        adapters[i].metrics['late_matches'] += 1
+                                pending_saves.append((orders, platform_name))
+                            elif orders:
+                                # 轮询失败或超时被取消；此前已通过去重的订单（流式解析时已经匹配过）仍需保存
+                                logging.info(f"{platform_name}平台获取失败，保存已收到的 {len(orders)} 条新订单")
+                                if not result.get('streamed'):
+                                    cycle_matches.extend(evaluate_orders(platform_name, orders))
+                                pending_saves.append((orders, platform_name))
+                            elif result.get('deadline_exceeded'):
+                                # 轮询超时被取消，适配器已记录日志
+                                logging.debug(f"{platform_name}平台轮询超时，跳过本轮")
+                            elif result.get('circuit_open'):
+                                # 熔断中的平台本轮被跳过，状态变化时熔断器已记录日志
+                                logging.debug(f"{platform_name}平台熔断中，跳过本轮")
                             else:
                                 logging.warning(f"{platform_name}平台获取失败")
                         else:
@@ -119,39 +245,34 @@ class Worker(QObject):
                                 total_new_orders += len(result)
                                 logging.info(f"{platform_name}平台获取成功，新增 {len(result)} 条订单")
 
-                                # 遍历当前平台的订单并检查规则匹配
-                                for order in result:
-                                    # 使用规则引擎检查订单
-                                    match_result = engine.check_order(order)
-
-                                    # 如果匹配成功，发射信号
-                                    if match_result is not None:
-                                        # 创建包含平台信息的opportunity_data
-                                        opportunity_data = {
-                                            'platform': platform_name,  # 新增平台信息
-                                            'timestamp': order.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                                            'show_time': order.get('show_time', '未知'),
-                                            'total_profit': match_result['total_profit'],
-                                            'seat_count': match_result['seat_count'],
-                                            'rule_name': match_result['rule_name'],
-                                            'order_details': match_result['order_details']
-                                        }
-
-                                        logging.info(f"发现抢单机会: {match_result['rule_name']} - 总利润{match_result['total_profit']:.1f}元 ({match_result['seat_count']}张票)")
-
-                                        # 发射信号到主窗口
-                                        self.new_opportunity.emit(opportunity_data)
+                                # 检查当前平台新订单的规则匹配
+                                cycle_matches.extend(evaluate_orders(platform_name, result))
+                                pending_saves.append((result, platform_name))
+
+                    # 所有平台的匹配结果一起按场次合并后提醒，再交给持久化线程保存
+                    emit_opportunities(cycle_matches)
+                    for orders, platform_name in pending_saves:
+                        persister.submit(orders, platform_name)
 
                     # 发射轮询周期完成信号
                     self.cycle_finished.emit(successful_platforms, total_new_orders)
 
+                    # 写入性能指标报告，供Web服务器读取
+                    await asyncio.to_thread(write_report, build_report(adapters, persister, capture, cross_index))
+
+                    # 定期保存状态快照（在线程池中写文件，不阻塞轮询）
+                    if time.monotonic() - last_snapshot_time >= STATE_SNAPSHOT_INTERVAL:
+                        snapshot_data = snapshot.build(adapters, engine.get_rules_hash())
+                        await asyncio.to_thread(snapshot.write, snapshot_data)
+                        last_snapshot_time = time.monotonic()
+
                     # 控制API调用频率
-                    await asyncio.sleep(API_REQUEST_INTERVAL)
+                    await self._wait_or_stop(API_REQUEST_INTERVAL)
 
                 except Exception as e:
                     logging.error(f"后台处理出错: {e}")
                     self.status_update.emit(f"处理出错: {e}，{API_REQUEST_INTERVAL}秒后重试...")
-                    await asyncio.sleep(API_REQUEST_INTERVAL)
+                    await self._wait_or_stop(API_REQUEST_INTERVAL)
 
         # 启动异步循环
         asyncio.run(main_loop())
@@ -206,6 +327,8 @@ class MainWindow(QMainWindow):
 
         # 创建表格
         self.table = QTableWidget()
+        # (平台, 订单ID) -> 该机会所在行的平台单元格，用于替换被取代的机会（行号会随插入变化，保存单元格）
+        self._opportunity_items = {}
 
         # 设置表格表头
         self.table.setColumnCount(8)
@@ -732,6 +855,14 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 logging.error(f"语音播报失败: {e}")
 
+            # 同一场次之前已提醒、被本机会取代的行（以及同一订单调价前的行）先移除，每个场次只保留一行
+            replaced = opportunity_data.get('replaces') or []
+            order_key = (platform_name, opportunity_data.get('order_id'))
+            for key in [(item['platform'], item['order_id']) for item in replaced] + [order_key]:
+                old_item = self._opportunity_items.pop(key, None)
+                if old_item is not None and self.table.row(old_item) >= 0:
+                    self.table.removeRow(self.table.row(old_item))
+
             # 在表格顶部插入新行
             self.table.insertRow(0)
 
@@ -740,7 +871,9 @@ class MainWindow(QMainWindow):
 
             # 平台
             platform_item = QTableWidgetItem(platform_name)
+            platform_item.setData(Qt.ItemDataRole.UserRole, order_key)
             self.table.setItem(0, 0, platform_item)
+            self._opportunity_items[order_key] = platform_item
 
             # 触发时间
             timestamp_item = QTableWidgetItem(opportunity_data.get('timestamp', ''))
@@ -770,12 +903,26 @@ class MainWindow(QMainWindow):
             price_item = QTableWidgetItem(f"{bidding_price:.1f}元")
             self.table.setItem(0, 6, price_item)
 
-            # 匹配规则
-            rule_item = QTableWidgetItem(opportunity_data.get('rule_name', ''))
+            # 匹配规则（调价后重新匹配成功的订单加注）
+            rule_name = opportunity_data.get('rule_name', '')
+            if opportunity_data.get('updated'):
+                rule_name = f"{rule_name}（调价）"
+            # 同一场次在其他平台也有订单时注明其利润
+            alternatives = opportunity_data.get('alternatives') or []
+            if alternatives:
+                others = '，'.join(f"{item['platform']} {item['total_profit']:.1f}元" for item in alternatives)
+                rule_name = f"{rule_name}（另有 {others}）"
+            if replaced:
+                previous = '，'.join(f"{item['platform']} {item['total_profit']:.1f}元" for item in replaced)
+                rule_name = f"{rule_name}（取代 {previous}）"
+            rule_item = QTableWidgetItem(rule_name)
             self.table.setItem(0, 7, rule_item)
 
             # 限制表格行数，避免数据过多
             if self.table.rowCount() > 100:
+                removed_item = self.table.item(100, 0)
+                if removed_item is not None:
+                    self._opportunity_items.pop(removed_item.data(Qt.ItemDataRole.UserRole), None)
                 self.table.removeRow(100)
 
             # 更新状态栏
@@ -803,6 +950,11 @@ class MainWindow(QMainWindow):
             else:
                 status_text = f"所有平台获取失败，{API_REQUEST_INTERVAL}秒后重试..."
 
+            # 附加各平台轮询耗时的p95
+            latency_text = pipeline_metrics.status_text()
+            if latency_text:
+                status_text = f"{status_text}  [{latency_text}]"
+
             self.statusBar().showMessage(status_text)
 
         except Exception as e:
@@ -816,15 +968,22 @@ class MainWindow(QMainWindow):
             # 安全地退出后台线程
             if hasattr(self, 'thread') and self.thread.isRunning():
                 logging.info("正在停止后台监控线程...")
+                self.worker.stop()  # 请求后台循环退出并保存状态快照
                 self.thread.quit()  # 请求线程退出
 
-                # 等待线程完全退出，最多等待3秒
-                if self.thread.wait(3000):  # 3000毫秒 = 3秒
+                # 等待线程完全退出：进行中的轮询、保存快照、写完剩余订单和响应都有各自的超时
+                if self.thread.wait(int(SHUTDOWN_TIMEOUT * 1000)):
                     logging.info("后台线程已安全退出")
                 else:
-                    logging.warning("后台线程退出超时，强制终止")
-                    self.thread.terminate()
-                    self.thread.wait(1000)  # 再等待1秒确保终止
+                    persister = self.worker.persister
+                    if persister is not None and persister.is_alive():
+                        # 强制终止会丢失尚未写入的订单，持久化线程写完之前不终止
+                        logging.warning("订单持久化线程仍在写入剩余订单，等待写完后退出")
+                        persister.close(timeout=None)
+                    if not self.thread.wait(1000):
+                        logging.warning("后台线程退出超时，强制终止")
+                        self.thread.terminate()
+                        self.thread.wait(1000)  # 再等待1秒确保终止
 
             # 正式关闭窗口
             event.accept()
@@ -5,10 +5,11 @@ Web API服务器 - 提供订单数据的HTTP API接口
 """
 
 from flask import Flask, request, send_from_directory, Response
-from core.database import DatabaseManager
+from core.database import ReadConnectionPool, format_time_ms
+from core import jsoncodec
+from core.metrics import read_report
 import logging
 import os
-import json
 
 # 配置日志
 logging.basicConfig(
@@ -20,14 +21,19 @@ logging.basicConfig(
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
 
-# 全局数据库管理器实例
-db_manager = None
+# 分页和增量查询每次最多返回的订单数
+MAX_PAGE_SIZE = 1000
+
+# 只读数据库连接池：每个请求线程借用独立的只读连接，与后台持久化线程的写入互不阻塞
+read_pool = ReadConnectionPool()
 
 
 def json_response(data, status_code=200):
     """
     创建JSON响应，确保中文字符正确显示
 
+    默认输出紧凑JSON，请求参数带 pretty=1 时缩进输出便于人工查看
+
     Args:
         data: 要序列化的数据
         status_code: HTTP状态码
@@ -35,44 +41,112 @@ def json_response(data, status_code=200):
     Returns:
         Response: Flask响应对象
     """
-    json_str = json.dumps(data, ensure_ascii=False, indent=2)
+    pretty = request.args.get('pretty', default=0, type=int) == 1
+    json_bytes = jsoncodec.dumps_bytes(data, pretty=pretty)
     return Response(
-        json_str,
+        json_bytes,
         status=status_code,
         mimetype='application/json; charset=utf-8'
     )
 
 
-def get_db_manager():
-    """获取数据库管理器实例（单例模式）"""
-    global db_manager
-    if db_manager is None:
-        db_manager = DatabaseManager()
-    return db_manager
+def wants_raw():
+    """请求参数带 include_raw=1 时返回True，订单数据中附带解压后的原始订单"""
+    return request.args.get('include_raw', default=0, type=int) == 1
+
+
+def present_orders(orders):
+    """
+    把数据库返回的毫秒时间戳格式化为中国时区时间字符串（created_at），原时间戳字段一并保留
+
+    Args:
+        orders (list): 数据库返回的订单字典列表
+
+    Returns:
+        list: 同一个列表
+    """
+    for order in orders:
+        order['created_at'] = format_time_ms(order.get('created_at_ms'))
+    return orders
+
+
+def clamp_limit(limit, default):
+    """把每页数量限制在 1~MAX_PAGE_SIZE 之间，无效值使用默认值"""
+    if limit is None or limit < 1:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def format_cursor(cursor):
+    """把分页游标 (created_at_ms, id) 编码为字符串，没有下一页时返回None"""
+    if cursor is None:
+        return None
+    return f"{cursor[0]}_{cursor[1]}"
+
+
+def parse_cursor(text):
+    """
+    解析 format_cursor() 生成的游标字符串
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    created_at_ms, _, order_pk = text.partition('_')
+    return int(created_at_ms), int(order_pk)
 
 
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
     """
-    获取所有订单数据的API端点
+    获取订单数据的API端点
+
+    不带分页参数时返回全部订单（兼容旧版本）；带 limit 或 cursor 时按入库时间倒序分页，
+    响应中的 next_cursor 作为下一页请求的 cursor；带 since_id 时只返回ID大于它的新订单（按ID升序），
+    响应中的 last_id 作为下一次增量请求的 since_id。
     
+    Query Parameters:
+        limit (int): 每页数量，最多1000
+        cursor (str): 上一页响应中的 next_cursor
+        platform (str): 分页时只返回该平台的订单
+        since_id (int): 客户端已有的最大订单ID
+        include_raw (int): 为1时附带原始订单（raw_data），默认不返回
+
     Returns:
-        JSON: 包含所有订单数据的JSON响应
+        JSON: 包含订单数据的JSON响应
     """
     try:
-        # 获取数据库管理器实例
-        db = get_db_manager()
-        
-        # 从数据库获取所有订单数据
-        orders = db.get_all_orders_as_dicts()
+        limit = request.args.get('limit', type=int)
+        cursor_text = request.args.get('cursor')
+        since_id = request.args.get('since_id', type=int)
+        try:
+            before = parse_cursor(cursor_text) if cursor_text else None
+        except ValueError:
+            return json_response({'success': False, 'message': f'无效的分页游标: {cursor_text}', 'data': []}, 400)
+
+        response_data = {'success': True}
+        # 借用只读连接查询订单
+        with read_pool.connection() as db:
+            if since_id is not None:
+                # 增量查询
+                orders = db.get_orders_since(since_id, clamp_limit(limit, MAX_PAGE_SIZE), include_raw=wants_raw())
+                response_data['last_id'] = orders[-1]['id'] if orders else since_id
+            elif limit is not None or before is not None:
+                # 键集分页
+                orders, next_cursor = db.get_orders_page(
+                    clamp_limit(limit, 100), before, request.args.get('platform') or None, include_raw=wants_raw()
+                )
+                response_data['next_cursor'] = format_cursor(next_cursor)
+                response_data['has_more'] = next_cursor is not None
+            else:
+                orders = db.get_all_orders_as_dicts(include_raw=wants_raw())
+        present_orders(orders)
         
         # 构建响应数据
-        response_data = {
-            'success': True,
+        response_data.update({
             'message': f'成功获取 {len(orders)} 条订单数据',
             'total_count': len(orders),
             'data': orders
-        }
+        })
         
         logging.info(f"API请求成功：返回 {len(orders)} 条订单数据")
         return json_response(response_data)
@@ -101,11 +175,9 @@ def get_orders_count():
         JSON: 包含订单总数的JSON响应
     """
     try:
-        # 获取数据库管理器实例
-        db = get_db_manager()
-        
-        # 获取订单总数
-        total_count = db.get_orders_count()
+        # 借用只读连接，获取订单总数
+        with read_pool.connection() as db:
+            total_count = db.get_orders_count()
         
         # 构建响应数据
         response_data = {
@@ -131,6 +203,48 @@ def get_orders_count():
         return json_response(response_data, 500)
 
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """
+    获取订单统计的API端点（读取由数据库触发器实时维护的汇总表）
+
+    Query Parameters:
+        platform (str): 只统计该平台，默认全部平台
+        top (int): 城市、影院各返回订单数最多的前N项，默认20，最多1000
+        hours (int): 返回最近N个小时的逐小时订单数，默认24，最多720
+
+    Returns:
+        JSON: 订单总数、各平台订单数、城市和影院排行、逐小时订单数
+    """
+    try:
+        top = min(max(request.args.get('top', default=20, type=int) or 20, 1), 1000)
+        hours = min(max(request.args.get('hours', default=24, type=int) or 24, 1), 720)
+
+        with read_pool.connection() as db:
+            stats = db.get_order_stats(request.args.get('platform') or None, top=top, hours=hours)
+        for item in stats['hourly']:
+            item['hour'] = format_time_ms(item['hour_ms'])
+
+        response_data = {
+            'success': True,
+            'message': '成功获取订单统计',
+            'data': stats
+        }
+        return json_response(response_data)
+
+    except Exception as e:
+        error_message = f"获取订单统计失败: {str(e)}"
+        logging.error(error_message)
+
+        response_data = {
+            'success': False,
+            'message': error_message,
+            'data': None
+        }
+
+        return json_response(response_data, 500)
+
+
 @app.route('/api/orders/recent', methods=['GET'])
 def get_recent_orders():
     """
@@ -138,6 +252,7 @@ def get_recent_orders():
     
     Query Parameters:
         limit (int): 返回的订单数量限制，默认为10
+        include_raw (int): 为1时附带原始订单（raw_data），默认不返回
     
     Returns:
         JSON: 包含最近订单数据的JSON响应
@@ -152,11 +267,9 @@ def get_recent_orders():
         elif limit > 1000:
             limit = 1000
         
-        # 获取数据库管理器实例
-        db = get_db_manager()
-        
-        # 获取最近的订单数据
-        orders = db.get_recent_orders(limit=limit)
+        # 借用只读连接，获取最近的订单数据
+        with read_pool.connection() as db:
+            orders = present_orders(db.get_recent_orders(limit=limit, include_raw=wants_raw()))
         
         # 构建响应数据
         response_data = {
@@ -186,6 +299,46 @@ def get_recent_orders():
         return json_response(response_data, 500)
 
 
+@app.route('/api/orders/<order_id>/raw', methods=['GET'])
+def get_order_raw(order_id):
+    """
+    获取单个订单原始数据的API端点
+
+    Returns:
+        JSON: 解压后的平台原始订单
+    """
+    try:
+        with read_pool.connection() as db:
+            raw_data = db.get_raw_data(order_id)
+
+        if raw_data is None:
+            response_data = {
+                'success': False,
+                'message': f'订单 {order_id} 不存在',
+                'data': None
+            }
+            return json_response(response_data, 404)
+
+        response_data = {
+            'success': True,
+            'message': '成功获取订单原始数据',
+            'data': raw_data
+        }
+        return json_response(response_data)
+
+    except Exception as e:
+        error_message = f"获取订单原始数据失败: {str(e)}"
+        logging.error(error_message)
+
+        response_data = {
+            'success': False,
+            'message': error_message,
+            'data': None
+        }
+
+        return json_response(response_data, 500)
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
@@ -195,15 +348,16 @@ def health_check():
         JSON: 服务器状态信息
     """
     try:
-        # 获取数据库管理器实例并测试连接
-        db = get_db_manager()
-        total_count = db.get_orders_count()
+        # 借用只读连接测试数据库
+        with read_pool.connection() as db:
+            total_count = db.get_orders_count()
         
         response_data = {
             'success': True,
             'message': 'Web API服务器运行正常',
             'database_status': 'connected',
-            'total_orders': total_count
+            'total_orders': total_count,
+            'read_pool': read_pool.get_metrics()
         }
         
         return json_response(response_data)
@@ -219,6 +373,33 @@ def health_check():
         return json_response(response_data, 500)
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    获取轮询性能指标API端点
+
+    指标由桌面程序的后台线程每个轮询周期写入指标文件，这里只负责读取。
+
+    Returns:
+        JSON: 各平台各阶段耗时分位数（毫秒）和适配器计数指标
+    """
+    report = read_report()
+    if report is None:
+        response_data = {
+            'success': False,
+            'message': '暂无性能指标，请确认监控程序正在运行',
+            'data': None
+        }
+        return json_response(response_data, 404)
+
+    response_data = {
+        'success': True,
+        'message': '获取性能指标成功',
+        'data': report
+    }
+    return json_response(response_data)
+
+
 @app.route('/', methods=['GET'])
 def index():
     """
@@ -241,8 +422,13 @@ def index():
                     'GET /': '获取前端页面或API文档信息',
                     'GET /api/health': '健康检查',
                     'GET /api/orders': '获取所有订单数据',
+                    'GET /api/orders?limit=N&cursor=C': '按入库时间倒序分页，cursor 为上一页响应中的 next_cursor',
+                    'GET /api/orders?since_id=ID': '获取ID大于 since_id 的新订单',
                     'GET /api/orders/count': '获取订单总数',
-                    'GET /api/orders/recent?limit=N': '获取最近N条订单数据'
+                    'GET /api/stats': '获取订单统计（各平台、城市、影院及逐小时订单数）',
+                    'GET /api/orders/recent?limit=N': '获取最近N条订单数据',
+                    'GET /api/orders/<order_id>/raw': '获取单个订单的原始数据（列表接口加 include_raw=1 时附带原始数据）',
+                    'GET /api/metrics': '获取轮询性能指标'
                 },
                 'example_usage': {
                     'get_all_orders': 'http://localhost:5000/api/orders',
@@ -274,8 +460,13 @@ def api_docs():
             'GET /api/docs': '获取API文档信息',
             'GET /api/health': '健康检查',
             'GET /api/orders': '获取所有订单数据',
+            'GET /api/orders?limit=N&cursor=C': '按入库时间倒序分页，cursor 为上一页响应中的 next_cursor',
+            'GET /api/orders?since_id=ID': '获取ID大于 since_id 的新订单',
             'GET /api/orders/count': '获取订单总数',
-            'GET /api/orders/recent?limit=N': '获取最近N条订单数据'
+            'GET /api/stats': '获取订单统计（各平台、城市、影院及逐小时订单数）',
+            'GET /api/orders/recent?limit=N': '获取最近N条订单数据',
+            'GET /api/orders/<order_id>/raw': '获取单个订单的原始数据（列表接口加 include_raw=1 时附带原始数据）',
+            'GET /api/metrics': '获取轮询性能指标'
         },
         'example_usage': {
             'frontend_page': 'http://localhost:5000/',
@@ -297,8 +488,8 @@ if __name__ == '__main__':
         logging.info("正在启动Web API服务器...")
         
         # 测试数据库连接
-        test_db = get_db_manager()
-        total_orders = test_db.get_orders_count()
+        with read_pool.connection() as test_db:
+            total_orders = test_db.get_orders_count()
         logging.info(f"数据库连接成功，当前共有 {total_orders} 条订单数据")
         
         # 启动Flask应用